@@ -47,6 +47,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -81,11 +82,22 @@ WSGI_APPLICATION = 'app.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.backends.sqlite',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'CONN_MAX_AGE': 600,
+    },
+    # Local replica of the primary, unused unless listed in DATABASE_REPLICAS;
+    # the core.routers tests run it as an in-memory test database
+    'replica': {
+        'ENGINE': 'core.backends.sqlite',
+        'NAME': BASE_DIR / 'replica.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'TEST': {'NAME': None},
+    },
 }
 
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 
@@ -130,3 +142,130 @@ MEDIA_ROOT = BASE_DIR / 'media'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'core.User'
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.fastjson.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.fastjson.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+}
+
+# Caches. Without a CACHES entry Django uses a local-memory cache, private to
+# each process. The recipe response cache, the shared tier of the token cache
+# and the replica pins must be seen by every worker process, so with several
+# workers point their aliases at a shared backend (Redis, Memcached or the
+# database cache). On a local-memory alias these features turn off, unless
+# CACHE_SINGLE_PROCESS says the app runs in one process (runserver, tests)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+CACHE_SINGLE_PROCESS = False
+
+# Token authentication cache (user.authentication.CachedTokenAuthentication):
+# a per-process LRU in front of TOKEN_AUTH_CACHE_ALIAS. A deleted token is
+# dropped from the shared cache and from the LRU of the worker that deleted
+# it; other workers keep it for up to TOKEN_AUTH_LOCAL_TTL seconds. A
+# local-memory alias is not used as the shared tier (see CACHES)
+
+TOKEN_AUTH_CACHE_SIZE = 10000
+TOKEN_AUTH_LOCAL_TTL = 5
+TOKEN_AUTH_SHARED_TTL = 300
+TOKEN_AUTH_CACHE_ALIAS = 'default'
+
+# Per-user response cache for the recipe API (recipe.caching)
+
+RECIPE_RESPONSE_CACHE_TIMEOUT = 300
+RECIPE_RESPONSE_CACHE_ALIAS = 'default'
+
+# Recipe image processing and storage (recipe.images)
+
+IMAGE_PROCESSING_ASYNC = True
+IMAGE_PROCESSING_WORKERS = 2
+RECIPE_IMAGE_CONTENT_ADDRESSED = True
+# gc_recipe_images leaves files modified within this many seconds, which may
+# belong to an upload or rendition still being saved
+IMAGE_GC_GRACE_SECONDS = 3600
+
+# Recipe full-text search (recipe.search): 'auto' uses SQLite FTS5 when the
+# index table exists and falls back to the in-process index otherwise. The
+# in-process index ('python') only sees writes made by its own process, so it
+# is meant for a single process (development, tests), not several workers
+
+RECIPE_SEARCH_BACKEND = 'auto'
+RECIPE_SEARCH_LIMIT = 100
+
+# Recipe list/detail responses built from .values() rows instead of
+# ModelSerializer instances (recipe.readers)
+
+RECIPE_FAST_SERIALIZERS = True
+
+# JSON encoder for the API renderer and parser (core.fastjson): 'auto' uses
+# orjson or msgspec when installed and the standard library json otherwise
+
+API_JSON_BACKEND = 'auto'
+
+# SQLite connection tuning (core.backends.sqlite): pragmas applied to every new
+# connection (None drops a default), a process-wide write lock (not strict FIFO)
+# with BEGIN IMMEDIATE transactions and a health check before reusing
+# persistent connections. Every atomic() block takes the lock, read-only ones
+# included, so transactions on a database file run one at a time per process;
+# keep reads outside atomic() (autocommit) so they run concurrently
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,
+    'mmap_size': 268435456,
+}
+SQLITE_SERIALIZE_WRITES = True
+SQLITE_HEALTH_CHECKS = True
+
+# Read replicas (core.routers): aliases in DATABASES that serve list/retrieve
+# reads of the core models. A user who writes is pinned to the primary for
+# REPLICA_PIN_SECONDS. Locally, SQLite files can stand in for replicas, e.g.
+# DATABASE_REPLICAS = ['replica'] (the replica.sqlite3 alias declared above)
+# kept up to date with `manage.py sync_replicas`. Responses read from a
+# replica bypass the recipe response cache. Pins live in
+# REPLICA_PIN_CACHE_ALIAS; on a per-process cache (see CACHES) another worker
+# would not see them, so all reads then go to the primary
+
+DATABASE_REPLICAS = []
+REPLICA_PIN_SECONDS = 5
+REPLICA_PIN_CACHE_ALIAS = 'default'
+
+# Per-alias query latency metrics (core.dbmetrics), served at /api/db-metrics/
+
+DATABASE_QUERY_METRICS = True
+
+# Per-request performance metrics (core.middleware.PerformanceMiddleware): wall
+# time, query count/time, serializer time and response size per view and
+# viewset action, sent as a Server-Timing header and served in Prometheus
+# format at /metrics (Authorization: Bearer PERF_METRICS_TOKEN when set,
+# otherwise only logged-in staff users)
+
+PERF_METRICS = True
+PERF_SERVER_TIMING = True
+PERF_METRICS_TOKEN = None
+
+# Query audit (core.queryaudit) for development and staging: requests to the
+# recipe and user views log repeated query shapes (N+1, from
+# QUERY_AUDIT_REPEAT_THRESHOLD repetitions) and queries slower than
+# QUERY_AUDIT_SLOW_MS with the serializer field or project line that ran them.
+# Test query budgets (core.testing.QueryBudgetMixin) call QUERY_BUDGET_WARMUPS
+# before each test class. QUERY_AUDIT = None follows DEBUG when each request
+# runs, so the test runner (which forces DEBUG off) does not audit; set it to
+# True or False to override. Transaction control statements (BEGIN, COMMIT,
+# SAVEPOINT...) are not audited
+
+QUERY_AUDIT = None
+QUERY_AUDIT_REPEAT_THRESHOLD = 3
+QUERY_AUDIT_SLOW_MS = 100
+QUERY_BUDGET_WARMUPS = ['recipe.search.get_backend']
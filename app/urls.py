@@ -5,10 +5,14 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.views import DatabaseMetricsView, metrics
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/user/', include('user.urls')),
     path('api/recipe/', include('recipe.urls')),
+    path('api/db-metrics/', DatabaseMetricsView.as_view(), name='db-metrics'),
+    path('metrics', metrics, name='metrics'),
 ]
 
 # static and media Urls
@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # medir la latencia de queries por alias de base de datos
+        from core.dbmetrics import install_query_timer
+        connection_created.connect(install_query_timer, dispatch_uid='core.dbmetrics')
+
+        # tiempo de serializacion por request (core.middleware)
+        from core.perf import install_serializer_timer
+        install_serializer_timer()
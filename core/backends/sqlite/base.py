@@ -0,0 +1,169 @@
+import re
+import threading
+
+from django.conf import settings
+from django.db.backends import utils
+from django.db.backends.sqlite3 import base as sqlite3_base
+from django.db.utils import OperationalError
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,
+    'mmap_size': 268435456,
+    'cache_size': -20000,
+    'temp_store': 'MEMORY',
+}
+
+WRITE_STATEMENT = re.compile(r'\s*(INSERT|UPDATE|DELETE|REPLACE)\b', re.IGNORECASE)
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def get_pragmas():
+    # pragmas por defecto con los cambios de SQLITE_PRAGMAS (None quita un pragma)
+    pragmas = {**DEFAULT_PRAGMAS, **getattr(settings, 'SQLITE_PRAGMAS', {})}
+    return {name: value for name, value in pragmas.items() if value is not None}
+
+
+def get_write_queue(name):
+    # lock de escritura compartido por las conexiones del proceso a un archivo.
+    # No es FIFO estricto: pasar el turno a un hilo dormido cuesta un cambio de
+    # contexto y una espera por el GIL en cada transaccion
+    with _queues_lock:
+        return _queues.setdefault(str(name), threading.Lock())
+
+
+class SerializedWritesMixin:
+    # los INSERT/UPDATE/DELETE en autocommit esperan su turno en la cola
+
+    def execute(self, sql, params=None):
+        with self.db.autocommit_write(sql):
+            return super().execute(sql, params)
+
+    def executemany(self, sql, param_list):
+        with self.db.autocommit_write(sql):
+            return super().executemany(sql, param_list)
+
+
+class SerializedCursorWrapper(SerializedWritesMixin, utils.CursorWrapper):
+    pass
+
+
+class SerializedCursorDebugWrapper(SerializedWritesMixin, utils.CursorDebugWrapper):
+    pass
+
+
+class AutocommitWrite:
+    # context manager para una escritura fuera de transaccion
+
+    def __init__(self, db, sql):
+        self.db = db
+        self.hold = db.write_queue is not None and db.autocommit and bool(WRITE_STATEMENT.match(sql))
+
+    def __enter__(self):
+        if self.hold:
+            self.db.acquire_write_queue()
+
+    def __exit__(self, *exc_info):
+        if self.hold:
+            self.db.release_write_queue()
+
+
+class DatabaseWrapper(sqlite3_base.DatabaseWrapper):
+    # SQLite con WAL y pragmas configurables, conexiones persistentes con
+    # health check y transacciones serializadas (BEGIN IMMEDIATE)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._holds_write_queue = False
+        self.write_queue = None
+        if getattr(settings, 'SQLITE_SERIALIZE_WRITES', True) and not self.is_in_memory_db():
+            self.write_queue = get_write_queue(self.settings_dict['NAME'])
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in get_pragmas().items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def busy_timeout(self):
+        # segundos de espera por el lock, el mismo que usa SQLite
+        pragmas = get_pragmas()
+        if 'busy_timeout' in pragmas:
+            return int(pragmas['busy_timeout']) / 1000
+        return self.settings_dict['OPTIONS'].get('timeout', 5)
+
+    def acquire_write_queue(self):
+        if not self.write_queue.acquire(timeout=self.busy_timeout()):
+            raise OperationalError('database is locked (write queue timeout)')
+        self._holds_write_queue = True
+
+    def release_write_queue(self):
+        if self._holds_write_queue:
+            self._holds_write_queue = False
+            self.write_queue.release()
+
+    def autocommit_write(self, sql):
+        return AutocommitWrite(self, sql)
+
+    def make_cursor(self, cursor):
+        return SerializedCursorWrapper(cursor, self)
+
+    def make_debug_cursor(self, cursor):
+        return SerializedCursorDebugWrapper(cursor, self)
+
+    def _start_transaction_under_autocommit(self):
+        # IMMEDIATE toma el lock de escritura al empezar: una transaccion que lee
+        # y luego escribe no falla con "database is locked" al subir el lock.
+        # No se sabe de antemano si el bloque va a escribir, asi que todo
+        # atomic() (tambien los de solo lectura) toma el lock del proceso y las
+        # transacciones sobre un mismo archivo corren de a una; las lecturas
+        # en autocommit no lo toman
+        if self.write_queue is None:
+            self.cursor().execute('BEGIN IMMEDIATE')
+            return
+
+        self.acquire_write_queue()
+        try:
+            self.cursor().execute('BEGIN IMMEDIATE')
+        except Exception:
+            self.release_write_queue()
+            raise
+
+    def _commit(self):
+        try:
+            super()._commit()
+        finally:
+            self.release_write_queue()
+
+    def _rollback(self):
+        try:
+            super()._rollback()
+        finally:
+            self.release_write_queue()
+
+    def _close(self):
+        try:
+            super()._close()
+        finally:
+            self.release_write_queue()
+
+    def is_usable(self):
+        try:
+            self.connection.execute('SELECT 1')
+        except sqlite3_base.Database.Error:
+            return False
+        return True
+
+    def close_if_unusable_or_obsolete(self):
+        # health check al inicio y fin de cada request (CONN_HEALTH_CHECKS de
+        # Django 4.1): una conexion persistente rota se cierra y se reabre
+        if (
+            self.connection is not None and getattr(settings, 'SQLITE_HEALTH_CHECKS', True)
+            and self.get_autocommit() and not self.is_usable()
+        ):
+            self.close()
+            return
+        super().close_if_unusable_or_obsolete()
@@ -0,0 +1,10 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def is_shared(alias):
+    # True si todos los procesos del servidor ven el mismo cache: un
+    # LocMemCache es propio de cada proceso y solo vale como compartido si la
+    # app corre en un unico proceso (CACHE_SINGLE_PROCESS)
+    return not isinstance(caches[alias], LocMemCache) or getattr(settings, 'CACHE_SINGLE_PROCESS', False)
@@ -0,0 +1,77 @@
+import threading
+import time
+
+from django.conf import settings
+
+# limites superiores (segundos) del histograma de latencia por alias
+BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+
+_lock = threading.Lock()
+_metrics = {}
+
+
+def enabled():
+    return getattr(settings, 'DATABASE_QUERY_METRICS', True)
+
+
+def record(alias, seconds):
+    with _lock:
+        metrics = _metrics.get(alias)
+        if metrics is None:
+            metrics = _metrics[alias] = {'count': 0, 'total': 0.0, 'max': 0.0, 'buckets': [0] * len(BUCKETS)}
+        metrics['count'] += 1
+        metrics['total'] += seconds
+        metrics['max'] = max(metrics['max'], seconds)
+        for index, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                metrics['buckets'][index] += 1
+                break
+
+
+def snapshot():
+    # copia de las metricas por alias: cantidad, tiempo total/promedio/maximo y
+    # histograma acumulado (le = segundos)
+    with _lock:
+        data = {}
+        for alias, metrics in sorted(_metrics.items()):
+            cumulative, buckets = 0, {}
+            for bound, count in zip(BUCKETS, metrics['buckets']):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            buckets['+Inf'] = metrics['count']
+            data[alias] = {
+                'count': metrics['count'],
+                'total_ms': round(metrics['total'] * 1000, 3),
+                'avg_ms': round(metrics['total'] * 1000 / metrics['count'], 3),
+                'max_ms': round(metrics['max'] * 1000, 3),
+                'buckets': buckets,
+            }
+        return data
+
+
+def reset():
+    with _lock:
+        _metrics.clear()
+
+
+class QueryTimer:
+    # execute_wrapper que mide cada query de una conexion
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            record(self.alias, time.perf_counter() - start)
+
+
+def install_query_timer(sender, connection, **kwargs):
+    # receptor de connection_created; el timer va primero en la lista para que
+    # los execute_wrapper temporales (que quitan el ultimo) no lo saquen
+    if not enabled():
+        return
+    if not any(isinstance(wrapper, QueryTimer) for wrapper in connection.execute_wrappers):
+        connection.execute_wrappers.insert(0, QueryTimer(connection.alias))
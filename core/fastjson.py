@@ -0,0 +1,123 @@
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders, json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+BACKEND_ORJSON = 'orjson'
+BACKEND_MSGSPEC = 'msgspec'
+BACKEND_JSON = 'json'
+
+# los tipos que no son JSON nativo (Decimal, fechas, lazy strings, etc) se
+# convierten igual que en el JSONEncoder de DRF
+_drf_default = encoders.JSONEncoder().default
+_msgspec_encoder = None
+_msgspec_decoder = None
+
+
+def get_backend():
+    # orjson o msgspec si estan instalados, si no json de la libreria estandar
+    backend = getattr(settings, 'API_JSON_BACKEND', 'auto')
+    if backend == BACKEND_ORJSON and orjson is not None:
+        return BACKEND_ORJSON
+    if backend == BACKEND_MSGSPEC and msgspec is not None:
+        return BACKEND_MSGSPEC
+    if backend == 'auto':
+        if orjson is not None:
+            return BACKEND_ORJSON
+        if msgspec is not None:
+            return BACKEND_MSGSPEC
+
+    return BACKEND_JSON
+
+
+def _msgspec():
+    global _msgspec_encoder, _msgspec_decoder
+    if _msgspec_encoder is None:
+        _msgspec_encoder = msgspec.json.Encoder(enc_hook=_drf_default, decimal_format='number')
+        _msgspec_decoder = msgspec.json.Decoder()
+    return _msgspec_encoder, _msgspec_decoder
+
+
+def _escape_separators(content):
+    # U+2028 y U+2029 siempre escapados, igual que JSONRenderer (JSON subconjunto de javascript)
+    if b'\xe2\x80\xa8' in content or b'\xe2\x80\xa9' in content:
+        content = content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    return content
+
+
+def dumps(data):
+    # JSON compacto en utf-8, el mismo resultado que JSONRenderer de DRF
+    backend = get_backend()
+    try:
+        if backend == BACKEND_ORJSON:
+            # las fechas pasan por el encoder de DRF (milisegundos y sufijo Z)
+            content = orjson.dumps(
+                data, default=_drf_default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+            return _escape_separators(content)
+        if backend == BACKEND_MSGSPEC:
+            return _escape_separators(_msgspec()[0].encode(data))
+    except TypeError:
+        # enteros de mas de 64 bits y otros valores que el backend no soporta
+        pass
+
+    content = json.dumps(data, cls=encoders.JSONEncoder, ensure_ascii=False, separators=(',', ':'))
+    return _escape_separators(content.encode())
+
+
+def loads(content):
+    # bytes JSON a objetos python; lanza ValueError si el JSON es invalido
+    backend = get_backend()
+    try:
+        if backend == BACKEND_ORJSON:
+            return orjson.loads(content)
+        if backend == BACKEND_MSGSPEC:
+            return _msgspec()[1].decode(content)
+    except (ValueError, getattr(msgspec, 'DecodeError', ValueError)):
+        # json de la libreria estandar da el mismo mensaje de error que DRF
+        pass
+
+    return json.loads(content)
+
+
+class FastJSONRenderer(JSONRenderer):
+    # JSONRenderer con orjson/msgspec para la respuesta compacta; con indentacion
+    # (API navegable, ?indent=) o ajustes no compactos se usa el de DRF
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or self.ensure_ascii or not self.compact or not self.strict:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        return dumps(data)
+
+
+class FastJSONParser(JSONParser):
+    # JSONParser con orjson/msgspec para cuerpos utf-8
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if encoding.lower().replace('_', '-') not in ('utf-8', 'utf8') or not self.strict:
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return loads(stream.read())
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,123 @@
+import os
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError
+from django.db.utils import load_backend
+
+ENGINES = (
+    ('plain', 'django.db.backends.sqlite3'),
+    ('tuned', 'core.backends.sqlite'),
+)
+
+
+def open_connection(engine, path):
+    # conexion de Django propia del hilo que la usa
+    settings_dict = {
+        'ENGINE': engine, 'NAME': path, 'OPTIONS': {}, 'TIME_ZONE': None, 'CONN_MAX_AGE': None,
+        'AUTOCOMMIT': True, 'ATOMIC_REQUESTS': False, 'CONN_HEALTH_CHECKS': False, 'TEST': {},
+        'USER': '', 'PASSWORD': '', 'HOST': '', 'PORT': '',
+    }
+    return load_backend(engine).DatabaseWrapper(settings_dict, alias=f'benchmark_{engine}')
+
+
+class Command(BaseCommand):
+    help = 'Compara lecturas y escrituras concurrentes en SQLite con la configuracion por defecto y la de core.backends.sqlite'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8, help='hilos de lectura')
+        parser.add_argument('--writers', type=int, default=4, help='hilos de escritura')
+        parser.add_argument('--duration', type=float, default=3, help='segundos por configuracion')
+        parser.add_argument('--rows', type=int, default=2000, help='filas iniciales')
+
+    def handle(self, *args, **options):
+        for name, engine in ENGINES:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'benchmark.sqlite3')
+                self.setup(engine, path, options['rows'])
+                result = self.run(engine, path, options)
+            self.report(name, result)
+
+    def setup(self, engine, path, rows):
+        connection = open_connection(engine, path)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TABLE bench_recipe (id INTEGER PRIMARY KEY, user_id INTEGER, title TEXT, price REAL)'
+            )
+            cursor.executemany(
+                'INSERT INTO bench_recipe (user_id, title, price) VALUES (%s, %s, %s)',
+                [(index % 20, f'Recipe {index}', index % 100) for index in range(rows)],
+            )
+        connection.close()
+
+    def run(self, engine, path, options):
+        stop = threading.Event()
+        results = {'read': [], 'write': [], 'errors': []}
+        lock = threading.Lock()
+
+        def read(connection, cursor, number):
+            cursor.execute('SELECT id, title, price FROM bench_recipe WHERE user_id = %s LIMIT 50', [number % 20])
+            cursor.fetchall()
+
+        def write(connection, cursor, number):
+            # leer y luego escribir en la misma transaccion, como get_or_create o perform_create
+            connection.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+            try:
+                cursor.execute('SELECT COUNT(*) FROM bench_recipe WHERE user_id = %s', [number % 20])
+                cursor.fetchone()
+                cursor.execute(
+                    'INSERT INTO bench_recipe (user_id, title, price) VALUES (%s, %s, %s)',
+                    [number % 20, f'New {number}', 1],
+                )
+                connection.commit()
+            except DatabaseError:
+                connection.rollback()
+                raise
+            finally:
+                connection.set_autocommit(True)
+
+        def worker(kind, operation):
+            connection = open_connection(engine, path)
+            timings, errors, number = [], [], 0
+            with connection.cursor() as cursor:
+                while not stop.is_set():
+                    number += 1
+                    start = time.perf_counter()
+                    try:
+                        operation(connection, cursor, number)
+                    except DatabaseError as exc:
+                        errors.append(exc)
+                        continue
+                    timings.append(time.perf_counter() - start)
+            connection.close()
+            with lock:
+                results[kind].extend(timings)
+                results['errors'].extend(errors)
+
+        threads = [threading.Thread(target=worker, args=('read', read)) for _ in range(options['readers'])]
+        threads += [threading.Thread(target=worker, args=('write', write)) for _ in range(options['writers'])]
+        for thread in threads:
+            thread.start()
+        time.sleep(options['duration'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        return options['duration'], results
+
+    def report(self, name, result):
+        duration, results = result
+
+        def summary(timings):
+            if not timings:
+                return '0 ops/s'
+            timings = sorted(timings)
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            return f'{len(timings) / duration:,.0f} ops/s, p95 {p95 * 1000:.1f} ms, max {timings[-1] * 1000:.1f} ms'
+
+        self.stdout.write(
+            f'{name}: reads {summary(results["read"])}; writes {summary(results["write"])}; '
+            f'errors {len(results["errors"])}'
+        )
@@ -0,0 +1,113 @@
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class HTTPError(Exception):
+    pass
+
+
+async def read_response(reader):
+    # leer una respuesta HTTP/1.1 (content-length o chunked); retorna (status, keep_alive)
+    status_line = await reader.readline()
+    if not status_line:
+        raise HTTPError('connection closed')
+    status = int(status_line.split()[1])
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif status not in (204, 304):
+        # sin largo: el cuerpo termina al cerrar la conexion
+        await reader.read()
+        return status, False
+
+    return status, headers.get('connection', '').lower() != 'close'
+
+
+class Command(BaseCommand):
+    help = 'Prueba de carga HTTP con conexiones keep-alive concurrentes; compara throughput y latencias de varios servidores'
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help='urls base de los servidores (por ejemplo wsgi y asgi)')
+        parser.add_argument('--path', action='append', dest='paths', help='path a pedir, se puede repetir')
+        parser.add_argument('--token', help='token de autenticacion')
+        parser.add_argument('--concurrency', type=int, default=50, help='conexiones concurrentes')
+        parser.add_argument('--requests', type=int, default=2000, help='requests por servidor')
+        parser.add_argument('--timeout', type=float, default=30, help='timeout por request en segundos')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or ['/api/recipe/recipes/']
+        for url in options['urls']:
+            parts = urlsplit(url)
+            if parts.scheme != 'http' or not parts.hostname:
+                raise CommandError(f'Only http:// urls are supported: {url}')
+
+            result = asyncio.run(self.run(parts, paths, options))
+            self.report(url, result)
+
+    async def run(self, parts, paths, options):
+        host, port = parts.hostname, parts.port or 80
+        prefix = parts.path.rstrip('/')
+        auth = f'Authorization: Token {options["token"]}\r\n' if options['token'] else ''
+        requests = [
+            (f'GET {prefix}{path} HTTP/1.1\r\nHost: {parts.netloc}\r\n{auth}'
+             f'Accept: application/json\r\nConnection: keep-alive\r\n\r\n').encode()
+            for path in paths
+        ]
+        pending = iter(range(options['requests']))
+        latencies, statuses, errors = [], {}, []
+
+        async def worker():
+            reader = writer = None
+            for number in pending:
+                try:
+                    if writer is None:
+                        reader, writer = await asyncio.open_connection(host, port)
+                    start = time.perf_counter()
+                    writer.write(requests[number % len(requests)])
+                    status, keep_alive = await asyncio.wait_for(read_response(reader), options['timeout'])
+                    latencies.append(time.perf_counter() - start)
+                    statuses[status] = statuses.get(status, 0) + 1
+                except (OSError, HTTPError, ValueError, asyncio.IncompleteReadError, asyncio.TimeoutError) as exc:
+                    errors.append(exc)
+                    keep_alive = False
+                if not keep_alive and writer is not None:
+                    writer.close()
+                    reader = writer = None
+            if writer is not None:
+                writer.close()
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(options['concurrency'])])
+        return time.perf_counter() - start, sorted(latencies), statuses, errors
+
+    def report(self, url, result):
+        elapsed, latencies, statuses, errors = result
+        if not latencies:
+            raise CommandError(f'{url}: no successful requests ({len(errors)} errors: {errors[:1]})')
+
+        def percentile(value):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * value))] * 1000
+
+        self.stdout.write(
+            f'{url}: {len(latencies) / elapsed:,.0f} req/s, '
+            f'p50 {percentile(0.50):.1f} ms, p95 {percentile(0.95):.1f} ms, '
+            f'p99 {percentile(0.99):.1f} ms, max {latencies[-1] * 1000:.1f} ms, '
+            f'status {dict(sorted(statuses.items()))}, errors {len(errors)}'
+        )
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.routers import get_replicas
+
+
+class Command(BaseCommand):
+    help = 'Copia la base principal SQLite a las replicas locales (DATABASE_REPLICAS) con la API de backup'
+
+    def add_arguments(self, parser):
+        parser.add_argument('aliases', nargs='*', help='replicas a sincronizar, por defecto todas')
+
+    def handle(self, *args, **options):
+        aliases = options['aliases'] or get_replicas()
+        if not aliases:
+            raise CommandError('No replicas configured in DATABASE_REPLICAS')
+
+        primary = connections[DEFAULT_DB_ALIAS]
+        for alias in aliases:
+            if alias not in connections:
+                raise CommandError(f'Unknown database alias: {alias}')
+            replica = connections[alias]
+            if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+                raise CommandError('sync_replicas only supports SQLite databases')
+
+            primary.ensure_connection()
+            replica.ensure_connection()
+            primary.connection.backup(replica.connection)
+            self.stdout.write(f'{alias}: synced from {DEFAULT_DB_ALIAS}')
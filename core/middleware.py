@@ -0,0 +1,42 @@
+import contextlib
+import time
+
+from django.conf import settings
+from django.db import connections
+
+from core import perf
+
+
+class PerformanceMiddleware:
+    # mide tiempo total, queries, serializacion y tamaño de cada respuesta;
+    # los agrega al header Server-Timing y a las metricas de /metrics
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not perf.enabled():
+            return self.get_response(request)
+
+        request.perf_labels = None
+        start = time.perf_counter()
+        stats, token = perf.start_request()
+        try:
+            with contextlib.ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            perf.end_request(token)
+        duration = time.perf_counter() - start
+
+        labels = request.perf_labels or ('unmatched', request.method.lower())
+        size = 0 if response.streaming else len(response.content)
+        perf.record(labels, response.status_code, duration, stats, size)
+        if getattr(settings, 'PERF_SERVER_TIMING', True):
+            response['Server-Timing'] = perf.server_timing(duration, stats)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if perf.enabled():
+            request.perf_labels = perf.view_labels(view_func, request.method)
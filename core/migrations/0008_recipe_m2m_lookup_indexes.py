@@ -0,0 +1,24 @@
+# Generated by Django 4.0.1 on 2026-10-18 19:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # indices (tag/ingredient, recipe) en las tablas intermedias M2M para
+    # resolver los filtros de recetas con un semi-join solo sobre el indice
+
+    dependencies = [
+        ('core', '0007_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX core_recipe_tags_tag_recipe_idx ON core_recipe_tags (tag_id, recipe_id);',
+            reverse_sql='DROP INDEX core_recipe_tags_tag_recipe_idx;',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX core_recipe_ingredients_ingredient_recipe_idx '
+            'ON core_recipe_ingredients (ingredient_id, recipe_id);',
+            reverse_sql='DROP INDEX core_recipe_ingredients_ingredient_recipe_idx;',
+        ),
+    ]
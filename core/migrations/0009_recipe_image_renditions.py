@@ -0,0 +1,23 @@
+# Generated by Django 4.0.1 on 2026-10-18 19:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recipe_m2m_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_renditions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='image_status',
+            field=models.CharField(blank=True, choices=[('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.0.1 on 2026-10-18 21:30
+
+from django.db import migrations
+from django.db.utils import OperationalError
+
+
+def create_search_index(apps, schema_editor):
+    # indice de texto completo FTS5, solo en SQLite; en otras bases de datos
+    # la busqueda usa el indice en memoria de recipe.search
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    try:
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE recipe_search USING fts5("
+            "owner, title, tags, ingredients, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+    except OperationalError:
+        # SQLite compilado sin FTS5
+        return
+    schema_editor.execute('CREATE VIRTUAL TABLE recipe_search_vocab USING fts5vocab(recipe_search, col)')
+    schema_editor.execute(
+        "INSERT INTO recipe_search (rowid, owner, title, tags, ingredients) "
+        "SELECT r.id, 'u' || r.user_id, r.title, "
+        "(SELECT group_concat(t.name, ' ') FROM core_recipe_tags rt "
+        "JOIN core_tag t ON t.id = rt.tag_id WHERE rt.recipe_id = r.id), "
+        "(SELECT group_concat(i.name, ' ') FROM core_recipe_ingredients ri "
+        "JOIN core_ingredient i ON i.id = ri.ingredient_id WHERE ri.recipe_id = r.id) "
+        "FROM core_recipe r"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    schema_editor.execute('DROP TABLE IF EXISTS recipe_search_vocab')
+    schema_editor.execute('DROP TABLE IF EXISTS recipe_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_imageblob'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
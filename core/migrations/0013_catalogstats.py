@@ -0,0 +1,28 @@
+# Generated by Django 4.0.1 on 2026-10-18 19:16
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_recipe_price_time_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='catalog_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('recipe_count', models.IntegerField(default=0)),
+                ('tag_count', models.IntegerField(default=0)),
+                ('ingredient_count', models.IntegerField(default=0)),
+                ('price_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('time_total', models.BigIntegerField(default=0)),
+                ('tag_links', models.IntegerField(default=0)),
+                ('ingredient_links', models.IntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.0.1 on 2026-10-18 19:43
+
+from django.db import migrations, models
+from django.db.models.functions import Lower
+import django.db.models.expressions
+import django.db.models.functions.text
+
+
+def merge_duplicate_names(apps, schema_editor):
+    # antes de la restriccion: los tags e ingredients repetidos de un usuario
+    # (sin distinguir mayusculas) se unen en el de menor id
+    Recipe = apps.get_model('core', 'Recipe')
+    CatalogStats = apps.get_model('core', 'CatalogStats')
+    users = set()
+
+    for relation, model_name in (('tags', 'Tag'), ('ingredients', 'Ingredient')):
+        model = apps.get_model('core', model_name)
+        through = getattr(Recipe, relation).through
+        column = f'{model_name.lower()}_id'
+
+        keepers = {}
+        duplicates = {}
+        rows = model.objects.annotate(key=Lower('name')).order_by('id').values_list('id', 'user_id', 'key')
+        for pk, user_id, key in rows:
+            keeper = keepers.setdefault((user_id, key), pk)
+            if keeper != pk:
+                duplicates[pk] = keeper
+                users.add(user_id)
+        if not duplicates:
+            continue
+
+        linked = set(through.objects.filter(**{f'{column}__in': set(duplicates.values())}).values_list(
+            'recipe_id', column,
+        ))
+        for link_id, recipe_id, target_id in through.objects.filter(
+            **{f'{column}__in': list(duplicates)}
+        ).values_list('id', 'recipe_id', column):
+            keeper = duplicates[target_id]
+            if (recipe_id, keeper) in linked:
+                through.objects.filter(id=link_id).delete()
+            else:
+                through.objects.filter(id=link_id).update(**{column: keeper})
+                linked.add((recipe_id, keeper))
+        model.objects.filter(id__in=list(duplicates)).delete()
+
+    # los contadores de esos usuarios se recalculan en la proxima lectura
+    CatalogStats.objects.filter(user_id__in=users).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_catalogstats'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('name'), django.db.models.expressions.F('user'), name='core_ingredient_user_name_ci_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('name'), django.db.models.expressions.F('user'), name='core_tag_user_name_ci_unique'),
+        ),
+    ]
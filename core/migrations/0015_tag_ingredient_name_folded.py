@@ -0,0 +1,92 @@
+import unicodedata
+
+from django.db import migrations, models
+
+
+def fold_name(name):
+    # copia de core.models.fold_name al momento de la migracion
+    return unicodedata.normalize('NFC', name).casefold()
+
+
+def fill_name_folded(apps, schema_editor):
+    # completar name_folded y unir los nombres que la restriccion con LOWER no
+    # veia repetidos (mayusculas fuera de ASCII) en el de menor id
+    Recipe = apps.get_model('core', 'Recipe')
+    CatalogStats = apps.get_model('core', 'CatalogStats')
+    users = set()
+
+    for relation, model_name in (('tags', 'Tag'), ('ingredients', 'Ingredient')):
+        model = apps.get_model('core', model_name)
+        through = getattr(Recipe, relation).through
+        column = f'{model_name.lower()}_id'
+
+        keepers = {}
+        duplicates = {}
+        objs = []
+        for obj in model.objects.order_by('id').only('id', 'user_id', 'name'):
+            obj.name_folded = fold_name(obj.name)
+            keeper = keepers.setdefault((obj.user_id, obj.name_folded), obj.id)
+            if keeper != obj.id:
+                duplicates[obj.id] = keeper
+                users.add(obj.user_id)
+            else:
+                objs.append(obj)
+
+        if duplicates:
+            linked = set(through.objects.filter(**{f'{column}__in': set(duplicates.values())}).values_list(
+                'recipe_id', column,
+            ))
+            for link_id, recipe_id, target_id in through.objects.filter(
+                **{f'{column}__in': list(duplicates)}
+            ).values_list('id', 'recipe_id', column):
+                keeper = duplicates[target_id]
+                if (recipe_id, keeper) in linked:
+                    through.objects.filter(id=link_id).delete()
+                else:
+                    through.objects.filter(id=link_id).update(**{column: keeper})
+                    linked.add((recipe_id, keeper))
+            model.objects.filter(id__in=list(duplicates)).delete()
+
+        model.objects.bulk_update(objs, ['name_folded'], batch_size=500)
+
+    # los contadores de esos usuarios se recalculan en la proxima lectura
+    CatalogStats.objects.filter(user_id__in=users).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_tag_ingredient_unique_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='name_folded',
+            field=models.CharField(default='', editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='name_folded',
+            field=models.CharField(default='', editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_name_folded, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='ingredient',
+            name='core_ingredient_user_name_ci_unique',
+        ),
+        migrations.RemoveConstraint(
+            model_name='tag',
+            name='core_tag_user_name_ci_unique',
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'name_folded'), name='core_ingredient_user_name_folded_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'name_folded'), name='core_tag_user_name_folded_unique'),
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.conf import settings
 
+import unicodedata
 import uuid
 import os
 
@@ -12,7 +13,8 @@ def recipe_image_file_path(instance, filename):
     filename = f'{uuid.uuid4()}.{ext}'
 
     return os.path.join('uploads/recipe/', filename)
-    
+
+
 class UserManager(BaseUserManager):
 
     def create_user(self, email, password=None, **extra_fields):
@@ -45,24 +47,96 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     USERNAME_FIELD = 'email'
 
-class Tag(models.Model):
+def fold_name(name):
+    # clave de comparacion de nombres sin distinguir mayusculas, tambien fuera
+    # de ASCII (el LOWER de SQLite solo convierte A-Z)
+    return unicodedata.normalize('NFC', name).casefold()
+
+
+class FoldedNameQuerySet(models.QuerySet):
+    # bulk_create, bulk_update y update no llaman a save(): completan name_folded
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.name_folded = fold_name(obj.name)
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        if 'name' in fields:
+            objs = list(objs)
+            for obj in objs:
+                obj.name_folded = fold_name(obj.name)
+            fields = [*fields, 'name_folded']
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def update(self, **kwargs):
+        if isinstance(kwargs.get('name'), str):
+            kwargs['name_folded'] = fold_name(kwargs['name'])
+        return super().update(**kwargs)
+
+
+class FoldedNameModel(models.Model):
+    # nombre normalizado en Python para la restriccion unica y las busquedas
+    # por nombre sin distinguir mayusculas
+    name_folded = models.CharField(max_length=255, editable=False)
+
+    objects = FoldedNameQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        self.name_folded = fold_name(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'name_folded'}
+        super().save(*args, **kwargs)
+
+
+class Tag(FoldedNameModel):
     # modelo del Tag para las recetas
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
 
+    class Meta:
+        # indice para la paginacion por cursor (-name, id) de cada usuario
+        indexes = [models.Index(fields=['user', '-name', 'id'], name='core_tag_user_name_idx')]
+        # nombre unico por usuario sin distinguir mayusculas
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'name_folded'], name='core_tag_user_name_folded_unique'),
+        ]
+
     def __str__(self):
         return self.name
 
-class Ingredient(models.Model):
+class Ingredient(FoldedNameModel):
     # modelo para Ingredientes
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
 
+    class Meta:
+        # indice para la paginacion por cursor (-name, id) de cada usuario
+        indexes = [models.Index(fields=['user', '-name', 'id'], name='core_ingredient_user_name_idx')]
+        # nombre unico por usuario sin distinguir mayusculas
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'name_folded'], name='core_ingredient_user_name_folded_unique'),
+        ]
+
     def __str__(self):
         return self.name
 
 class Recipe(models.Model):
     # modelo para recetas
+    IMAGE_PROCESSING = 'processing'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUS_CHOICES = (
+        (IMAGE_PROCESSING, 'Processing'),
+        (IMAGE_READY, 'Ready'),
+        (IMAGE_FAILED, 'Failed'),
+    )
+
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     title = models.CharField(max_length=255)
     time_minutes = models.IntegerField()
@@ -71,6 +145,46 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image_status = models.CharField(max_length=20, blank=True, choices=IMAGE_STATUS_CHOICES)
+    # versiones redimensionadas de la imagen: {'<nombre>_<formato>': path}
+    image_renditions = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        # indices para paginar y ordenar por id, precio y tiempo las recetas de cada usuario
+        indexes = [
+            models.Index(fields=['user', 'id'], name='core_recipe_user_id_idx'),
+            models.Index(fields=['user', 'price', 'id'], name='core_recipe_user_price_idx'),
+            models.Index(fields=['user', 'time_minutes', 'id'], name='core_recipe_user_time_idx'),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class ImageBlob(models.Model):
+    # imagen guardada por el hash de su contenido, compartida entre recetas
+    digest = models.CharField(max_length=64, unique=True)
+    path = models.CharField(max_length=255, unique=True)
+    ref_count = models.PositiveIntegerField(default=0)
+    renditions = models.JSONField(default=dict, blank=True)
+
+    def __str__(self):
+        return self.path
+
+
+class CatalogStats(models.Model):
+    # contadores del catalogo de cada usuario, mantenidos en cada escritura
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='catalog_stats'
+    )
+    recipe_count = models.IntegerField(default=0)
+    tag_count = models.IntegerField(default=0)
+    ingredient_count = models.IntegerField(default=0)
+    price_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    time_total = models.BigIntegerField(default=0)
+    # filas de las relaciones receta-tag y receta-ingrediente
+    tag_links = models.IntegerField(default=0)
+    ingredient_links = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f'stats for user {self.user_id}'
@@ -0,0 +1,205 @@
+import contextlib
+import contextvars
+import threading
+import time
+
+from django.conf import settings
+from rest_framework import serializers
+
+from core import dbmetrics
+
+# limites superiores (segundos) de los histogramas de latencia por vista
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_lock = threading.Lock()
+_views = {}
+_statuses = {}
+
+_current = contextvars.ContextVar('perf_request_stats', default=None)
+
+
+def enabled():
+    return getattr(settings, 'PERF_METRICS', True)
+
+
+class RequestStats:
+    # tiempos de un request; lo llenan el execute_wrapper y el timer de serializadores
+    __slots__ = ('queries', 'db_time', 'serializer_time', 'serializing')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+def start_request():
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+@contextlib.contextmanager
+def serializing():
+    # suma el tiempo del bloque al serializador del request; los bloques
+    # anidados (serializadores dentro de otros) no se cuentan dos veces
+    stats = _current.get()
+    if stats is None or stats.serializing:
+        yield
+        return
+    stats.serializing = True
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.serializer_time += time.perf_counter() - start
+        stats.serializing = False
+
+
+def _timed_data(prop):
+    def data(self):
+        with serializing():
+            return prop.fget(self)
+    data.perf_timed = True
+    return property(data)
+
+
+def install_serializer_timer():
+    # .data es donde DRF convierte instancias a primitivos: se mide el de
+    # Serializer y ListSerializer (los anidados usan to_representation)
+    for serializer_class in (serializers.Serializer, serializers.ListSerializer):
+        prop = serializer_class.__dict__['data']
+        if not getattr(prop.fget, 'perf_timed', False):
+            serializer_class.data = _timed_data(prop)
+
+
+def view_labels(view_func, method):
+    # (vista, accion) de un view de Django o DRF; en los viewsets la accion
+    # es la del router (list, retrieve, upsert...), en otros el metodo HTTP
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return getattr(view_func, '__name__', type(view_func).__name__), method.lower()
+    actions = getattr(view_func, 'actions', None) or {}
+    return view_class.__name__, actions.get(method.lower(), method.lower())
+
+
+def _observe(buckets, value):
+    for index, bound in enumerate(BUCKETS):
+        if value <= bound:
+            buckets[index] += 1
+            break
+
+
+def record(labels, status_code, duration, stats, size):
+    with _lock:
+        metrics = _views.get(labels)
+        if metrics is None:
+            metrics = _views[labels] = {
+                'count': 0, 'queries': 0, 'size': 0,
+                'duration': [0.0, [0] * len(BUCKETS)],
+                'db': [0.0, [0] * len(BUCKETS)],
+                'serializer': [0.0, [0] * len(BUCKETS)],
+            }
+        metrics['count'] += 1
+        metrics['queries'] += stats.queries
+        metrics['size'] += size
+        for name, value in (('duration', duration), ('db', stats.db_time), ('serializer', stats.serializer_time)):
+            metrics[name][0] += value
+            _observe(metrics[name][1], value)
+        key = (*labels, str(status_code))
+        _statuses[key] = _statuses.get(key, 0) + 1
+
+
+def reset():
+    with _lock:
+        _views.clear()
+        _statuses.clear()
+
+
+def server_timing(duration, stats):
+    # valor del header Server-Timing (milisegundos)
+    return (
+        f'total;dur={duration * 1000:.2f}, '
+        f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries", '
+        f'serializer;dur={stats.serializer_time * 1000:.2f}'
+    )
+
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_label_value(value)}"' for name, value in labels.items()) + '}'
+
+
+def _histogram(lines, name, labels, total, buckets, count, bounds=BUCKETS):
+    cumulative = 0
+    for bound, observed in zip(bounds, buckets):
+        cumulative += observed
+        lines.append(f'{name}_bucket{_labels(**labels, le=bound)} {cumulative}')
+    lines.append(f'{name}_bucket{_labels(**labels, le="+Inf")} {count}')
+    lines.append(f'{name}_sum{_labels(**labels)} {total}')
+    lines.append(f'{name}_count{_labels(**labels)} {count}')
+
+
+def render_prometheus():
+    # metricas de este proceso en el formato de texto de Prometheus
+    with _lock:
+        views = sorted(
+            (labels, {key: (value[0], list(value[1])) if isinstance(value, list) else value
+                      for key, value in metrics.items()})
+            for labels, metrics in _views.items()
+        )
+        statuses = sorted(_statuses.items())
+
+    lines = [
+        '# HELP http_requests_total Requests by view, action and status code.',
+        '# TYPE http_requests_total counter',
+    ]
+    for (view, action, status_code), count in statuses:
+        lines.append(f'http_requests_total{_labels(view=view, action=action, status=status_code)} {count}')
+
+    histograms = (
+        ('http_request_duration_seconds', 'duration', 'Wall time of the view and middleware.'),
+        ('http_request_db_duration_seconds', 'db', 'Time spent in database queries per request.'),
+        ('http_request_serializer_duration_seconds', 'serializer', 'Time spent serializing per request.'),
+    )
+    for name, key, description in histograms:
+        lines += [f'# HELP {name} {description}', f'# TYPE {name} histogram']
+        for (view, action), metrics in views:
+            total, buckets = metrics[key]
+            _histogram(lines, name, {'view': view, 'action': action}, total, buckets, metrics['count'])
+
+    counters = (
+        ('http_request_db_queries_total', 'queries', 'Database queries run by requests.'),
+        ('http_response_size_bytes_total', 'size', 'Bytes of non-streaming response bodies.'),
+    )
+    for name, key, description in counters:
+        lines += [f'# HELP {name} {description}', f'# TYPE {name} counter']
+        for (view, action), metrics in views:
+            lines.append(f'{name}{_labels(view=view, action=action)} {metrics[key]}')
+
+    # latencia por alias de base de datos (core.dbmetrics)
+    name = 'db_query_duration_seconds'
+    lines += [f'# HELP {name} Query latency by database alias.', f'# TYPE {name} histogram']
+    for alias, metrics in dbmetrics.snapshot().items():
+        buckets = list(metrics['buckets'].values())[:-1]
+        per_bucket = [count - previous for count, previous in zip(buckets, [0] + buckets)]
+        _histogram(
+            lines, name, {'alias': alias}, metrics['total_ms'] / 1000, per_bucket, metrics['count'],
+            bounds=dbmetrics.BUCKETS,
+        )
+
+    return '\n'.join(lines) + '\n'
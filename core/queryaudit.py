@@ -0,0 +1,124 @@
+import collections
+import contextlib
+import logging
+import os
+import re
+import sys
+import time
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.fields import Field
+
+logger = logging.getLogger(__name__)
+
+_SAVEPOINT = re.compile(r'SAVEPOINT "[^"]*"')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN \(\s*\?(?:\s*,\s*\?)+\s*\)', re.IGNORECASE)
+_ROWS = re.compile(r'(\([^()]*\))(?:\s*,\s*\1)+')
+_SPACES = re.compile(r'\s+')
+_TRANSACTION = re.compile(r'\s*(?:BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE)\b', re.IGNORECASE)
+
+# modulos del proyecto que envuelven la ejecucion de queries, no son el origen
+WRAPPER_MODULES = ('core/backends/', 'core/dbmetrics.py', 'core/perf.py', 'core/queryaudit.py', 'core/testing.py')
+
+
+def enabled():
+    # pensado para desarrollo y staging: mide cada query y recorre el stack
+    # de las que se reportan; sin valor sigue a DEBUG, que el runner de tests apaga
+    audit = getattr(settings, 'QUERY_AUDIT', None)
+    return settings.DEBUG if audit is None else audit
+
+
+def fingerprint(sql):
+    # forma de la query sin valores: literales y placeholders como ?, listas
+    # IN (...) y filas de VALUES de cualquier largo iguales entre si
+    sql = _SAVEPOINT.sub('SAVEPOINT ?', sql)
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql.replace('%s', '?'))
+    sql = _IN_LIST.sub('IN (?, ...)', sql)
+    sql = _ROWS.sub(r'\1, ...', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def origin(frame):
+    # campo de serializador que disparo la query (Serializer.campo) o, fuera de
+    # los serializadores, la primera linea del proyecto en el stack
+    base_dir = str(settings.BASE_DIR) + os.sep
+    location = None
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        field = frame.f_locals.get('self')
+        if isinstance(field, Field) and field.field_name and field.parent is not None:
+            return f'{type(field.parent).__name__}.{field.field_name}'
+        if (
+            location is None and filename.startswith(base_dir)
+            and f'{os.sep}site-packages{os.sep}' not in filename
+        ):
+            path = os.path.relpath(filename, base_dir).replace(os.sep, '/')
+            if not path.startswith(WRAPPER_MODULES):
+                location = f'{path}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return location or 'unknown'
+
+
+class QueryAudit:
+    # execute_wrapper que agrupa las queries de un request por fingerprint y
+    # guarda de donde vienen las repetidas (N+1) y las lentas
+
+    def __init__(self, repeat_threshold=None, slow_ms=None):
+        if repeat_threshold is None:
+            repeat_threshold = getattr(settings, 'QUERY_AUDIT_REPEAT_THRESHOLD', 3)
+        if slow_ms is None:
+            slow_ms = getattr(settings, 'QUERY_AUDIT_SLOW_MS', 100)
+        self.repeat_threshold = repeat_threshold
+        self.slow_seconds = slow_ms / 1000
+        self.counts = collections.Counter()
+        self.repeated = {}
+        self.slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if _TRANSACTION.match(sql):
+            # los savepoints de cada atomic() se repiten por diseño, no son N+1
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            key = fingerprint(sql)
+            self.counts[key] += 1
+            if self.counts[key] == self.repeat_threshold:
+                self.repeated[key] = origin(sys._getframe(1))
+            if elapsed >= self.slow_seconds:
+                self.slow.append((key, elapsed, origin(sys._getframe(1))))
+
+    @contextlib.contextmanager
+    def capture(self, aliases=None):
+        with contextlib.ExitStack() as stack:
+            for alias in connections if aliases is None else aliases:
+                stack.enter_context(connections[alias].execute_wrapper(self))
+            yield self
+
+    def report(self, label):
+        # un warning por forma repetida y por query lenta
+        for key, source in self.repeated.items():
+            logger.warning('Repeated query (%d times) in %s from %s: %s', self.counts[key], label, source, key)
+        for key, elapsed, source in self.slow:
+            logger.warning('Slow query (%.1f ms) in %s from %s: %s', elapsed * 1000, label, source, key)
+
+
+class QueryAuditMixin:
+    # con QUERY_AUDIT audita las queries de cada request a la vista
+
+    def dispatch(self, request, *args, **kwargs):
+        if not enabled():
+            return super().dispatch(request, *args, **kwargs)
+
+        audit = QueryAudit()
+        with audit.capture():
+            response = super().dispatch(request, *args, **kwargs)
+        action = getattr(self, 'action', None) or request.method.lower()
+        audit.report(f'{type(self).__name__}.{action}')
+        return response
@@ -0,0 +1,98 @@
+import contextvars
+import random
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+from core.caches import is_shared
+
+# apps cuyos modelos pueden leerse de una replica
+ROUTED_APPS = {'core'}
+
+_read_alias = contextvars.ContextVar('replica_read_alias', default=None)
+
+
+def get_replicas():
+    # aliases de DATABASES que son replicas de lectura de la base principal
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def get_read_alias():
+    return _read_alias.get()
+
+
+def _pin_cache_alias():
+    return getattr(settings, 'REPLICA_PIN_CACHE_ALIAS', 'default')
+
+
+def _pin_cache():
+    return caches[_pin_cache_alias()]
+
+
+def replicas_enabled():
+    # sin un cache de pins compartido otro worker no veria el pin de una
+    # escritura y leeria de la replica: todas las lecturas van a la principal
+    return bool(get_replicas()) and is_shared(_pin_cache_alias())
+
+
+def _pin_key(user_id):
+    return f'replica_pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    # las lecturas del usuario van a la base principal durante REPLICA_PIN_SECONDS,
+    # el tiempo que puede tardar una replica en recibir su escritura
+    _pin_cache().set(_pin_key(user_id), 1, getattr(settings, 'REPLICA_PIN_SECONDS', 5))
+
+
+def is_pinned(user_id):
+    return _pin_cache().get(_pin_key(user_id)) is not None
+
+
+class PrimaryReplicaRouter:
+    # escrituras a la base principal; lecturas de los modelos de core a la
+    # replica elegida para el request (ver ReplicaReadMixin)
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in ROUTED_APPS:
+            return get_read_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label in ROUTED_APPS:
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+class ReplicaReadMixin:
+    # list y retrieve leen de una replica, salvo para usuarios que escribieron
+    # hace poco; una escritura exitosa fija al usuario a la base principal
+    replica_actions = ('list', 'retrieve')
+
+    def dispatch(self, request, *args, **kwargs):
+        token = _read_alias.set(None)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if replicas_enabled() and self.action in self.replica_actions and not is_pinned(request.user.id):
+            _read_alias.set(random.choice(get_replicas()))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if (
+            request.method not in SAFE_METHODS and response.status_code < 400
+            and request.user.is_authenticated and replicas_enabled()
+        ):
+            pin_to_primary(request.user.id)
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,92 @@
+import collections
+import contextlib
+import json
+import os
+import sys
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.utils.module_loading import import_string
+
+from core.queryaudit import fingerprint
+
+# con QUERY_BUDGET_UPDATE=1 los tests guardan sus queries como nuevo presupuesto
+UPDATE_ENV = 'QUERY_BUDGET_UPDATE'
+
+
+class QueryCounter:
+    # execute_wrapper que cuenta queries por fingerprint
+
+    def __init__(self):
+        self.counts = collections.Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.counts[fingerprint(sql)] += 1
+        return execute(sql, params, many, context)
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+
+class QueryBudgetMixin:
+    # falla el test si su metodo hace mas queries que las registradas en
+    # query_budgets.json (junto al modulo del test). Los tests sin presupuesto
+    # no fallan; QUERY_BUDGET_UPDATE=1 reescribe los presupuestos de los tests
+    # que corren (sin --parallel). Antes de cada clase se llaman las funciones
+    # de QUERY_BUDGET_WARMUPS, que llenan caches de proceso (como el backend
+    # de busqueda) para que el conteo no dependa del orden de los tests
+    query_budget_file = 'query_budgets.json'
+
+    @classmethod
+    def query_budget_path(cls):
+        return Path(sys.modules[cls.__module__].__file__).parent / cls.query_budget_file
+
+    @classmethod
+    def load_query_budgets(cls):
+        path = cls.query_budget_path()
+        if not path.exists():
+            return {}
+        return json.loads(path.read_text())
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for warmup in getattr(settings, 'QUERY_BUDGET_WARMUPS', []):
+            import_string(warmup)()
+        cls.query_budgets = cls.load_query_budgets()
+        cls.recorded_queries = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        if os.environ.get(UPDATE_ENV) and cls.recorded_queries:
+            budgets = {**cls.load_query_budgets(), **cls.recorded_queries}
+            cls.query_budget_path().write_text(json.dumps(dict(sorted(budgets.items())), indent=2) + '\n')
+        super().tearDownClass()
+
+    def query_budget_key(self):
+        return f'{self.__module__.rsplit(".", 1)[-1]}.{type(self).__name__}.{self._testMethodName}'
+
+    def _callTestMethod(self, method):
+        # solo se cuentan las queries del metodo del test, no las de setUp
+        counter = QueryCounter()
+        with contextlib.ExitStack() as stack:
+            for alias in self.databases:
+                stack.enter_context(connections[alias].execute_wrapper(counter))
+            super()._callTestMethod(method)
+
+        key = self.query_budget_key()
+        if os.environ.get(UPDATE_ENV):
+            self.recorded_queries[key] = counter.total
+            return
+
+        budget = self.query_budgets.get(key)
+        if budget is not None and counter.total > budget:
+            shapes = '\n'.join(
+                f'  {count} x {shape[:200]}' for shape, count in counter.counts.most_common(5)
+            )
+            self.fail(
+                f'{key} ran {counter.total} queries, over its budget of {budget} '
+                f'(update with {UPDATE_ENV}=1 if expected). Most frequent:\n{shapes}'
+            )
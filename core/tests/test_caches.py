@@ -0,0 +1,22 @@
+from django.test import SimpleTestCase, override_settings
+
+from core.caches import is_shared
+
+LOCMEM = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+FILE = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/tmp/core-caches-test'}
+
+
+class SharedCacheTests(SimpleTestCase):
+    # probar que caches se consideran compartidos entre procesos
+
+    @override_settings(CACHES={'default': LOCMEM}, CACHE_SINGLE_PROCESS=False)
+    def test_local_memory_not_shared(self):
+        self.assertFalse(is_shared('default'))
+
+    @override_settings(CACHES={'default': LOCMEM}, CACHE_SINGLE_PROCESS=True)
+    def test_local_memory_single_process(self):
+        self.assertTrue(is_shared('default'))
+
+    @override_settings(CACHES={'default': LOCMEM, 'shared': FILE}, CACHE_SINGLE_PROCESS=False)
+    def test_other_backends_shared(self):
+        self.assertTrue(is_shared('shared'))
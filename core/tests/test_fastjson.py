@@ -0,0 +1,106 @@
+import datetime
+import io
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core import fastjson
+from core.fastjson import FastJSONRenderer, FastJSONParser
+
+BACKENDS = [fastjson.BACKEND_JSON]
+if fastjson.orjson is not None:
+    BACKENDS.append(fastjson.BACKEND_ORJSON)
+if fastjson.msgspec is not None:
+    BACKENDS.append(fastjson.BACKEND_MSGSPEC)
+
+
+class FastJSONTests(SimpleTestCase):
+    # probar que el renderer y parser rapidos equivalen a los de DRF
+
+    payload = {
+        'id': 1,
+        'title': 'Jalapeño "picante" \u2028',
+        'price': Decimal('12.50'),
+        'created': datetime.datetime(2022, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc),
+        'day': datetime.date(2022, 1, 2),
+        'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'detail': _('Not found.'),
+        'tags': [{'id': 2, 'name': 'Vegan'}],
+        'counts': {3: 1},
+        'big': 2 ** 70,
+        'empty': None,
+    }
+
+    def test_render_matches_drf(self):
+        # probar que cada backend produce los mismos bytes que JSONRenderer
+        expected = JSONRenderer().render(self.payload)
+
+        for backend in BACKENDS:
+            with self.subTest(backend=backend), override_settings(API_JSON_BACKEND=backend):
+                self.assertEqual(FastJSONRenderer().render(self.payload), expected)
+
+    def test_render_indent_uses_drf(self):
+        # probar que la salida indentada (API navegable) sigue siendo la de DRF
+        context = {'indent': 4}
+
+        self.assertEqual(
+            FastJSONRenderer().render(self.payload, renderer_context=context),
+            JSONRenderer().render(self.payload, renderer_context=context),
+        )
+
+    def test_parse(self):
+        # probar parsear cuerpos json con cada backend
+        for backend in BACKENDS:
+            with self.subTest(backend=backend), override_settings(API_JSON_BACKEND=backend):
+                data = FastJSONParser().parse(io.BytesIO('{"name": "Ñame", "ids": [1, 2]}'.encode()))
+                self.assertEqual(data, {'name': 'Ñame', 'ids': [1, 2]})
+
+    def test_parse_invalid(self):
+        # probar que json invalido o NaN lanzan ParseError
+        for backend in BACKENDS:
+            for body in (b'{"name": ', b'{"price": NaN}'):
+                with self.subTest(backend=backend, body=body), override_settings(API_JSON_BACKEND=backend):
+                    with self.assertRaises(ParseError):
+                        FastJSONParser().parse(io.BytesIO(body))
+
+    def test_missing_backend_falls_back(self):
+        # probar que un backend no instalado usa json de la libreria estandar
+        with override_settings(API_JSON_BACKEND='msgspec'):
+            expected = fastjson.BACKEND_MSGSPEC if fastjson.msgspec is not None else fastjson.BACKEND_JSON
+            self.assertEqual(fastjson.get_backend(), expected)
+
+
+class FastJSONApiTests(TestCase):
+    # probar el renderer y parser en el API
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('test@mail.com', 'pass123')
+        self.client.force_authenticate(self.user)
+
+    def test_json_request_and_response(self):
+        # probar crear y listar recetas con json
+        url = reverse('recipe:recipe-list')
+        payload = {'title': 'Soup', 'time_minutes': 10, 'price': '2.50', 'tags': [], 'ingredients': []}
+
+        res = self.client.post(url, payload, format='json')
+        self.assertEqual(res.status_code, 201)
+
+        res = self.client.get(url)
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(res.json()[0]['price'], '2.50')
+
+    def test_browsable_api(self):
+        # probar que el API navegable sigue funcionando
+        res = self.client.get(reverse('recipe:tag-list'), HTTP_ACCEPT='text/html')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b'<html', res.content)
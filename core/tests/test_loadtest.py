@@ -0,0 +1,25 @@
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import LiveServerTestCase
+from rest_framework.authtoken.models import Token
+
+
+class LoadTestCommandTests(LiveServerTestCase):
+    # probar el comando de prueba de carga contra un servidor real
+
+    def test_loadtest_reports_latencies(self):
+        # probar que se reportan throughput, percentiles y codigos de respuesta
+        user = get_user_model().objects.create_user('test@mail.com', 'pass123')
+        token = Token.objects.create(user=user)
+        out = io.StringIO()
+
+        call_command(
+            'loadtest_api', self.live_server_url, '--path', '/api/recipe/recipes/', '--path', '/api/recipe/tags/',
+            token=token.key, concurrency=4, requests=20, stdout=out,
+        )
+
+        self.assertIn('req/s', out.getvalue())
+        self.assertIn('p99', out.getvalue())
+        self.assertIn("status {200: 20}", out.getvalue())
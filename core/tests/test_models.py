@@ -1,3 +1,4 @@
+from django.db import IntegrityError
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 
@@ -55,6 +56,23 @@ class ModelTest(TestCase):
 
         self.assertEqual(str(ingredient), ingredient.name)
 
+    def test_tag_name_unique_per_user(self):
+        # probar que un usuario no puede repetir un nombre sin distinguir mayusculas
+        user = sample_user()
+        models.Tag.objects.create(user=user, name='Vegan')
+        models.Tag.objects.create(user=sample_user('other@email.com'), name='Vegan')
+
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.create(user=user, name='VEGAN')
+
+    def test_tag_name_unique_non_ascii(self):
+        # probar que las mayusculas fuera de ASCII tambien se comparan
+        user = sample_user()
+        models.Tag.objects.create(user=user, name='JALAPEÑO')
+
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.bulk_create([models.Tag(user=user, name='jalapeño')])
+
     def test_recipe_str(self):
         # probar representacion en cadena de texto de las recetas 
         recipe = models.Recipe.objects.create(user=sample_user(), title='Titulo de receta', time_minutes=5, price=5.00)
@@ -0,0 +1,127 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core import perf
+from core.models import Recipe, Tag
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+METRICS_URL = reverse('metrics')
+
+
+def sample_value(body, name, **labels):
+    # valor de una serie en el texto de Prometheus
+    selector = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf'^{re.escape(name)}\{{{re.escape(selector)}\}} (\S+)$', body, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+@override_settings(PERF_METRICS_TOKEN='secret')
+class PerformanceMiddlewareTests(TestCase):
+    # probar Server-Timing y las metricas por vista y accion
+
+    def setUp(self):
+        perf.reset()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('test@mail.com', 'pass123')
+        self.client.force_authenticate(self.user)
+        recipe = Recipe.objects.create(user=self.user, title='Soup', time_minutes=5, price=1)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+    def metrics(self, **headers):
+        headers.setdefault('HTTP_AUTHORIZATION', 'Bearer secret')
+        res = self.client.get(METRICS_URL, **headers)
+        return res, res.content.decode()
+
+    def test_server_timing_header(self):
+        # probar que la respuesta trae tiempo total, de queries y de serializacion
+        res = self.client.get(RECIPES_URL, HTTP_CACHE_CONTROL='no-cache')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        timing = res['Server-Timing']
+        self.assertRegex(timing, r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries", serializer;dur=[\d.]+$')
+        queries = int(re.search(r'"(\d+) queries"', timing).group(1))
+        self.assertGreater(queries, 0)
+
+    def test_metrics_by_viewset_action(self):
+        # probar que las metricas se agrupan por viewset y accion del router
+        self.client.get(RECIPES_URL, HTTP_CACHE_CONTROL='no-cache')
+        self.client.get(RECIPES_URL, HTTP_CACHE_CONTROL='no-cache')
+        self.client.post(TAGS_URL + 'upsert/', ['Vegan'], format='json')
+
+        res, body = self.metrics()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/plain; version=0.0.4'))
+        labels = {'view': 'RecipeViewSet', 'action': 'list'}
+        self.assertEqual(sample_value(body, 'http_requests_total', **labels, status='200'), 2)
+        self.assertEqual(sample_value(body, 'http_request_duration_seconds_count', **labels), 2)
+        self.assertEqual(sample_value(body, 'http_request_duration_seconds_bucket', **labels, le='+Inf'), 2)
+        self.assertGreater(sample_value(body, 'http_request_db_queries_total', **labels), 0)
+        self.assertGreater(sample_value(body, 'http_request_serializer_duration_seconds_sum', **labels), 0)
+        self.assertGreater(sample_value(body, 'http_response_size_bytes_total', **labels), 0)
+        self.assertEqual(
+            sample_value(body, 'http_requests_total', view='TagViewSet', action='upsert', status='200'), 1,
+        )
+        self.assertIsNotNone(sample_value(body, 'db_query_duration_seconds_count', alias='default'))
+
+    def test_serializer_time_not_counted_twice(self):
+        # probar que los serializadores anidados no suman su tiempo otra vez
+        stats, token = perf.start_request()
+        try:
+            with perf.serializing():
+                with perf.serializing():
+                    pass
+                nested = stats.serializer_time
+        finally:
+            perf.end_request(token)
+
+        self.assertEqual(nested, 0)
+        self.assertGreater(stats.serializer_time, 0)
+
+    def test_unmatched_requests(self):
+        # probar que las rutas inexistentes no crean una serie por url
+        self.client.get('/api/does-not-exist/')
+
+        _, body = self.metrics()
+
+        self.assertEqual(sample_value(body, 'http_requests_total', view='unmatched', action='get', status='404'), 1)
+
+    def test_metrics_token(self):
+        # probar que con PERF_METRICS_TOKEN se exige el token
+        res, _ = self.metrics(HTTP_AUTHORIZATION='')
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        res, _ = self.metrics(HTTP_AUTHORIZATION='Bearer other')
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        res, _ = self.metrics(HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(PERF_METRICS_TOKEN=None)
+    def test_metrics_without_token_requires_staff(self):
+        # probar que sin PERF_METRICS_TOKEN solo un usuario staff ve las metricas
+        client = APIClient()
+        self.assertEqual(client.get(METRICS_URL).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        client.force_login(self.user)
+        self.assertEqual(client.get(METRICS_URL).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        staff = get_user_model().objects.create_user('staff@mail.com', 'pass123', is_staff=True)
+        client.force_login(staff)
+        self.assertEqual(client.get(METRICS_URL).status_code, status.HTTP_200_OK)
+
+    @override_settings(PERF_METRICS=False)
+    def test_disabled(self):
+        # probar que sin PERF_METRICS no se mide ni se agrega el header
+        res = self.client.get(RECIPES_URL)
+
+        self.assertNotIn('Server-Timing', res)
+        _, body = self.metrics()
+        self.assertIsNone(sample_value(body, 'http_requests_total', view='RecipeViewSet', action='list', status='200'))
@@ -0,0 +1,152 @@
+import unittest
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import serializers
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from core.queryaudit import QueryAudit, enabled, fingerprint
+from core.testing import QueryBudgetMixin
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class TagNamesSerializer(serializers.ModelSerializer):
+    # serializador con N+1: un query de tags por receta
+    tag_names = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Recipe
+        fields = ('id', 'tag_names')
+
+    def get_tag_names(self, recipe):
+        return [tag.name for tag in recipe.tags.all()]
+
+
+class FingerprintTests(SimpleTestCase):
+    # probar la normalizacion de queries
+
+    def test_values_are_removed(self):
+        # probar que queries con distintos valores tienen la misma forma
+        self.assertEqual(
+            fingerprint('SELECT * FROM "t" WHERE "id" = 12 AND "name" = \'it\'\'s\' LIMIT 21'),
+            'SELECT * FROM "t" WHERE "id" = ? AND "name" = ? LIMIT ?',
+        )
+        self.assertEqual(fingerprint('SELECT * FROM "t1" WHERE "id" = %s'), 'SELECT * FROM "t1" WHERE "id" = ?')
+
+    def test_lists_are_collapsed(self):
+        # probar que IN y VALUES de cualquier largo tienen la misma forma
+        self.assertEqual(
+            fingerprint('SELECT * FROM "t" WHERE "id" IN (%s, %s, %s)'),
+            fingerprint('SELECT * FROM "t" WHERE "id" IN (%s, %s)'),
+        )
+        self.assertEqual(
+            fingerprint('INSERT INTO "t" ("a", "b") VALUES (%s, %s), (%s, %s)'),
+            'INSERT INTO "t" ("a", "b") VALUES (?, ?), ...',
+        )
+        self.assertEqual(fingerprint('SAVEPOINT "s1402_x10"'), 'SAVEPOINT ?')
+
+
+class QueryAuditTests(TestCase):
+    # probar la deteccion de N+1 y queries lentas
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('test@mail.com', 'pass123')
+        for index in range(4):
+            recipe = Recipe.objects.create(user=self.user, title=f'Soup {index}', time_minutes=5, price=1)
+            recipe.tags.add(Tag.objects.create(user=self.user, name=f'Tag {index}'))
+
+    def test_repeated_query_reports_serializer_field(self):
+        # probar que el N+1 se atribuye al campo del serializador
+        audit = QueryAudit(repeat_threshold=3, slow_ms=10000)
+        with audit.capture():
+            TagNamesSerializer(Recipe.objects.all(), many=True).data
+
+        self.assertEqual(len(audit.repeated), 1)
+        (shape, source), = audit.repeated.items()
+        self.assertIn('core_tag', shape)
+        self.assertEqual(audit.counts[shape], 4)
+        self.assertEqual(source, 'TagNamesSerializer.tag_names')
+
+    def test_slow_query_reports_location(self):
+        # probar que fuera de serializadores se reporta la linea del proyecto
+        audit = QueryAudit(repeat_threshold=100, slow_ms=0)
+        with audit.capture():
+            list(Recipe.objects.all())
+
+        (shape, _, source), = audit.slow
+        self.assertTrue(shape.startswith('SELECT'))
+        self.assertTrue(source.startswith('core/tests/test_queryaudit.py:'), source)
+
+    def test_transaction_control_ignored(self):
+        # probar que los savepoints de atomic() repetidos no se reportan
+        audit = QueryAudit(repeat_threshold=3, slow_ms=0)
+        with audit.capture():
+            for index in range(4):
+                with transaction.atomic():
+                    Tag.objects.filter(id=index).update(name=f'Vegan {index}')
+
+        self.assertEqual(len(audit.repeated), 1)
+        self.assertTrue(all(shape.startswith('UPDATE') for shape in audit.counts))
+        self.assertTrue(all(shape.startswith('UPDATE') for shape, _, _ in audit.slow))
+
+    @override_settings(QUERY_AUDIT=None, DEBUG=True)
+    def test_default_follows_debug(self):
+        # probar que sin valor explicito se audita segun DEBUG al momento del request
+        self.assertTrue(enabled())
+        with self.settings(DEBUG=False):
+            self.assertFalse(enabled())
+
+    @override_settings(QUERY_AUDIT=True, QUERY_AUDIT_SLOW_MS=0)
+    def test_views_log_queries(self):
+        # probar que las vistas de recetas registran lo detectado
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with self.assertLogs('core.queryaudit', 'WARNING') as logs:
+            client.get(RECIPES_URL, HTTP_CACHE_CONTROL='no-cache')
+
+        self.assertTrue(any('in RecipeViewSet.list from' in line for line in logs.output))
+
+    @override_settings(QUERY_AUDIT=False)
+    def test_views_disabled(self):
+        # probar que sin QUERY_AUDIT no se registra nada
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with self.assertNoLogs('core.queryaudit', 'WARNING'):
+            client.get(RECIPES_URL, HTTP_CACHE_CONTROL='no-cache')
+
+
+class QueryBudgetMixinTests(TestCase):
+    # probar que el mixin falla los tests que superan su presupuesto
+
+    def run_budget_test(self, budget):
+        class BudgetTest(QueryBudgetMixin, TestCase):
+            @classmethod
+            def load_query_budgets(cls):
+                return {'budget': budget}
+
+            def query_budget_key(self):
+                return 'budget'
+
+            def test_queries(self):
+                list(Tag.objects.all())
+                list(Recipe.objects.all())
+
+        result = unittest.TestResult()
+        unittest.TestSuite([BudgetTest('test_queries')]).run(result)
+        return result
+
+    def test_within_budget(self):
+        self.assertTrue(self.run_budget_test(2).wasSuccessful())
+
+    def test_over_budget(self):
+        result = self.run_budget_test(1)
+
+        self.assertEqual(len(result.failures), 1)
+        self.assertIn('ran 2 queries, over its budget of 1', result.failures[0][1])
@@ -0,0 +1,151 @@
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core import dbmetrics
+from core.models import Recipe, Tag
+from core.routers import PrimaryReplicaRouter, _pin_key, _read_alias, is_pinned, pin_to_primary
+
+REPLICA = 'replica'
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    # retorna receta detail url
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class RouterTests(SimpleTestCase):
+    # probar las decisiones del router
+
+    def test_reads_use_request_alias(self):
+        # probar que solo las lecturas de modelos de core siguen el alias del request
+        router = PrimaryReplicaRouter()
+        self.assertIsNone(router.db_for_read(Recipe))
+
+        token = _read_alias.set(REPLICA)
+        try:
+            self.assertEqual(router.db_for_read(Recipe), REPLICA)
+            self.assertIsNone(router.db_for_read(Token))
+            self.assertEqual(router.db_for_write(Recipe), 'default')
+        finally:
+            _read_alias.reset(token)
+
+    def test_pin_to_primary(self):
+        # probar que el usuario queda fijado por REPLICA_PIN_SECONDS
+        with override_settings(REPLICA_PIN_SECONDS=60):
+            pin_to_primary(123)
+        self.assertTrue(is_pinned(123))
+        self.assertFalse(is_pinned(456))
+        cache.clear()
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA], CACHE_SINGLE_PROCESS=True)
+class ReplicaApiTests(TransactionTestCase):
+    # probar lecturas de replicas y read-your-writes con dos bases SQLite
+    databases = {'default', REPLICA}
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('test@mail.com', 'pass123')
+        self.client.force_authenticate(self.user)
+        Recipe.objects.create(user=self.user, title='Old soup', time_minutes=5, price=1)
+        call_command('sync_replicas', stdout=io.StringIO())
+
+    def titles(self, url=RECIPES_URL):
+        res = self.client.get(url, HTTP_CACHE_CONTROL='no-cache')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [item.get('title', item.get('name')) for item in res.json()]
+
+    def test_list_reads_from_replica(self):
+        # probar que list lee de la replica (que no ve escrituras sin sincronizar)
+        Recipe.objects.create(user=self.user, title='Unsynced', time_minutes=5, price=1)
+        Tag.objects.create(user=self.user, name='Unsynced')
+
+        self.assertEqual(self.titles(), ['Old soup'])
+        self.assertEqual(self.titles(TAGS_URL), [])
+
+        call_command('sync_replicas', stdout=io.StringIO())
+        cache.clear()
+        self.assertEqual(self.titles(), ['Unsynced', 'Old soup'])
+
+    def test_retrieve_reads_from_replica(self):
+        # probar que retrieve de una receta sin sincronizar da 404
+        recipe = Recipe.objects.create(user=self.user, title='Unsynced', time_minutes=5, price=1)
+
+        res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_read_your_writes(self):
+        # probar que despues de crear una receta el usuario lee de la principal
+        payload = {'title': 'New soup', 'time_minutes': 5, 'price': '1.00', 'tags': [], 'ingredients': []}
+        res = self.client.post(RECIPES_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(self.titles(), ['New soup', 'Old soup'])
+        res = self.client.get(detail_url(res.data['id']))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        # vencido el plazo vuelve a leer de la replica
+        cache.clear()
+        self.assertEqual(self.titles(), ['Old soup'])
+
+    def test_replica_reads_bypass_response_cache(self):
+        # probar que lo leido de una replica atrasada no queda en el cache de
+        # respuestas de la version actual
+        payload = {'title': 'New soup', 'time_minutes': 5, 'price': '1.00', 'tags': [], 'ingredients': []}
+        self.client.post(RECIPES_URL, payload, format='json')
+        cache.delete(_pin_key(self.user.id))
+
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual([item['title'] for item in res.json()], ['Old soup'])
+        self.assertNotIn('ETag', res)
+
+        call_command('sync_replicas', stdout=io.StringIO())
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual([item['title'] for item in res.json()], ['New soup', 'Old soup'])
+
+    @override_settings(CACHE_SINGLE_PROCESS=False)
+    def test_local_memory_pin_cache_reads_primary(self):
+        # probar que sin un cache de pins compartido se lee de la principal
+        Recipe.objects.create(user=self.user, title='Unsynced', time_minutes=5, price=1)
+
+        self.assertEqual(self.titles(), ['Unsynced', 'Old soup'])
+
+    def test_failed_write_does_not_pin(self):
+        # probar que un request invalido no fija al usuario
+        res = self.client.post(RECIPES_URL, {'title': ''}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(is_pinned(self.user.id))
+
+    def test_query_metrics_per_alias(self):
+        # probar que las metricas separan las queries de la principal y la replica
+        dbmetrics.reset()
+        self.titles()
+        self.user.is_staff = True
+        self.user.save()
+
+        res = self.client.get(reverse('db-metrics'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertGreater(res.data[REPLICA]['count'], 0)
+        self.assertGreater(res.data['default']['count'], 0)
+        self.assertEqual(res.data[REPLICA]['buckets']['+Inf'], res.data[REPLICA]['count'])
+
+    def test_query_metrics_admin_only(self):
+        # probar que las metricas requieren un usuario staff
+        res = self.client.get(reverse('db-metrics'))
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,163 @@
+import io
+import os
+import tempfile
+import threading
+import time
+
+from django.core.management import call_command
+from django.db.utils import OperationalError
+from django.test import SimpleTestCase, override_settings
+
+from core.backends.sqlite import base
+from core.management.commands.benchmark_sqlite_concurrency import open_connection
+
+ENGINE = 'core.backends.sqlite'
+
+
+class SQLiteBackendTests(SimpleTestCase):
+    # probar pragmas, cola de escritura y health check con un archivo real
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'test.sqlite3')
+        connection = self.connect()
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE TABLE item (id INTEGER PRIMARY KEY, name TEXT)')
+
+    def connect(self):
+        connection = open_connection(ENGINE, self.path)
+        self.addCleanup(connection.close)
+        return connection
+
+    def pragma(self, connection, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        # probar que cada conexion nueva usa WAL y los pragmas configurados
+        connection = self.connect()
+
+        self.assertEqual(self.pragma(connection, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(connection, 'synchronous'), 1)
+        self.assertEqual(self.pragma(connection, 'busy_timeout'), 20000)
+
+        with override_settings(SQLITE_PRAGMAS={'busy_timeout': 500, 'mmap_size': None}):
+            connection = self.connect()
+            self.assertEqual(self.pragma(connection, 'busy_timeout'), 500)
+            self.assertEqual(self.pragma(connection, 'mmap_size'), 0)
+
+    def test_write_transactions_are_serialized(self):
+        # probar que una segunda transaccion espera a que la primera termine
+        first = self.connect()
+        first.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+        with first.cursor() as cursor:
+            cursor.execute("INSERT INTO item (name) VALUES ('first')")
+        events = []
+
+        def second_writer():
+            second = open_connection(ENGINE, self.path)
+            second.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+            events.append('second started')
+            with second.cursor() as cursor:
+                cursor.execute("INSERT INTO item (name) VALUES ('second')")
+            second.commit()
+            second.set_autocommit(True)
+            second.close()
+
+        thread = threading.Thread(target=second_writer)
+        thread.start()
+        time.sleep(0.1)
+        events.append('first committed')
+        first.commit()
+        first.set_autocommit(True)
+        thread.join()
+
+        self.assertEqual(events, ['first committed', 'second started'])
+        self.assertFalse(first.write_queue.locked())
+
+    def test_write_queue_timeout(self):
+        # probar que esperar mas que busy_timeout lanza database is locked
+        first = self.connect()
+        first.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+        errors = []
+
+        def second_writer():
+            second = open_connection(ENGINE, self.path)
+            try:
+                with second.cursor() as cursor:
+                    cursor.execute("INSERT INTO item (name) VALUES ('second')")
+            except OperationalError as exc:
+                errors.append(exc)
+            second.close()
+
+        with override_settings(SQLITE_PRAGMAS={'busy_timeout': 50}):
+            thread = threading.Thread(target=second_writer)
+            thread.start()
+            thread.join()
+        first.rollback()
+        first.set_autocommit(True)
+
+        self.assertIn('database is locked', str(errors[0]))
+        self.assertFalse(first.write_queue.locked())
+
+    def test_autocommit_write_releases_queue(self):
+        # probar que una escritura fuera de transaccion toma y suelta la cola
+        connection = self.connect()
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO item (name) VALUES ('one')")
+            cursor.execute('SELECT COUNT(*) FROM item')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+        self.assertFalse(connection.write_queue.locked())
+
+    def test_read_only_transaction_holds_queue(self):
+        # probar que una transaccion que solo lee tambien toma la cola y que
+        # las lecturas en autocommit no la toman
+        connection = self.connect()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM item')
+        self.assertFalse(connection.write_queue.locked())
+
+        connection.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM item')
+        self.assertTrue(connection.write_queue.locked())
+        connection.commit()
+        connection.set_autocommit(True)
+
+        self.assertFalse(connection.write_queue.locked())
+
+    def test_serialize_writes_disabled(self):
+        # probar que la cola se puede desactivar
+        with override_settings(SQLITE_SERIALIZE_WRITES=False):
+            connection = self.connect()
+
+        self.assertIsNone(connection.write_queue)
+
+    def test_health_check_closes_broken_connection(self):
+        # probar que una conexion persistente rota se descarta
+        connection = self.connect()
+        connection.ensure_connection()
+        connection.close_if_unusable_or_obsolete()
+        self.assertIsNotNone(connection.connection)
+
+        connection.connection.close()
+        connection.close_if_unusable_or_obsolete()
+        self.assertIsNone(connection.connection)
+
+    def test_in_memory_database_has_no_queue(self):
+        # probar que la base en memoria de los tests no usa la cola
+        connection = open_connection(ENGINE, ':memory:')
+
+        self.assertIsNone(connection.write_queue)
+        self.assertEqual(base.get_pragmas()['journal_mode'], 'WAL')
+
+    def test_benchmark_command(self):
+        # probar que el comando compara ambas configuraciones
+        out = io.StringIO()
+        call_command('benchmark_sqlite_concurrency', readers=2, writers=2, duration=0.2, rows=10, stdout=out)
+
+        self.assertIn('plain: reads', out.getvalue())
+        self.assertIn('tuned: reads', out.getvalue())
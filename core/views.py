@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import dbmetrics, perf
+from user.authentication import CachedTokenAuthentication
+
+
+class DatabaseMetricsView(APIView):
+    # latencia de queries por alias de base de datos (principal y replicas) de este proceso
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request, format=None):
+        return Response(dbmetrics.snapshot())
+
+
+def metrics(request):
+    # metricas de este proceso en formato Prometheus; con PERF_METRICS_TOKEN
+    # definido se exige el header Authorization: Bearer <token>, sin el solo
+    # un usuario staff con sesion puede verlas
+    token = getattr(settings, 'PERF_METRICS_TOKEN', None)
+    if token:
+        authorized = constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+    else:
+        authorized = request.user.is_active and request.user.is_staff
+    if not authorized:
+        return HttpResponse(status=401)
+    return HttpResponse(perf.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class RecipeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipe'
+
+    def ready(self):
+        # registrar señales de invalidacion del cache de respuestas
+        from recipe import signals  # noqa: F401
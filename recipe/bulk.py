@@ -0,0 +1,204 @@
+from contextlib import contextmanager
+
+from django.db import IntegrityError, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from core.models import fold_name
+from recipe.caching import bump_version
+from recipe.links import apply_links
+from recipe.stats import MODEL_COUNTERS, contribution, difference, update_stats
+
+
+def _find_names(model, user, names):
+    # objetos del usuario con esos nombres sin distinguir mayusculas (name_folded)
+    folded = {name: fold_name(name) for name in names}
+    rows = model.objects.filter(user=user, name_folded__in=set(folded.values())).only('id', 'name', 'name_folded', 'user')
+    by_folded = {obj.name_folded: obj for obj in rows}
+
+    return {name: by_folded[key] for name, key in folded.items() if key in by_folded}
+
+
+def upsert_names(model, user, names, batch_size=500):
+    # tags o ingredients con esos nombres, creando los que faltan.
+    # Retorna ({nombre: objeto}, ids creados); idempotente y seguro ante escrituras
+    # concurrentes (INSERT que ignora conflictos con la restriccion unica)
+    names = list(dict.fromkeys(names))
+    found = _find_names(model, user, names)
+    missing = {}
+    for name in names:
+        if name not in found:
+            missing.setdefault(fold_name(name), name)
+    if not missing:
+        return found, []
+
+    model.objects.bulk_create(
+        [model(user=user, name=name) for name in missing.values()], batch_size=batch_size, ignore_conflicts=True
+    )
+    existing = {obj.id for obj in found.values()}
+    found = _find_names(model, user, names)
+    created = sorted({obj.id for obj in found.values()} - existing)
+    if created:
+        update_stats(user.id, {MODEL_COUNTERS[model]: len(created)})
+
+    return found, created
+
+
+class BulkModelMixin:
+    # crear, actualizar y borrar varios objetos en un solo request y transaccion
+    bulk_batch_size = 500
+    bulk_max_items = 1000
+
+    def get_bulk_items(self, request):
+        # validar que el payload sea una lista de tamaño permitido
+        items = request.data
+        if not isinstance(items, list):
+            msg = _('Expected a list of items.')
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [msg]})
+        if len(items) > self.bulk_max_items:
+            msg = _('Ensure this list has no more than {max} items.').format(max=self.bulk_max_items)
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [msg]})
+
+        return items
+
+    def _is_id(self, pk):
+        # solo se aceptan ids enteros
+        return isinstance(pk, int) and not isinstance(pk, bool)
+
+    def _split_m2m(self, data):
+        # separar los valores M2M de los campos del modelo
+        return {
+            field: data.pop(field.name)
+            for field in self.queryset.model._meta.many_to_many
+            if field.name in data
+        }
+
+    def _bulk_set_m2m(self, objs_m2m):
+        # insertar en lote las filas de las tablas intermedias M2M
+        for field in self.queryset.model._meta.many_to_many:
+            through = field.remote_field.through
+            source = f'{field.m2m_field_name()}_id'
+            target = f'{field.m2m_reverse_field_name()}_id'
+            changed = [(obj, m2m[field]) for obj, m2m in objs_m2m if field in m2m]
+            if not changed:
+                continue
+
+            through.objects.bulk_create([
+                through(**{source: obj.id, target: pk})
+                for obj, related in changed
+                for pk in {item.pk for item in related}
+            ], batch_size=self.bulk_batch_size)
+
+    @contextmanager
+    def conflicts_as_errors(self):
+        # nombres repetidos dentro del lote violan la restriccion unica
+        try:
+            yield
+        except IntegrityError:
+            msg = _('The items conflict with each other or with existing objects.')
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [msg]})
+
+    def get_bulk_response_data(self, ids):
+        # serializar los objetos escritos en el orden del payload
+        objs = self.get_queryset().in_bulk(ids)
+        return self.get_serializer([objs[pk] for pk in ids], many=True).data
+
+    def before_bulk_write(self, request, ids):
+        # aporte a las estadisticas antes de escribir, para sumar solo la diferencia
+        self._bulk_stats = contribution(self.queryset.model, ids)
+
+    def after_bulk_write(self, request, ids):
+        # bulk_create y bulk_update no envian señales de modelo
+        bump_version(request.user.id)
+        update_stats(
+            request.user.id, difference(contribution(self.queryset.model, ids), getattr(self, '_bulk_stats', {}))
+        )
+
+    @action(methods=['POST'], detail=False, url_path='bulk')
+    def bulk_create(self, request):
+        # crear varios objetos
+        serializer = self.get_serializer(data=self.get_bulk_items(request), many=True)
+        serializer.is_valid(raise_exception=True)
+
+        model = self.queryset.model
+        rows = [dict(item) for item in serializer.validated_data]
+        m2m = [self._split_m2m(row) for row in rows]
+        self.before_bulk_write(request, [])
+        with self.conflicts_as_errors(), transaction.atomic():
+            objs = model.objects.bulk_create(
+                [model(user=request.user, **row) for row in rows], batch_size=self.bulk_batch_size
+            )
+            self._bulk_set_m2m(list(zip(objs, m2m)))
+        self.after_bulk_write(request, [obj.id for obj in objs])
+
+        data = self.get_bulk_response_data([obj.id for obj in objs])
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    @bulk_create.mapping.patch
+    def bulk_update(self, request):
+        # actualizar parcialmente varios objetos identificados por id
+        items = self.get_bulk_items(request)
+        ids = [item.get('id') if isinstance(item, dict) else None for item in items]
+        instances = self.get_queryset().prefetch_related(None).in_bulk([pk for pk in ids if self._is_id(pk)])
+
+        updates, errors, seen = [], [], set()
+        for item, pk in zip(items, ids):
+            if not self._is_id(pk) or pk not in instances or pk in seen:
+                errors.append({'id': [_('Object not found or repeated.')]})
+                continue
+
+            seen.add(pk)
+            serializer = self.get_serializer(
+                instances[pk], data=item, partial=True, context={**self.get_serializer_context(), 'bulk': True},
+            )
+            if serializer.is_valid():
+                updates.append(serializer)
+                errors.append({})
+            else:
+                errors.append(serializer.errors)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        fields, objs_m2m = set(), []
+        for serializer in updates:
+            row = dict(serializer.validated_data)
+            objs_m2m.append((serializer.instance, self._split_m2m(row)))
+            for key, value in row.items():
+                setattr(serializer.instance, key, value)
+            fields.update(row)
+
+        self.before_bulk_write(request, [serializer.instance.id for serializer in updates])
+        with self.conflicts_as_errors(), transaction.atomic():
+            if fields:
+                self.queryset.model.objects.bulk_update(
+                    [serializer.instance for serializer in updates], fields, batch_size=self.bulk_batch_size
+                )
+            # solo las filas M2M que cambian
+            apply_links([
+                (obj.id, field.name, [item.pk for item in related])
+                for obj, m2m in objs_m2m
+                for field, related in m2m.items()
+            ], batch_size=self.bulk_batch_size)
+        self.after_bulk_write(request, [serializer.instance.id for serializer in updates])
+
+        return Response(self.get_bulk_response_data([serializer.instance.id for serializer in updates]))
+
+    @bulk_create.mapping.delete
+    def bulk_destroy(self, request):
+        # borrar varios objetos por id
+        ids = self.get_bulk_items(request)
+        found = set(
+            self.get_queryset().filter(id__in=[pk for pk in ids if self._is_id(pk)]).values_list('id', flat=True)
+        )
+        errors = [{} if self._is_id(pk) and pk in found else {'id': [_('Object not found.')]} for pk in ids]
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        with transaction.atomic():
+            self.queryset.model.objects.filter(id__in=found).delete()
+        bump_version(request.user.id)
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
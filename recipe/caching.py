@@ -0,0 +1,99 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+
+from core.caches import is_shared
+from core.routers import get_read_alias
+
+
+def cache_alias():
+    return getattr(settings, 'RECIPE_RESPONSE_CACHE_ALIAS', 'default')
+
+
+def get_cache():
+    return caches[cache_alias()]
+
+
+def _version_key(user_id):
+    return f'recipe_version:{user_id}'
+
+
+def reset_version(user_id):
+    # version inicial basada en el tiempo, no repite versiones ya usadas
+    get_cache().set(_version_key(user_id), time.time_ns(), None)
+
+
+def get_version(user_id):
+    # version actual de los datos de recetas, tags e ingredientes del usuario
+    cache = get_cache()
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        cache.add(_version_key(user_id), time.time_ns(), None)
+        version = cache.get(_version_key(user_id))
+
+    return version
+
+
+def bump_version(user_id):
+    # invalidar las respuestas en cache del usuario una vez confirmada la
+    # transaccion: antes del commit un lector concurrente tomaria la version
+    # nueva y guardaria bajo ella las filas viejas
+    transaction.on_commit(lambda: _increment_version(user_id))
+
+
+def _increment_version(user_id):
+    try:
+        get_cache().incr(_version_key(user_id))
+    except ValueError:
+        reset_version(user_id)
+
+
+class CachedResponseMixin:
+    # respuestas GET en cache por usuario con ETag y If-None-Match
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        # solo se cachea el formato json, el browsable API no es estable byte a
+        # byte; una replica puede no tener las ultimas escrituras, lo que lee
+        # no se guarda bajo la version actual ni se valida con su ETag
+        # con un cache por proceso la version que sube un worker no llega a
+        # los demas, que responderian 304 con datos viejos: no se cachea
+        if (
+            request.accepted_renderer.format != 'json' or get_read_alias() is not None
+            or not is_shared(cache_alias())
+        ):
+            return handler(request, *args, **kwargs)
+
+        # el media type negociado (con parametros como indent) cambia los bytes
+        version = get_version(request.user.id)
+        key = 'recipe_response:' + hashlib.sha256(
+            f'{request.user.id}:{version}:{request.accepted_media_type}:{request.get_full_path()}'.encode()
+        ).hexdigest()
+        etag = f'"{key[-40:]}"'
+
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            cache = get_cache()
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+            else:
+                response = handler(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+
+                timeout = getattr(settings, 'RECIPE_RESPONSE_CACHE_TIMEOUT', 300)
+                response.add_post_render_callback(
+                    lambda rendered: cache.set(key, (rendered.content, rendered['Content-Type']), timeout)
+                )
+
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
@@ -0,0 +1,52 @@
+import csv
+
+from rest_framework.renderers import BaseRenderer
+
+from core.fastjson import dumps
+from recipe.readers import iter_recipe_data, recipe_rows
+
+CSV_HEADER = ('id', 'title', 'time_minutes', 'price', 'link', 'tags', 'ingredients')
+
+
+class NDJSONRenderer(BaseRenderer):
+    # una receta json por linea; solo se usa para negociar el formato y errores
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return dumps(data) + b'\n'
+
+
+class CSVRenderer(NDJSONRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class Echo:
+    # buffer que retorna lo escrito, para usar csv.writer en streaming
+    def write(self, value):
+        return value
+
+
+def iter_recipes(queryset, chunk_size=1000):
+    # recorrer recetas con un cursor por lotes, precargando relaciones por lote
+    rows = recipe_rows(queryset).iterator(chunk_size=chunk_size)
+    return iter_recipe_data(rows, nested=True, chunk_size=chunk_size)
+
+
+def ndjson_stream(recipes):
+    for recipe in recipes:
+        yield dumps(recipe) + b'\n'
+
+
+def csv_stream(recipes):
+    # tags e ingredients como nombres separados por ';'
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    for recipe in recipes:
+        yield writer.writerow((
+            recipe['id'], recipe['title'], recipe['time_minutes'], recipe['price'], recipe['link'],
+            ';'.join(tag['name'] for tag in recipe['tags']),
+            ';'.join(ingredient['name'] for ingredient in recipe['ingredients']),
+        ))
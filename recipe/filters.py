@@ -0,0 +1,134 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Count, Exists, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers
+from rest_framework.filters import OrderingFilter
+
+from core.models import Recipe
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+MATCH_CHOICES = (MATCH_ANY, MATCH_ALL)
+
+
+def params_to_ints(value, param):
+    # convertir lista str separada por comas a int
+    try:
+        return sorted({int(str_id) for str_id in value.split(',') if str_id.strip()})
+    except ValueError:
+        msg = _('Expected a comma separated list of ids.')
+        raise serializers.ValidationError({param: msg}, code='invalid')
+
+
+def get_match(query_params):
+    # obtener el modo de coincidencia (any/all) de los parametros
+    match = query_params.get('match', MATCH_ANY)
+    if match not in MATCH_CHOICES:
+        msg = _('Expected one of: any, all.')
+        raise serializers.ValidationError({'match': msg}, code='invalid')
+
+    return match
+
+
+def relation_links(relation):
+    # filas de la tabla intermedia de la relacion M2M y su columna de tag/ingredient
+    field = Recipe._meta.get_field(relation).m2m_reverse_field_name()
+    return getattr(Recipe, relation).through.objects.all(), field
+
+
+def matching_recipe_ids(relation, ids, match=MATCH_ANY):
+    # subconsulta de ids de receta sobre la tabla intermedia de la relacion M2M
+    # (semi-join, no duplica filas de receta ni necesita DISTINCT)
+    links, field = relation_links(relation)
+    links = links.filter(**{f'{field}__in': ids})
+
+    if match == MATCH_ALL:
+        # agrupar por receta y quedarse con las que tienen todos los ids
+        links = links.values('recipe_id').annotate(matched=Count(field)).filter(matched=len(ids))
+
+    return links.values('recipe_id')
+
+
+def assigned_to_recipe(relation):
+    # EXISTS sobre la tabla intermedia: tags/ingredients usados en alguna receta
+    # sin unir todas las filas de la relacion ni deduplicar con DISTINCT
+    links, field = relation_links(relation)
+    return Exists(links.filter(**{field: OuterRef('pk')}))
+
+
+def recipe_count(relation):
+    # cantidad de recetas de cada tag/ingredient, contada sobre el indice (tag, recipe)
+    links, field = relation_links(relation)
+    counts = links.filter(**{field: OuterRef('pk')}).values(field).annotate(count=Count('recipe_id')).values('count')
+    return Coalesce(Subquery(counts), 0)
+
+
+def param_to_number(query_params, param, parse):
+    # convertir un parametro numerico, None si no se envio
+    value = query_params.get(param)
+    if value in (None, ''):
+        return None
+
+    try:
+        return parse(value)
+    except (ValueError, InvalidOperation):
+        msg = _('A valid number is required.')
+        raise serializers.ValidationError({param: msg}, code='invalid')
+
+
+def param_to_flag(query_params, param):
+    # parametro 0/1, False si no se envio
+    value = param_to_number(query_params, param, int)
+    if value not in (None, 0, 1):
+        msg = _('Expected 0 or 1.')
+        raise serializers.ValidationError({param: msg}, code='invalid')
+
+    return bool(value)
+
+
+def ordering_terms(query_params):
+    # campos de ?ordering= sin el signo de orden descendente
+    value = query_params.get(StableOrderingFilter.ordering_param, '')
+    return {term.strip().lstrip('-') for term in value.split(',') if term.strip()}
+
+
+def filter_recipes(queryset, query_params):
+    # filtrar recetas por tags e ingredients segun el modo de coincidencia,
+    # y por rangos de precio y tiempo
+    match = get_match(query_params)
+
+    for param, lookup, parse in (
+        ('price_min', 'price__gte', Decimal),
+        ('price_max', 'price__lte', Decimal),
+        ('time_max', 'time_minutes__lte', int),
+    ):
+        value = param_to_number(query_params, param, parse)
+        if value is not None:
+            queryset = queryset.filter(**{lookup: value})
+
+    for relation in ('tags', 'ingredients'):
+        ids = params_to_ints(query_params.get(relation, ''), relation)
+        if ids:
+            queryset = queryset.filter(id__in=matching_recipe_ids(relation, ids, match))
+
+    return queryset
+
+
+class StableOrderingFilter(OrderingFilter):
+    # ordenamiento por ?ordering= con desempate por id, para paginar de forma estable
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super().get_ordering(request, queryset, view) or self.get_default_ordering(view))
+        if not any(field.lstrip('-') == 'id' for field in ordering):
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+
+        return tuple(ordering)
+
+    def filter_queryset(self, request, queryset, view):
+        # sin ?ordering= se mantiene el orden de get_queryset (por ejemplo el ranking de busqueda)
+        if not request.query_params.get(self.ordering_param):
+            return queryset
+
+        return queryset.order_by(*self.get_ordering(request, queryset, view))
@@ -0,0 +1,208 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import io
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from PIL import Image, ImageOps
+
+from core.models import Recipe, ImageBlob
+from recipe.caching import bump_version
+
+logger = logging.getLogger(__name__)
+
+# nombre: tamaño maximo (ancho, alto)
+RENDITION_SIZES = {
+    'thumbnail': (200, 200),
+    'medium': (800, 800),
+}
+RENDITION_FORMATS = {
+    'webp': 'WEBP',
+    'jpeg': 'JPEG',
+}
+IMAGES_DIR = 'uploads/recipe/'
+RENDITIONS_DIR = 'uploads/recipe/renditions/'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    # pool de hilos compartido, creado al primer uso
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMAGE_PROCESSING_WORKERS', 2),
+                thread_name_prefix='recipe-images',
+            )
+    return _executor
+
+
+def enqueue_recipe_image(recipe_id):
+    # procesar la imagen en segundo plano una vez confirmada la transaccion
+    if not getattr(settings, 'IMAGE_PROCESSING_ASYNC', True):
+        process_recipe_image(recipe_id)
+        return
+
+    transaction.on_commit(lambda: get_executor().submit(_process_in_worker, recipe_id))
+
+
+def _process_in_worker(recipe_id):
+    close_old_connections()
+    try:
+        process_recipe_image(recipe_id)
+    finally:
+        close_old_connections()
+
+
+def render_image(image, size, fmt):
+    # redimensionar y recodificar sin metadatos (EXIF, ICC, etc)
+    rendition = ImageOps.exif_transpose(image)
+    rendition = rendition.convert('RGB')
+    rendition.thumbnail(size)
+    buffer = io.BytesIO()
+    rendition.save(buffer, format=fmt, quality=85)
+    return buffer.getvalue()
+
+
+def process_recipe_image(recipe_id):
+    # generar las versiones redimensionadas de la imagen de una receta
+    recipe = Recipe.objects.filter(id=recipe_id).only('id', 'user_id', 'image').first()
+    if recipe is None or not recipe.image:
+        return
+
+    # las versiones de una imagen compartida (ImageBlob) tambien son compartidas
+    shared = ImageBlob.objects.filter(path=recipe.image.name).exists()
+    stem = os.path.splitext(os.path.basename(recipe.image.name))[0]
+    renditions = {}
+    try:
+        with recipe.image.open('rb') as f, Image.open(f) as image:
+            image.load()
+            for name, size in RENDITION_SIZES.items():
+                for ext, fmt in RENDITION_FORMATS.items():
+                    path = f'{RENDITIONS_DIR}{stem}_{name}.{ext}'
+                    if not (shared and default_storage.exists(path)):
+                        path = default_storage.save(path, ContentFile(render_image(image, size, fmt)))
+                    renditions[f'{name}_{ext}'] = path
+    except Exception:
+        logger.exception('Image processing failed for recipe %s', recipe_id)
+        if not shared:
+            delete_files(renditions.values())
+        Recipe.objects.filter(id=recipe_id).update(image_status=Recipe.IMAGE_FAILED, image_renditions={})
+    else:
+        # solo si la imagen no cambio mientras se procesaba
+        updated = Recipe.objects.filter(id=recipe_id, image=recipe.image.name).update(
+            image_status=Recipe.IMAGE_READY, image_renditions=renditions
+        )
+        if shared:
+            # las recetas que suban la misma imagen reutilizan estas versiones
+            ImageBlob.objects.filter(path=recipe.image.name).update(renditions=renditions)
+        elif not updated:
+            delete_files(renditions.values())
+    bump_version(recipe.user_id)
+
+
+def delete_files(paths):
+    # borrar archivos una vez confirmada la transaccion
+    paths = list(paths)
+
+    def delete():
+        for path in paths:
+            default_storage.delete(path)
+
+    transaction.on_commit(delete)
+
+
+def content_addressed():
+    return getattr(settings, 'RECIPE_IMAGE_CONTENT_ADDRESSED', True)
+
+
+def content_digest(upload):
+    # sha256 del archivo leido por bloques
+    digest = hashlib.sha256()
+    for chunk in upload.chunks():
+        digest.update(chunk)
+    upload.seek(0)
+    return digest.hexdigest()
+
+
+def acquire_blob(upload):
+    # guardar la imagen bajo su hash, o reutilizar la existente, y sumar una referencia
+    digest = content_digest(upload)
+    ext = os.path.splitext(upload.name)[1].lower()
+    while True:
+        # leer, sumar la referencia y guardar el archivo en una transaccion de
+        # escritura (BEGIN IMMEDIATE), serializada con release_image
+        with transaction.atomic():
+            blob, _ = ImageBlob.objects.get_or_create(digest=digest, defaults={'path': f'{IMAGES_DIR}{digest}{ext}'})
+            if not ImageBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1):
+                # otra liberacion borro el blob entre leerlo y sumarle la
+                # referencia, el siguiente intento lo vuelve a crear
+                continue
+            # mismo nombre implica mismo contenido, un archivo existente se reutiliza
+            if not default_storage.exists(blob.path):
+                default_storage.save(blob.path, upload)
+
+        return blob
+
+
+def delete_blob_files(path, renditions):
+    # borrar los archivos de un blob confirmada la transaccion, solo si su fila
+    # sigue borrada (acquire_blob pudo crearla de nuevo con el mismo nombre)
+    paths = [path, *renditions.values()]
+
+    def delete():
+        with transaction.atomic():
+            if ImageBlob.objects.filter(path=path).exists():
+                return
+            for name in paths:
+                default_storage.delete(name)
+
+    transaction.on_commit(delete)
+
+
+def release_image(name, renditions=None):
+    # quitar una referencia a la imagen y borrar los archivos que quedan huerfanos
+    if not name:
+        return
+
+    # restar y borrar en la misma transaccion de escritura que acquire_blob
+    with transaction.atomic():
+        blob = ImageBlob.objects.filter(path=name).first()
+        if blob is None:
+            deleted = False
+        else:
+            ImageBlob.objects.filter(pk=blob.pk, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+            deleted, _ = ImageBlob.objects.filter(pk=blob.pk, ref_count=0).delete()
+
+    if blob is None:
+        # imagen propia de la receta (nombre uuid)
+        delete_files([name, *(renditions or {}).values()])
+    elif deleted:
+        delete_blob_files(blob.path, blob.renditions)
+
+
+def save_uploaded_image(serializer):
+    # guardar la imagen subida y programar sus versiones redimensionadas
+    recipe = serializer.instance
+    old_name, old_renditions = recipe.image.name, recipe.image_renditions
+
+    if content_addressed():
+        blob = acquire_blob(serializer.validated_data['image'])
+        if blob.renditions:
+            serializer.save(image=blob.path, image_status=Recipe.IMAGE_READY, image_renditions=blob.renditions)
+        else:
+            serializer.save(image=blob.path, image_status=Recipe.IMAGE_PROCESSING, image_renditions={})
+            enqueue_recipe_image(recipe.id)
+    else:
+        serializer.save(image_status=Recipe.IMAGE_PROCESSING, image_renditions={})
+        enqueue_recipe_image(recipe.id)
+
+    release_image(old_name, old_renditions)
@@ -0,0 +1,153 @@
+import csv
+import json
+
+from django.db import transaction
+
+from core.models import Tag, Ingredient, Recipe
+from recipe.bulk import upsert_names
+from recipe.caching import bump_version
+from recipe.search import schedule_index
+from recipe.stats import contribution, update_stats
+from recipe.serializers import RecipeImportSerializer
+
+FORMAT_NDJSON = 'ndjson'
+FORMAT_CSV = 'csv'
+
+
+class RecipeImportError(Exception):
+    # error en un registro de la importacion
+    def __init__(self, record, errors, checkpoint=None):
+        super().__init__(f'record {record}: {errors}')
+        self.record = record
+        self.errors = errors
+        self.checkpoint = checkpoint
+
+
+def _names(value):
+    # aceptar nombres o objetos {'id', 'name'} como los de la exportacion
+    if isinstance(value, str):
+        return [name for name in value.split(';') if name]
+
+    return [item.get('name') if isinstance(item, dict) else item for item in value or []]
+
+
+def _decoded(lines):
+    for line in lines:
+        yield line.decode('utf-8') if isinstance(line, bytes) else line
+
+
+def parse_ndjson(lines):
+    # una receta json por linea, ignorando lineas vacias
+    for line in _decoded(lines):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+
+
+def parse_csv(lines):
+    # csv con encabezado, tags e ingredients como nombres separados por ';'
+    yield from csv.DictReader(_decoded(lines))
+
+
+def parse_records(lines, fmt):
+    if fmt == FORMAT_CSV:
+        return parse_csv(lines)
+
+    return parse_ndjson(lines)
+
+
+class RecipeImporter:
+    # importar recetas por lotes, resolviendo tags e ingredients por nombre
+
+    def __init__(self, user, batch_size=500):
+        self.user = user
+        self.batch_size = batch_size
+        self.names = {Tag: {}, Ingredient: {}}
+        self.created = 0
+
+    def run(self, records, skip=0, on_checkpoint=None):
+        # importar registros desde el numero `skip`; retorna el checkpoint final
+        processed = skip
+        batch = []
+        for number, record in enumerate(records, start=1):
+            if number <= skip:
+                continue
+
+            try:
+                batch.append(self.validate(record, number))
+            except RecipeImportError as exc:
+                # los registros validos anteriores se escriben antes de reportar,
+                # el checkpoint queda justo antes del registro invalido
+                if batch:
+                    processed = self.write(batch, processed, on_checkpoint)
+                exc.checkpoint = processed
+                raise
+            if len(batch) == self.batch_size:
+                processed = self.write(batch, processed, on_checkpoint)
+                batch = []
+
+        if batch:
+            processed = self.write(batch, processed, on_checkpoint)
+
+        return processed
+
+    def validate(self, record, number):
+        if not isinstance(record, dict):
+            raise RecipeImportError(number, ['Invalid record.'])
+
+        data = dict(record)
+        data['tags'] = _names(data.get('tags'))
+        data['ingredients'] = _names(data.get('ingredients'))
+        serializer = RecipeImportSerializer(data=data)
+        if not serializer.is_valid():
+            raise RecipeImportError(number, serializer.errors)
+
+        return serializer.validated_data
+
+    def resolve(self, model, names):
+        # nombres a ids usando el diccionario en memoria, creando los que faltan
+        known = self.names[model]
+        missing = [name for name in names if name not in known]
+        if missing:
+            objs, _ = upsert_names(model, self.user, sorted(missing), self.batch_size)
+            known.update((name, obj.id) for name, obj in objs.items())
+
+        return known
+
+    def write(self, batch, processed, on_checkpoint=None):
+        # escribir un lote de recetas y sus relaciones en una transaccion
+        with transaction.atomic():
+            tags = self.resolve(Tag, {name for data in batch for name in data.get('tags', [])})
+            ingredients = self.resolve(
+                Ingredient, {name for data in batch for name in data.get('ingredients', [])}
+            )
+            recipes = Recipe.objects.bulk_create([
+                Recipe(user=self.user, **{
+                    key: value for key, value in data.items() if key not in ('tags', 'ingredients')
+                })
+                for data in batch
+            ], batch_size=self.batch_size)
+
+            recipe_tags, recipe_ingredients = Recipe.tags.through, Recipe.ingredients.through
+            recipe_tags.objects.bulk_create([
+                recipe_tags(recipe_id=recipe.id, tag_id=tag_id)
+                for recipe, data in zip(recipes, batch)
+                for tag_id in {tags[name] for name in data.get('tags', [])}
+            ], batch_size=self.batch_size)
+            recipe_ingredients.objects.bulk_create([
+                recipe_ingredients(recipe_id=recipe.id, ingredient_id=ingredient_id)
+                for recipe, data in zip(recipes, batch)
+                for ingredient_id in {ingredients[name] for name in data.get('ingredients', [])}
+            ], batch_size=self.batch_size)
+            update_stats(self.user.id, contribution(Recipe, [recipe.id for recipe in recipes]))
+        bump_version(self.user.id)
+        schedule_index([recipe.id for recipe in recipes])
+
+        self.created += len(recipes)
+        processed += len(batch)
+        if on_checkpoint is not None:
+            on_checkpoint(processed)
+
+        return processed
@@ -0,0 +1,64 @@
+from django.db import transaction
+from django.db.models import CharField, Value
+
+from recipe.filters import relation_links
+
+# relaciones M2M de Recipe que se escriben por diferencia
+RELATIONS = ('tags', 'ingredients')
+
+
+def current_links(recipe_ids, relations):
+    # filas actuales de las tablas intermedias con un solo query (UNION ALL):
+    # {relation: {recipe_id: {tag/ingredient id: id de la fila}}}
+    querysets = []
+    for relation in relations:
+        links, field = relation_links(relation)
+        querysets.append(
+            links.filter(recipe_id__in=recipe_ids)
+            .annotate(relation=Value(relation, output_field=CharField()))
+            .values_list('relation', 'recipe_id', f'{field}_id', 'id')
+        )
+
+    current = {relation: {} for relation in relations}
+    for relation, recipe_id, target_id, link_id in querysets[0].union(*querysets[1:], all=True):
+        current[relation].setdefault(recipe_id, {})[target_id] = link_id
+
+    return current
+
+
+def apply_links(changes, batch_size=500):
+    # changes: [(recipe_id, relation, ids)]; se borran e insertan solo las filas
+    # que cambian y las relaciones sin cambios no se tocan.
+    # Retorna {relation: (agregadas, quitadas)}; no envia m2m_changed
+    relations = [relation for relation in RELATIONS if any(change[1] == relation for change in changes)]
+    if not relations:
+        return {}
+
+    delta = {}
+    with transaction.atomic(savepoint=False):
+        current = current_links({recipe_id for recipe_id, _, _ in changes}, relations)
+        for relation in relations:
+            delta[relation] = _apply_relation(relation, changes, current[relation], batch_size)
+
+    return delta
+
+
+def _apply_relation(relation, changes, current, batch_size):
+    # un DELETE por id de fila y un INSERT en lote para la relacion
+    links, field = relation_links(relation)
+    added, removed = [], []
+    for recipe_id, _, ids in (change for change in changes if change[1] == relation):
+        existing = current.get(recipe_id, {})
+        wanted = set(ids)
+        removed.extend(link_id for target_id, link_id in existing.items() if target_id not in wanted)
+        added.extend(
+            links.model(recipe_id=recipe_id, **{f'{field}_id': target_id})
+            for target_id in wanted - existing.keys()
+        )
+
+    if removed:
+        links.filter(id__in=removed).delete()
+    if added:
+        links.bulk_create(added, batch_size=batch_size)
+
+    return len(added), len(removed)
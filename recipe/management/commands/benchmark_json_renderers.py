@@ -0,0 +1,71 @@
+import io
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core import fastjson
+from core.fastjson import FastJSONRenderer, FastJSONParser
+
+
+def recipe_payload(size, nested=False):
+    # lista de recetas con la forma de las respuestas de list (o retrieve si nested)
+    def related(index, count):
+        ids = [(index + offset) % 500 + 1 for offset in range(count)]
+        return [{'id': pk, 'name': f'Item {pk}'} for pk in ids] if nested else ids
+
+    return [
+        {
+            'id': index + 1,
+            'title': f'Receta número {index + 1}',
+            'ingredients': related(index, 6),
+            'tags': related(index, 3),
+            'time_minutes': index % 120,
+            'price': f'{index % 100}.50',
+            'link': f'https://example.com/recipes/{index + 1}' if index % 2 else '',
+        }
+        for index in range(size)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Compara el renderer y parser json de DRF con los de core.fastjson para varios tamaños de respuesta'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1,50,500,5000', help='cantidad de recetas por respuesta')
+        parser.add_argument('--repeat', type=int, default=5, help='repeticiones, se reporta la mejor')
+
+    def best_time(self, func, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'backend: {fastjson.get_backend()}')
+        for size in [int(size) for size in options['sizes'].split(',')]:
+            for name, nested in (('list', False), ('detail', True)):
+                data = recipe_payload(size, nested)
+                content = JSONRenderer().render(data)
+                # varias pasadas para los payloads chicos
+                loops = max(1, 5000 // size)
+
+                def run(func):
+                    return self.best_time(lambda: [func() for _ in range(loops)], options['repeat']) / loops
+
+                render_drf = run(lambda: JSONRenderer().render(data))
+                render_fast = run(lambda: FastJSONRenderer().render(data))
+                parse_drf = run(lambda: JSONParser().parse(io.BytesIO(content)))
+                parse_fast = run(lambda: FastJSONParser().parse(io.BytesIO(content)))
+                self.stdout.write(
+                    f'{name} x{size} ({len(content):,} bytes): '
+                    f'render {render_drf * 1e6:,.0f} -> {render_fast * 1e6:,.0f} us '
+                    f'({render_drf / render_fast:.1f}x), '
+                    f'parse {parse_drf * 1e6:,.0f} -> {parse_fast * 1e6:,.0f} us '
+                    f'({parse_drf / parse_fast:.1f}x)'
+                )
+
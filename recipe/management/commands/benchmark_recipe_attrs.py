@@ -0,0 +1,72 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from core.models import Tag, Recipe
+from recipe.filters import assigned_to_recipe, recipe_count
+
+
+class Rollback(Exception):
+    pass
+
+
+def best_time(func, repeat):
+    # mejor tiempo de evaluar la consulta, en segundos
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class Command(BaseCommand):
+    help = 'Mide listar tags asignados a recetas con join y DISTINCT, EXISTS y el conteo de recetas por tag'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tags', type=int, default=2000, help='cantidad de tags')
+        parser.add_argument('--recipes', type=int, default=20000, help='cantidad de recetas')
+        parser.add_argument('--per-recipe', type=int, default=5, help='tags por receta')
+        parser.add_argument('--repeat', type=int, default=5, help='repeticiones, se reporta la mejor')
+
+    def handle(self, *args, **options):
+        # todo se escribe dentro de una transaccion que se descarta al final
+        try:
+            with transaction.atomic():
+                self.run(options['tags'], options['recipes'], options['per_recipe'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, tag_total, recipe_total, per_recipe, repeat):
+        user = get_user_model().objects.create_user('benchmark-attrs@example.com', 'benchmark')
+        tags = Tag.objects.bulk_create([Tag(user=user, name=f'Tag {index}') for index in range(tag_total)])
+        recipes = Recipe.objects.bulk_create([
+            Recipe(user=user, title=f'Recipe {index}', time_minutes=5, price=1) for index in range(recipe_total)
+        ])
+        # solo la mitad de los tags queda asignada
+        assigned = tags[:max(tag_total // 2, 1)]
+        Recipe.tags.through.objects.bulk_create([
+            Recipe.tags.through(recipe_id=recipe.id, tag_id=assigned[(index + offset) % len(assigned)].id)
+            for index, recipe in enumerate(recipes)
+            for offset in range(min(per_recipe, len(assigned)))
+        ], batch_size=1000)
+
+        queryset = Tag.objects.filter(user=user).order_by('-name')
+        strategies = (
+            ('join + DISTINCT', queryset.filter(recipe__isnull=False).distinct()),
+            ('EXISTS', queryset.filter(assigned_to_recipe('tags'))),
+            ('EXISTS + recipe_count', queryset.filter(assigned_to_recipe('tags')).annotate(
+                recipe_count=recipe_count('tags'),
+            )),
+            ('join + COUNT GROUP BY', queryset.annotate(recipe_count=Count('recipe')).filter(recipe_count__gt=0)),
+        )
+        self.stdout.write(f'{tag_total} tags, {recipe_total} recipes, {per_recipe} tags per recipe')
+        for label, strategy in strategies:
+            # .all() para no reusar el resultado ya cargado del queryset
+            elapsed = best_time(lambda: list(strategy.all()), repeat)
+            self.stdout.write(f'{label}: {elapsed * 1000:.1f} ms')
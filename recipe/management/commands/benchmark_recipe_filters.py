@@ -0,0 +1,88 @@
+import functools
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Tag, Recipe
+from recipe.filters import MATCH_ALL, MATCH_ANY, filter_recipes
+
+# indice (tag_id, recipe_id) de la migracion 0008
+LOOKUP_INDEX = 'core_recipe_tags_tag_recipe_idx'
+
+
+class Rollback(Exception):
+    pass
+
+
+def best_time(func, repeat):
+    # mejor tiempo de evaluar la consulta, en segundos
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class Command(BaseCommand):
+    help = 'Mide filtrar recetas por tags con match=any|all con el semi-join sobre la tabla intermedia y con joins'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tags', type=int, default=200, help='cantidad de tags')
+        parser.add_argument('--recipes', type=int, default=20000, help='cantidad de recetas')
+        parser.add_argument('--per-recipe', type=int, default=5, help='tags por receta')
+        parser.add_argument('--filter-ids', default='1,3,5', help='cantidades de tags a filtrar, separadas por comas')
+        parser.add_argument('--repeat', type=int, default=5, help='repeticiones, se reporta la mejor')
+        parser.add_argument('--seed', type=int, default=1, help='semilla de los datos')
+
+    def handle(self, *args, **options):
+        # todo se escribe dentro de una transaccion que se descarta al final
+        filter_ids = [int(count) for count in options['filter_ids'].split(',')]
+        try:
+            with transaction.atomic():
+                self.run(
+                    options['tags'], options['recipes'], options['per_recipe'], filter_ids, options['repeat'],
+                    random.Random(options['seed']),
+                )
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, tag_total, recipe_total, per_recipe, filter_ids, repeat, rng):
+        user = get_user_model().objects.create_user('benchmark-filters@example.com', 'benchmark')
+        tags = Tag.objects.bulk_create([Tag(user=user, name=f'Tag {index}') for index in range(tag_total)])
+        recipes = Recipe.objects.bulk_create([
+            Recipe(user=user, title=f'Recipe {index}', time_minutes=5, price=1) for index in range(recipe_total)
+        ], batch_size=1000)
+        # los primeros tags son los mas usados (distribucion tipo Zipf)
+        weights = [1 / (rank + 1) for rank in range(tag_total)]
+        Recipe.tags.through.objects.bulk_create([
+            Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+            for recipe in recipes
+            for tag in set(rng.choices(tags, weights, k=per_recipe))
+        ], batch_size=1000)
+
+        queryset = Recipe.objects.filter(user=user)
+        self.stdout.write(f'{tag_total} tags, {recipe_total} recipes, {per_recipe} tags per recipe')
+        for count in filter_ids:
+            ids = [tag.id for tag in tags[:count]]
+            value = ','.join(str(pk) for pk in ids)
+            strategies = (
+                (MATCH_ANY, 'IN semi-join', filter_recipes(queryset, {'tags': value, 'match': MATCH_ANY})),
+                (MATCH_ANY, 'join + DISTINCT', queryset.filter(tags__in=ids).distinct()),
+                (MATCH_ALL, 'IN semi-join + GROUP BY', filter_recipes(queryset, {'tags': value, 'match': MATCH_ALL})),
+                (MATCH_ALL, 'join per tag', functools.reduce(lambda qs, pk: qs.filter(tags=pk), ids, queryset)),
+            )
+            for match, label, strategy in strategies:
+                strategy = strategy.values_list('id', flat=True)
+                # .all() para no reusar el resultado ya cargado del queryset
+                elapsed = best_time(lambda: list(strategy.all()), repeat)
+                index = ', index' if LOOKUP_INDEX in strategy.explain() else ''
+                self.stdout.write(
+                    f'{count} tags, match={match}, {label}: {elapsed * 1000:.1f} ms, '
+                    f'{len(strategy)} recipes{index}'
+                )
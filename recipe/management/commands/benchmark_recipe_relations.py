@@ -0,0 +1,85 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers
+from rest_framework.test import APIRequestFactory
+
+from core.models import Tag, Ingredient, Recipe
+from recipe.serializers import RecipeSerializer
+
+
+class PerPkRecipeSerializer(RecipeSerializer):
+    # relaciones de DRF por defecto: un query por pk, sin filtrar por usuario
+    ingredients = serializers.PrimaryKeyRelatedField(many=True, queryset=Ingredient.objects.all())
+    tags = serializers.PrimaryKeyRelatedField(many=True, queryset=Tag.objects.all())
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Mide crear y actualizar recetas segun la cantidad de tags e ingredients, con pks resueltos uno a uno o en lote'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--counts', default='1,10,40,100', help='cantidad de tags e ingredients por receta')
+        parser.add_argument('--repeat', type=int, default=5, help='repeticiones, se reporta la mejor')
+
+    def handle(self, *args, **options):
+        counts = [int(count) for count in options['counts'].split(',')]
+        # todo se escribe dentro de una transaccion que se descarta al final
+        try:
+            with transaction.atomic():
+                self.run(counts, options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, counts, repeat):
+        user = get_user_model().objects.create_user('benchmark-relations@example.com', 'benchmark')
+        size = max(counts)
+        tags = Tag.objects.bulk_create([Tag(user=user, name=f'Tag {index}') for index in range(size)])
+        ingredients = Ingredient.objects.bulk_create(
+            [Ingredient(user=user, name=f'Ingredient {index}') for index in range(size)]
+        )
+        recipe = Recipe.objects.create(user=user, title='Benchmark', time_minutes=5, price=1)
+        request = APIRequestFactory().post('/')
+        request.user = user
+
+        for count in counts:
+            payload = {
+                'title': 'Benchmark', 'time_minutes': 5, 'price': '1.00',
+                'tags': [tag.id for tag in tags[:count]],
+                'ingredients': [ingredient.id for ingredient in ingredients[:count]],
+            }
+            context = {'payload': payload, 'request': request, 'user': user, 'repeat': repeat}
+            create_old, create_queries_old = self.measure(PerPkRecipeSerializer, None, **context)
+            create_new, create_queries_new = self.measure(RecipeSerializer, None, **context)
+            update_old, update_queries_old = self.measure(PerPkRecipeSerializer, recipe, **context)
+            update_new, update_queries_new = self.measure(RecipeSerializer, recipe, **context)
+            self.stdout.write(
+                f'{count} relations: create {create_old * 1000:.1f} -> {create_new * 1000:.1f} ms '
+                f'({create_queries_old} -> {create_queries_new} queries), '
+                f'update {update_old * 1000:.1f} -> {update_new * 1000:.1f} ms '
+                f'({update_queries_old} -> {update_queries_new} queries)'
+            )
+
+    def measure(self, serializer_class, instance, payload, request, user, repeat):
+        # mejor tiempo de validar y guardar, y queries de una pasada
+        best, queries = None, 0
+        for _ in range(repeat):
+            # cada pasada parte del mismo estado
+            sid = transaction.savepoint()
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                serializer = serializer_class(instance, data=payload, context={'request': request})
+                serializer.is_valid(raise_exception=True)
+                serializer.save(user=user)
+                elapsed = time.perf_counter() - start
+            transaction.savepoint_rollback(sid)
+            best = elapsed if best is None else min(best, elapsed)
+            queries = len(captured)
+        return best, queries
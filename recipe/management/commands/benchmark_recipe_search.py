@@ -0,0 +1,103 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.models import Tag, Ingredient, Recipe
+from recipe.search import SEARCH_TABLE, FTS5Backend, PythonBackend
+
+WORDS = (
+    'tomato', 'basil', 'chicken', 'curry', 'lentil', 'soup', 'garlic', 'onion', 'pepper', 'lemon',
+    'ginger', 'rice', 'noodle', 'salmon', 'spinach', 'mushroom', 'potato', 'carrot', 'coconut', 'chocolate',
+    'vanilla', 'almond', 'cheese', 'butter', 'honey', 'yogurt', 'cumin', 'paprika', 'oregano', 'thyme',
+)
+
+
+class Rollback(Exception):
+    pass
+
+
+def percentile(values, fraction):
+    # percentil por rango mas cercano de una lista ordenada
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+class Command(BaseCommand):
+    help = 'Mide la latencia p50/p99 de la busqueda de recetas con FTS5 y con el indice en memoria'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=20000, help='cantidad de recetas del usuario')
+        parser.add_argument('--queries', type=int, default=200, help='busquedas distintas a medir')
+        parser.add_argument('--repeat', type=int, default=3, help='veces que se corre cada busqueda')
+        parser.add_argument('--seed', type=int, default=1, help='semilla de los datos y las busquedas')
+
+    def handle(self, *args, **options):
+        # todo se escribe dentro de una transaccion que se descarta al final
+        try:
+            with transaction.atomic():
+                self.run(options['recipes'], options['queries'], options['repeat'], random.Random(options['seed']))
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, recipe_total, query_total, repeat, rng):
+        user = get_user_model().objects.create_user('benchmark-search@example.com', 'benchmark')
+        tags = Tag.objects.bulk_create([Tag(user=user, name=word.title()) for word in WORDS[:10]])
+        ingredients = Ingredient.objects.bulk_create([Ingredient(user=user, name=word.title()) for word in WORDS])
+        recipes = Recipe.objects.bulk_create([
+            Recipe(user=user, title=' '.join(rng.sample(WORDS, 3)).capitalize(), time_minutes=5, price=1)
+            for _ in range(recipe_total)
+        ], batch_size=1000)
+        for relation, objs, per_recipe in (('tags', tags, 2), ('ingredients', ingredients, 4)):
+            through = getattr(Recipe, relation).through
+            field = f'{Recipe._meta.get_field(relation).m2m_reverse_field_name()}_id'
+            through.objects.bulk_create([
+                through(recipe_id=recipe.id, **{field: obj.id})
+                for recipe in recipes
+                for obj in rng.sample(objs, per_recipe)
+            ], batch_size=1000)
+
+        # una o dos palabras, prefijos y errores de tipeo
+        queries = []
+        for _ in range(query_total):
+            words = rng.sample(WORDS, rng.choice((1, 2)))
+            kind = rng.choice(('word', 'prefix', 'typo'))
+            if kind == 'prefix':
+                words[0] = words[0][:4]
+            elif kind == 'typo':
+                position = rng.randrange(1, len(words[0]) - 1)
+                words[0] = words[0][:position] + words[0][position + 1] + words[0][position] + words[0][position + 2:]
+            queries.append(' '.join(words))
+
+        ids = [recipe.id for recipe in recipes]
+        backends = []
+        if connection.vendor == 'sqlite' and SEARCH_TABLE in connection.introspection.table_names():
+            backends.append(('fts5', FTS5Backend()))
+        else:
+            self.stdout.write('fts5: not available (no search table)')
+        backends.append(('python', PythonBackend()))
+
+        candidates = Recipe.objects.filter(user=user)
+        self.stdout.write(f'{recipe_total} recipes, {query_total} queries x {repeat}')
+        for name, backend in backends:
+            start = time.perf_counter()
+            if isinstance(backend, PythonBackend):
+                backend.build()
+            else:
+                for index in range(0, len(ids), 1000):
+                    backend.index(ids[index:index + 1000])
+            build = time.perf_counter() - start
+
+            timings = []
+            for _ in range(repeat):
+                for query in queries:
+                    start = time.perf_counter()
+                    backend.search(user.id, query, 100, candidates=candidates)
+                    timings.append(time.perf_counter() - start)
+            timings.sort()
+            self.stdout.write(
+                f'{name}: index {build:.2f} s, p50 {percentile(timings, 0.5) * 1000:.2f} ms, '
+                f'p99 {percentile(timings, 0.99) * 1000:.2f} ms'
+            )
@@ -0,0 +1,56 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Prefetch
+
+from core.models import Tag, Ingredient, Recipe
+from recipe.readers import recipe_data, recipe_rows
+from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compara el rendimiento de los serializadores de recetas con la lectura desde filas .values()'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, help='email del usuario cuyas recetas se leen')
+        parser.add_argument('--repeat', type=int, default=5, help='repeticiones, se reporta la mejor')
+
+    def best_time(self, func, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.filter(email=options['user']).first()
+        if user is None:
+            raise CommandError(f'User {options["user"]} does not exist')
+
+        recipes = Recipe.objects.filter(user=user).order_by('-id')
+        total = recipes.count()
+        if not total:
+            raise CommandError('The user has no recipes')
+
+        def prefetched(*fields):
+            return recipes.prefetch_related(
+                Prefetch('tags', queryset=Tag.objects.only(*fields)),
+                Prefetch('ingredients', queryset=Ingredient.objects.only(*fields)),
+            )
+
+        cases = (
+            ('list', lambda: RecipeSerializer(prefetched('id'), many=True).data,
+             lambda: recipe_data(recipe_rows(recipes))),
+            ('detail', lambda: RecipeDetailSerializer(prefetched('id', 'name'), many=True).data,
+             lambda: recipe_data(recipe_rows(recipes), nested=True)),
+        )
+        for name, serializer, fast in cases:
+            serializer_time = self.best_time(serializer, options['repeat'])
+            fast_time = self.best_time(fast, options['repeat'])
+            self.stdout.write(
+                f'{name}: serializer {total / serializer_time:,.0f} recipes/s, '
+                f'values {total / fast_time:,.0f} recipes/s ({serializer_time / fast_time:.1f}x)'
+            )
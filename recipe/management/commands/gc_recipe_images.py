@@ -0,0 +1,81 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from core.models import Recipe, ImageBlob
+from recipe.images import IMAGES_DIR, RENDITIONS_DIR
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las referencias de las imagenes y borra los archivos huerfanos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='solo listar los archivos a borrar')
+        parser.add_argument(
+            '--grace-seconds', type=int, default=getattr(settings, 'IMAGE_GC_GRACE_SECONDS', 3600),
+            help='no borrar archivos modificados hace menos de estos segundos',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        self.cutoff = timezone.now() - timedelta(seconds=options['grace_seconds'])
+
+        # recalcular ref_count desde las recetas que usan cada imagen; una subida
+        # en curso ya sumo su referencia pero aun no guardo la receta, por eso
+        # solo se sube la cuenta y solo se borran blobs sin referencias y viejos
+        counts = dict(
+            Recipe.objects.filter(image__in=ImageBlob.objects.values('path'))
+            .values_list('image').annotate(total=Count('id'))
+        )
+        for blob in ImageBlob.objects.all():
+            ref_count = counts.get(blob.path, 0)
+            if ref_count > blob.ref_count:
+                if not dry_run:
+                    ImageBlob.objects.filter(pk=blob.pk).update(ref_count=ref_count)
+            elif ref_count == 0 and blob.ref_count == 0 and not self.is_recent(blob.path):
+                if not dry_run:
+                    ImageBlob.objects.filter(pk=blob.pk, ref_count=0).delete()
+
+        referenced = set()
+        for image, renditions in Recipe.objects.exclude(image='').exclude(image=None).values_list(
+            'image', 'image_renditions'
+        ).iterator():
+            referenced.add(image)
+            referenced.update(renditions.values())
+        # los archivos de los blobs que siguen en la base no son huerfanos
+        for path, renditions in ImageBlob.objects.values_list('path', 'renditions').iterator():
+            referenced.add(path)
+            referenced.update(renditions.values())
+
+        deleted = 0
+        for directory in (IMAGES_DIR, RENDITIONS_DIR):
+            if not default_storage.exists(directory):
+                continue
+            for name in default_storage.listdir(directory)[1]:
+                path = f'{directory}{name}'
+                # los archivos recientes pueden ser de una subida o del worker
+                # de imagenes que todavia no guardo la receta
+                if path not in referenced and not self.is_recent(path):
+                    deleted += 1
+                    self.stdout.write(path)
+                    if not dry_run:
+                        default_storage.delete(path)
+
+        action = 'would be deleted' if dry_run else 'deleted'
+        self.stdout.write(self.style.SUCCESS(f'{deleted} orphaned files {action}'))
+
+    def is_recent(self, path):
+        # un storage sin fecha de modificacion se trata como reciente
+        try:
+            modified = default_storage.get_modified_time(path)
+        except FileNotFoundError:
+            return False
+        except NotImplementedError:
+            return True
+        if timezone.is_naive(modified):
+            modified = timezone.make_aware(modified)
+        return modified >= self.cutoff
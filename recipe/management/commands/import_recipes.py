@@ -0,0 +1,44 @@
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.importer import RecipeImporter, RecipeImportError, parse_records, FORMAT_CSV, FORMAT_NDJSON
+
+
+class Command(BaseCommand):
+    help = 'Importa recetas desde un archivo ndjson o csv, por lotes y con checkpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--user', required=True, help='email del usuario dueño de las recetas')
+        parser.add_argument('--format', choices=(FORMAT_NDJSON, FORMAT_CSV), help='por defecto segun la extension')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--checkpoint-file', help='archivo donde se guarda el numero de registros importados')
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User {options['user']} does not exist")
+
+        fmt = options['format'] or (FORMAT_CSV if options['path'].endswith('.csv') else FORMAT_NDJSON)
+        checkpoint_file = options['checkpoint_file']
+        skip = 0
+        if checkpoint_file and os.path.exists(checkpoint_file):
+            with open(checkpoint_file) as f:
+                skip = int(f.read().strip() or 0)
+
+        def save_checkpoint(processed):
+            if checkpoint_file:
+                with open(checkpoint_file, 'w') as f:
+                    f.write(str(processed))
+
+        importer = RecipeImporter(user, batch_size=options['batch_size'])
+        with open(options['path'], newline='', encoding='utf-8') as f:
+            try:
+                processed = importer.run(parse_records(f, fmt), skip=skip, on_checkpoint=save_checkpoint)
+            except RecipeImportError as exc:
+                raise CommandError(f'{exc} (checkpoint {exc.checkpoint})')
+
+        self.stdout.write(self.style.SUCCESS(f'{importer.created} recipes imported, checkpoint {processed}'))
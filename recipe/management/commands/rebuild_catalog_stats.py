@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.stats import rebuild_stats, verify_stats
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las estadisticas del catalogo de los usuarios o verifica sus contadores'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='email del usuario (por defecto todos)')
+        parser.add_argument('--verify', action='store_true', help='solo comparar, sin reescribir los contadores')
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.order_by('id')
+        if options['user']:
+            users = users.filter(email=options['user'])
+            if not users.exists():
+                raise CommandError(f'User {options["user"]} does not exist')
+
+        checked = drifted = 0
+        for user_id, email in users.values_list('id', 'email').iterator():
+            checked += 1
+            differences = verify_stats(user_id)
+            for counter, (stored, computed) in differences.items():
+                self.stdout.write(f'{email}: {counter} is {stored}, expected {computed}')
+            if differences:
+                drifted += 1
+            if not options['verify']:
+                rebuild_stats(user_id)
+
+        if options['verify'] and drifted:
+            raise CommandError(f'{drifted} of {checked} users have drifted statistics')
+
+        action = 'verified' if options['verify'] else 'rebuilt'
+        self.stdout.write(self.style.SUCCESS(f'{checked} users {action}, {drifted} with drifted statistics'))
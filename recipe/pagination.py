@@ -0,0 +1,26 @@
+from rest_framework.pagination import CursorPagination
+
+
+class OptionalCursorPagination(CursorPagination):
+    # paginacion por cursor (keyset), activa solo si el cliente la solicita
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # sin cursor ni page_size se mantiene la lista completa
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+
+        return super().paginate_queryset(queryset, request, view)
+
+
+class RecipeCursorPagination(OptionalCursorPagination):
+    # paginar recetas por id descendente
+    ordering = ('-id', )
+
+
+class RecipeAttrCursorPagination(OptionalCursorPagination):
+    # paginar tags e ingredientes por nombre descendente
+    ordering = ('-name', 'id')
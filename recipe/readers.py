@@ -0,0 +1,132 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers
+
+from core import perf
+from core.models import Recipe
+
+# campos de Recipe leidos con .values(); tags e ingredients se agregan por lote
+RECIPE_FIELDS = ('id', 'title', 'time_minutes', 'price', 'link')
+RELATIONS = ('tags', 'ingredients')
+# campos de RecipeSerializer, en el orden de la respuesta
+SERIALIZER_FIELDS = ('id', 'title', 'ingredients', 'tags', 'time_minutes', 'price', 'link')
+CENTS = Decimal('0.01')
+
+
+def fast_serializers():
+    # leer recetas desde filas .values() en vez de instancias y ModelSerializer
+    return getattr(settings, 'RECIPE_FAST_SERIALIZERS', True)
+
+
+def _split(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def parse_fieldset(query_params):
+    # campos pedidos con ?fields= (todos por defecto) y relaciones anidadas con ?expand=
+    fields = _split(query_params.get('fields', '')) or SERIALIZER_FIELDS
+    unknown = sorted(set(fields) - set(SERIALIZER_FIELDS))
+    if unknown:
+        msg = _('Unknown fields: {fields}.').format(fields=', '.join(unknown))
+        raise serializers.ValidationError({'fields': msg}, code='invalid')
+
+    expand = _split(query_params.get('expand', ''))
+    unknown = sorted(set(expand) - set(RELATIONS))
+    if unknown:
+        msg = _('Only tags and ingredients can be expanded.')
+        raise serializers.ValidationError({'expand': msg}, code='invalid')
+
+    return tuple(field for field in SERIALIZER_FIELDS if field in fields), frozenset(expand)
+
+
+def fieldset_columns(fields, ordering=()):
+    # columnas de Recipe que se leen: las pedidas, el id y las del orden (posicion del cursor)
+    names = {'id', *fields, *(field.lstrip('-') for field in ordering)}
+    return [column for column in RECIPE_FIELDS if column in names]
+
+
+def recipe_rows(queryset, fields=SERIALIZER_FIELDS, ordering=()):
+    # las relaciones se cargan aparte con related_by_recipe
+    return queryset.prefetch_related(None).values(*fieldset_columns(fields, ordering))
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def related_by_recipe(relation, recipe_ids, nested=False):
+    # ids, o {'id', 'name'} si nested, de los tags o ingredients de un lote de recetas, en una consulta
+    related = {recipe_id: [] for recipe_id in recipe_ids}
+    if not related:
+        return related
+
+    field = Recipe._meta.get_field(relation).m2m_reverse_field_name()
+    links = getattr(Recipe, relation).through.objects.filter(recipe_id__in=recipe_ids).order_by(f'{field}_id')
+    if nested:
+        for recipe_id, pk, name in links.values_list('recipe_id', f'{field}_id', f'{field}__name'):
+            related[recipe_id].append({'id': pk, 'name': name})
+    else:
+        for recipe_id, pk in links.values_list('recipe_id', f'{field}_id'):
+            related[recipe_id].append(pk)
+
+    return related
+
+
+def format_price(price):
+    # igual que DecimalField(decimal_places=2) de DRF
+    if not isinstance(price, Decimal):
+        price = Decimal(str(price))
+    return '{:f}'.format(price.quantize(CENTS))
+
+
+def iter_recipe_data(rows, nested=False, chunk_size=1000, fields=SERIALIZER_FIELDS, expand=()):
+    # filas .values() de recetas con la misma forma que RecipeSerializer
+    # (o RecipeDetailSerializer si nested), cargando las relaciones por lote
+    relations = [relation for relation in RELATIONS if relation in fields]
+    if fields == SERIALIZER_FIELDS and not expand:
+        for chunk in chunked(rows, chunk_size):
+            ids = [row['id'] for row in chunk]
+            tags = related_by_recipe('tags', ids, nested)
+            ingredients = related_by_recipe('ingredients', ids, nested)
+            for row in chunk:
+                yield {
+                    'id': row['id'],
+                    'title': row['title'],
+                    'ingredients': ingredients[row['id']],
+                    'tags': tags[row['id']],
+                    'time_minutes': row['time_minutes'],
+                    'price': format_price(row['price']),
+                    'link': row['link'],
+                }
+        return
+
+    for chunk in chunked(rows, chunk_size):
+        ids = [row['id'] for row in chunk]
+        related = {
+            relation: related_by_recipe(relation, ids, nested or relation in expand) for relation in relations
+        }
+        for row in chunk:
+            item = {}
+            for field in fields:
+                if field in related:
+                    item[field] = related[field][row['id']]
+                elif field == 'price':
+                    item[field] = format_price(row['price'])
+                else:
+                    item[field] = row[field]
+            yield item
+
+
+def recipe_data(rows, nested=False, fields=SERIALIZER_FIELDS, expand=()):
+    # cuenta como tiempo de serializacion en las metricas del request
+    with perf.serializing():
+        return list(iter_recipe_data(rows, nested, fields=fields, expand=expand))
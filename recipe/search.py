@@ -0,0 +1,342 @@
+from collections import Counter, defaultdict
+import bisect
+import math
+import re
+import threading
+import unicodedata
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, When
+
+from core.models import Recipe
+
+SEARCH_TABLE = 'recipe_search'
+SEARCH_VOCAB_TABLE = 'recipe_search_vocab'
+
+# peso de cada campo en el ranking (BM25)
+TITLE_WEIGHT = 2
+TAGS_WEIGHT = 1
+INGREDIENTS_WEIGHT = 1
+
+# terminos del vocabulario revisados por palabra al buscar errores de tipeo
+TYPO_VOCABULARY_LIMIT = 1000
+
+
+def tokenize(text):
+    # minusculas, sin acentos, separado en palabras (igual que unicode61 de FTS5)
+    text = unicodedata.normalize('NFKD', (text or '').lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return re.findall(r'\w+', text)
+
+
+def max_typos(token):
+    # errores de tipeo tolerados segun el largo de la palabra
+    if len(token) < 4:
+        return 0
+    return 1 if len(token) < 8 else 2
+
+
+def within_distance(a, b, limit):
+    # distancia de edicion (con transposiciones) <= limit
+    if abs(len(a) - len(b)) > limit:
+        return False
+
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return False
+        previous2, previous = previous, current
+
+    return previous[-1] <= limit
+
+
+def typo_range(token):
+    # rango de terminos a revisar por errores de tipeo: mismas dos primeras
+    # letras y largo cercano, asi el costo no crece con todo el vocabulario
+    limit = max_typos(token)
+    return token[:2], token[:1] + chr(ord(token[1]) + 1), len(token) - limit, len(token) + limit
+
+
+def typo_candidates(token, terms):
+    # terminos del vocabulario a pocos errores de la palabra buscada
+    limit = max_typos(token)
+    if not limit:
+        return []
+
+    return [term for term in terms if term != token and within_distance(token, term, limit)]
+
+
+def documents(recipe_ids):
+    # titulo, tags e ingredients de cada receta: {id: (user_id, title, tags, ingredients)}
+    docs = {
+        pk: (user_id, title, [], [])
+        for pk, user_id, title in Recipe.objects.filter(id__in=recipe_ids).values_list('id', 'user_id', 'title')
+    }
+    for index, relation in ((2, 'tags'), (3, 'ingredients')):
+        field = Recipe._meta.get_field(relation).m2m_reverse_field_name()
+        rows = getattr(Recipe, relation).through.objects.filter(recipe_id__in=docs).values_list(
+            'recipe_id', f'{field}__name'
+        )
+        for recipe_id, name in rows:
+            docs[recipe_id][index].append(name)
+
+    return docs
+
+
+class FTS5Backend:
+    # indice invertido de SQLite FTS5 (tabla virtual creada en las migraciones)
+
+    def index(self, recipe_ids):
+        docs = documents(recipe_ids)
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(pk,) for pk in recipe_ids])
+            cursor.executemany(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, owner, title, tags, ingredients) VALUES (%s, %s, %s, %s, %s)',
+                [
+                    (pk, f'u{user_id}', title, ' '.join(tags), ' '.join(ingredients))
+                    for pk, (user_id, title, tags, ingredients) in docs.items()
+                ],
+            )
+
+    def remove(self, recipe_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(pk,) for pk in recipe_ids])
+
+    def vocabulary(self, token):
+        # candidatos a errores de tipeo del vocabulario global (ver typo_range)
+        if not max_typos(token):
+            return []
+        low, high, shortest, longest = typo_range(token)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT DISTINCT term FROM {SEARCH_VOCAB_TABLE} WHERE col != 'owner' AND term >= %s AND term < %s "
+                f"AND length(term) BETWEEN %s AND %s LIMIT %s",
+                [low, high, shortest, longest, TYPO_VOCABULARY_LIMIT],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def search(self, user_id, query, limit, candidates=None):
+        clauses = [f'owner:"u{user_id}"']
+        for token in tokenize(query):
+            alternatives = [f'"{token}"*']
+            alternatives += [f'"{term}"' for term in typo_candidates(token, self.vocabulary(token))]
+            # solo las columnas de texto: owner ("u<id>") no es parte del documento
+            clauses.append('{title tags ingredients}: (' + ' OR '.join(alternatives) + ')')
+        if len(clauses) == 1:
+            return []
+
+        # los filtros de la busqueda se aplican antes del ranking y del limite
+        where, params = '', []
+        if candidates is not None:
+            sql, params = candidates.order_by().values('id').query.get_compiler(connection=connection).as_sql()
+            # el + evita que SQLite pase el IN a FTS5, que repetiria el MATCH por id
+            where = f' AND +rowid IN ({sql})'
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s{where} '
+                f'ORDER BY bm25({SEARCH_TABLE}, 0, %s, %s, %s), rowid DESC LIMIT %s',
+                [' AND '.join(clauses), *params, TITLE_WEIGHT, TAGS_WEIGHT, INGREDIENTS_WEIGHT, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class UserIndex:
+    # indice invertido de las recetas de un usuario
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.lengths = {}
+        self.terms = {}
+        self._sorted_terms = None
+
+    def add(self, pk, title, tags, ingredients):
+        terms = Counter()
+        for weight, text in ((TITLE_WEIGHT, title), (TAGS_WEIGHT, ' '.join(tags)),
+                             (INGREDIENTS_WEIGHT, ' '.join(ingredients))):
+            for token in tokenize(text):
+                terms[token] += weight
+        for term, frequency in terms.items():
+            if term not in self.postings:
+                self._sorted_terms = None
+            self.postings[term][pk] = frequency
+        self.lengths[pk] = sum(terms.values())
+        self.terms[pk] = terms
+
+    def remove(self, pk):
+        for term in self.terms.pop(pk, ()):
+            self.postings[term].pop(pk, None)
+            if not self.postings[term]:
+                del self.postings[term]
+                self._sorted_terms = None
+        self.lengths.pop(pk, None)
+
+    def sorted_terms(self):
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self.postings)
+        return self._sorted_terms
+
+    def expand(self, token):
+        # terminos que empiezan con la palabra, mas los candidatos con errores de tipeo
+        terms = self.sorted_terms()
+        start = bisect.bisect_left(terms, token)
+        matches = []
+        for term in terms[start:]:
+            if not term.startswith(token):
+                break
+            matches.append(term)
+
+        if not max_typos(token):
+            return matches
+        low, high, shortest, longest = typo_range(token)
+        nearby = [
+            term for term in terms[bisect.bisect_left(terms, low):bisect.bisect_left(terms, high)]
+            if shortest <= len(term) <= longest
+        ]
+        return matches + typo_candidates(token, nearby[:TYPO_VOCABULARY_LIMIT])
+
+    def search(self, query, limit, candidates=None, k1=1.2, b=0.75):
+        # ranking BM25; todas las palabras deben coincidir
+        if not self.lengths:
+            return []
+        total = len(self.lengths)
+        average = sum(self.lengths.values()) / total
+
+        scores = None
+        for token in tokenize(query):
+            token_scores = {}
+            for term in self.expand(token):
+                postings = self.postings[term]
+                idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+                for pk, frequency in postings.items():
+                    norm = frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * self.lengths[pk] / average))
+                    token_scores[pk] = max(token_scores.get(pk, 0), idf * norm)
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {pk: score + token_scores[pk] for pk, score in scores.items() if pk in token_scores}
+
+        if candidates is not None and scores:
+            scores = {pk: score for pk, score in scores.items() if pk in candidates}
+        return sorted(scores or {}, key=lambda pk: (-scores[pk], -pk))[:limit]
+
+
+class PythonBackend:
+    # indice en memoria del proceso, para bases de datos sin FTS5.
+    # Se construye al primer uso y se actualiza solo con las escrituras de este
+    # proceso: con varios workers (o importaciones desde otro proceso) cada uno
+    # ve un indice desactualizado. Usar solo con un proceso (desarrollo, tests)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.built = False
+        self.users = defaultdict(UserIndex)
+        self.owners = {}
+
+    def _add(self, docs):
+        for pk, (user_id, title, tags, ingredients) in docs.items():
+            self._remove([pk])
+            self.users[user_id].add(pk, title, tags, ingredients)
+            self.owners[pk] = user_id
+
+    def _remove(self, recipe_ids):
+        for pk in recipe_ids:
+            user_id = self.owners.pop(pk, None)
+            if user_id is not None:
+                self.users[user_id].remove(pk)
+
+    def build(self, chunk_size=2000):
+        with self.lock:
+            self.reset()
+            ids = Recipe.objects.values_list('id', flat=True).iterator(chunk_size=chunk_size)
+            chunk = []
+            for pk in ids:
+                chunk.append(pk)
+                if len(chunk) == chunk_size:
+                    self._add(documents(chunk))
+                    chunk = []
+            self._add(documents(chunk))
+            self.built = True
+
+    def index(self, recipe_ids):
+        if not self.built:
+            return
+        docs = documents(recipe_ids)
+        with self.lock:
+            self._remove(set(recipe_ids) - set(docs))
+            self._add(docs)
+
+    def remove(self, recipe_ids):
+        with self.lock:
+            self._remove(recipe_ids)
+
+    def search(self, user_id, query, limit, candidates=None):
+        if not self.built:
+            self.build()
+        if candidates is not None:
+            candidates = set(candidates.values_list('id', flat=True))
+        with self.lock:
+            return self.users[user_id].search(query, limit, candidates) if user_id in self.users else []
+
+
+fts5_backend = FTS5Backend()
+python_backend = PythonBackend()
+_fts5_available = None
+
+
+def get_backend():
+    # FTS5 si la tabla existe (SQLite), si no el indice en memoria
+    global _fts5_available
+    backend = getattr(settings, 'RECIPE_SEARCH_BACKEND', 'auto')
+    if backend == 'python':
+        return python_backend
+    if backend == 'fts5':
+        return fts5_backend
+
+    if _fts5_available is None:
+        _fts5_available = (
+            connection.vendor == 'sqlite' and SEARCH_TABLE in connection.introspection.table_names()
+        )
+    return fts5_backend if _fts5_available else python_backend
+
+
+_pending = threading.local()
+
+
+def schedule_index(recipe_ids):
+    # reindexar al confirmar la transaccion, una sola vez por receta
+    pending = getattr(_pending, 'ids', None)
+    if pending is None:
+        pending = _pending.ids = set()
+    pending.update(recipe_ids)
+    transaction.on_commit(flush_index)
+
+
+def flush_index():
+    pending = getattr(_pending, 'ids', None)
+    if pending:
+        recipe_ids = list(pending)
+        pending.clear()
+        get_backend().index(recipe_ids)
+
+
+def remove_from_index(recipe_ids):
+    get_backend().remove(recipe_ids)
+
+
+def search_recipes(queryset, user, query):
+    # filtrar y ordenar por relevancia las recetas que coinciden con la busqueda;
+    # el backend rankea solo las recetas del queryset ya filtrado
+    ids = get_backend().search(user.id, query, getattr(settings, 'RECIPE_SEARCH_LIMIT', 100), candidates=queryset)
+    if not ids:
+        return queryset.none()
+
+    return queryset.filter(id__in=ids).order_by(Case(*[When(id=pk, then=rank) for rank, pk in enumerate(ids)]))
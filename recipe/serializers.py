@@ -1,36 +1,194 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.storage import default_storage
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS, ManyRelatedField
 
-from core.models import Tag, Ingredient, Recipe
+from core.models import Tag, Ingredient, Recipe, CatalogStats, fold_name
+from recipe.caching import bump_version
+from recipe.links import RELATIONS, apply_links
+from recipe.search import schedule_index
+from recipe.stats import LINK_COUNTERS, update_stats
 
 
-class TagSerializer(serializers.ModelSerializer):
+class UniqueNameListSerializer(serializers.ListSerializer):
+    # para listas (bulk) el nombre unico se revisa con un solo query para todo el payload
+
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        request = self.context.get('request')
+        if request is None:
+            return items
+
+        folded = [fold_name(item['name']) if 'name' in item else None for item in items]
+        existing = set(self.child.Meta.model.objects.filter(
+            user=request.user, name_folded__in={key for key in folded if key is not None},
+        ).values_list('name_folded', flat=True))
+        errors, seen = [], set()
+        for key in folded:
+            if key is not None and (key in existing or key in seen):
+                errors.append({'name': [_('An object with this name already exists.')]})
+            else:
+                errors.append({})
+            seen.add(key)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        return items
+
+
+class UniqueNameMixin:
+    # nombre unico por usuario sin distinguir mayusculas, como la restriccion de la base.
+    # En listas lo revisa UniqueNameListSerializer y en bulk_update (context bulk)
+    # la restriccion, que conflicts_as_errors convierte en 400
+
+    def validate_name(self, value):
+        request = self.context.get('request')
+        if request is None or self.context.get('bulk') or isinstance(self.parent, serializers.ListSerializer):
+            return value
+
+        queryset = self.Meta.model.objects.filter(user=request.user, name_folded=fold_name(value))
+        if isinstance(self.instance, self.Meta.model):
+            queryset = queryset.exclude(pk=self.instance.pk)
+        if queryset.exists():
+            raise serializers.ValidationError(_('An object with this name already exists.'))
+
+        return value
+
+
+class TagSerializer(UniqueNameMixin, serializers.ModelSerializer):
     # serializador para los Tags
 
     class Meta:
         model = Tag
         fields = ('id', 'name')
         read_only_fields = ('id', )
+        list_serializer_class = UniqueNameListSerializer
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(UniqueNameMixin, serializers.ModelSerializer):
     # serializador para los ingredientes
 
     class Meta:
         model = Ingredient
         fields = ('id', 'name')
         read_only_fields = ('id', )
+        list_serializer_class = UniqueNameListSerializer
+
+
+class TagCountSerializer(TagSerializer):
+    # Tags con la cantidad de recetas que los usan
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ('recipe_count', )
+
+
+class IngredientCountSerializer(IngredientSerializer):
+    # ingredientes con la cantidad de recetas que los usan
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(IngredientSerializer.Meta):
+        fields = IngredientSerializer.Meta.fields + ('recipe_count', )
+
+
+class UserManyRelatedField(ManyRelatedField):
+    # lista de pks resuelta con un solo query en vez de uno por pk
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        return self.child_relation.to_internal_values(data)
+
+
+class UserPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    # pk de un objeto del usuario del request; con many=True todos los pks se
+    # resuelven juntos con un query id__in
+    default_error_messages = {
+        'does_not_exist_many': _('Invalid pks {pk_values} - objects do not exist.'),
+    }
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return UserManyRelatedField(**list_kwargs)
+
+    def get_queryset(self):
+        # los objetos de otros usuarios no existen para este usuario
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if request is None or not request.user.is_authenticated:
+            return queryset.none()
+        return queryset.filter(user=request.user)
+
+    def to_internal_values(self, data):
+        pks = []
+        for value in data:
+            if self.pk_field is not None:
+                value = self.pk_field.to_internal_value(value)
+            try:
+                if isinstance(value, bool):
+                    raise TypeError
+                pks.append(self.get_queryset().model._meta.pk.to_python(value))
+            except (TypeError, DjangoValidationError):
+                self.fail('incorrect_type', data_type=type(value).__name__)
+
+        objects = self.get_queryset().in_bulk(pks)
+        missing = [pk for pk in dict.fromkeys(pks) if pk not in objects]
+        if missing:
+            self.fail('does_not_exist_many', pk_values=missing)
 
+        return [objects[pk] for pk in pks]
 
-class RecipeSerializer(serializers.ModelSerializer):
+
+class FieldsetMixin:
+    # recortar los campos segun context['fields'] y anidar las relaciones de context['expand']
+    expand_serializers = {'tags': TagSerializer, 'ingredients': IngredientSerializer}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields')
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name in self.context.get('expand', ()):
+            if name in self.fields:
+                self.fields[name] = self.expand_serializers[name](many=True, read_only=True)
+
+
+class RecipeSerializer(FieldsetMixin, serializers.ModelSerializer):
     # serializador para las Recetas
-    ingredients = serializers.PrimaryKeyRelatedField(many=True, queryset=Ingredient.objects.all())
-    tags = serializers.PrimaryKeyRelatedField(many=True, queryset=Tag.objects.all())
+    ingredients = UserPrimaryKeyRelatedField(many=True, queryset=Ingredient.objects.all())
+    tags = UserPrimaryKeyRelatedField(many=True, queryset=Tag.objects.all())
 
     class Meta:
         model = Recipe
         fields = ('id', 'title', 'ingredients', 'tags', 'time_minutes', 'price', 'link')
         read_only_fields = ('id', )
 
+    def update(self, instance, validated_data):
+        # tags e ingredients por diferencia con las filas actuales, en vez de set()
+        links = {relation: validated_data.pop(relation) for relation in RELATIONS if relation in validated_data}
+        instance = super().update(instance, validated_data)
+
+        delta = apply_links([(instance.id, relation, [obj.pk for obj in objs]) for relation, objs in links.items()])
+        if any(added or removed for added, removed in delta.values()):
+            # lo que hacen las señales m2m_changed con set()
+            update_stats(instance.user_id, {
+                LINK_COUNTERS[relation]: added - removed for relation, (added, removed) in delta.items()
+            })
+            bump_version(instance.user_id)
+            schedule_index([instance.id])
+
+        return instance
+
+
 class RecipeDetailSerializer(RecipeSerializer):
     # serializa los detalles de una receta
     ingredients = IngredientSerializer(many=True, read_only=True)
@@ -39,8 +197,66 @@ class RecipeDetailSerializer(RecipeSerializer):
 
 class RecipeImageSerializer(serializers.ModelSerializer):
     # serializar imagenes
+    image_renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
-        read_only_fields = ('id',)
\ No newline at end of file
+        fields = ('id', 'image', 'image_status', 'image_renditions')
+        read_only_fields = ('id', 'image_status')
+
+    def get_image_renditions(self, obj):
+        # urls de las versiones redimensionadas
+        request = self.context.get('request')
+        urls = {name: default_storage.url(path) for name, path in obj.image_renditions.items()}
+        if request is not None:
+            return {name: request.build_absolute_uri(url) for name, url in urls.items()}
+        return urls
+
+
+class NameListField(serializers.ListField):
+    # lista de nombres de tags o ingredients
+    child = serializers.CharField(max_length=255)
+
+
+class RecipeImportSerializer(serializers.ModelSerializer):
+    # validar recetas importadas, con tags e ingredients por nombre
+    ingredients = serializers.ListField(child=serializers.CharField(max_length=255), required=False)
+    tags = serializers.ListField(child=serializers.CharField(max_length=255), required=False)
+
+    class Meta:
+        model = Recipe
+        fields = ('title', 'ingredients', 'tags', 'time_minutes', 'price', 'link')
+
+
+class CatalogStatsSerializer(serializers.ModelSerializer):
+    # estadisticas del catalogo del usuario, calculadas desde los contadores
+    average_price = serializers.SerializerMethodField()
+    average_time_minutes = serializers.SerializerMethodField()
+    average_tags = serializers.SerializerMethodField()
+    average_ingredients = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CatalogStats
+        fields = (
+            'recipe_count', 'tag_count', 'ingredient_count',
+            'average_price', 'average_time_minutes', 'average_tags', 'average_ingredients',
+        )
+        read_only_fields = fields
+
+    def average(self, obj, total, places=2):
+        if not obj.recipe_count:
+            return None
+        return round(total / obj.recipe_count, places)
+
+    def get_average_price(self, obj):
+        average = self.average(obj, obj.price_total)
+        return None if average is None else str(average)
+
+    def get_average_time_minutes(self, obj):
+        return self.average(obj, obj.time_total, 1)
+
+    def get_average_tags(self, obj):
+        return self.average(obj, obj.tag_links)
+
+    def get_average_ingredients(self, obj):
+        return self.average(obj, obj.ingredient_links)
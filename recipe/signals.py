@@ -0,0 +1,163 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from core.models import Tag, Ingredient, Recipe
+from recipe.caching import bump_version, reset_version
+from recipe.filters import relation_links
+from recipe.images import release_image
+from recipe.search import schedule_index, remove_from_index
+from recipe.stats import (
+    MODEL_COUNTERS, contribution, link_counts, negate, recipe_values, update_link_stats, update_stats,
+)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def bump_user_version(sender, instance, **kwargs):
+    # cualquier escritura invalida las respuestas en cache del usuario, al
+    # confirmar su transaccion (ver bump_version)
+    bump_version(instance.user_id)
+
+
+@receiver(post_delete, sender=Recipe)
+def release_recipe_image(sender, instance, **kwargs):
+    # borrar la imagen de la receta si ninguna otra la usa
+    release_image(instance.image.name, instance.image_renditions)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def bump_user_version_m2m(sender, instance, action, **kwargs):
+    # cambios en tags o ingredients de una receta
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_version(instance.user_id)
+
+
+@receiver(post_save, sender=get_user_model())
+def reset_user_version(sender, instance, created, **kwargs):
+    # un usuario nuevo nunca reutiliza versiones de un id anterior
+    if created:
+        reset_version(instance.id)
+
+
+@receiver(post_save, sender=Recipe)
+def index_recipe(sender, instance, **kwargs):
+    # actualizar el indice de busqueda
+    schedule_index([instance.id])
+
+
+@receiver(post_delete, sender=Recipe)
+def unindex_recipe(sender, instance, **kwargs):
+    remove_from_index([instance.id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def index_recipe_m2m(sender, instance, action, reverse, pk_set, **kwargs):
+    # reindexar las recetas cuyos tags o ingredients cambiaron
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            schedule_index([instance.id])
+    elif action == 'pre_clear':
+        instance._search_recipe_ids = list(instance.recipe_set.values_list('id', flat=True))
+    elif action == 'post_clear':
+        schedule_index(getattr(instance, '_search_recipe_ids', []))
+    elif action in ('post_add', 'post_remove'):
+        schedule_index(pk_set)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def index_renamed_attr(sender, instance, created, **kwargs):
+    # un tag o ingrediente renombrado cambia el texto de sus recetas
+    if not created:
+        schedule_index(instance.recipe_set.values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def collect_attr_recipes(sender, instance, **kwargs):
+    instance._search_recipe_ids = list(instance.recipe_set.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def index_deleted_attr(sender, instance, **kwargs):
+    schedule_index(getattr(instance, '_search_recipe_ids', []))
+
+
+@receiver(pre_save, sender=Recipe)
+def collect_recipe_stats(sender, instance, update_fields=None, **kwargs):
+    # precio y tiempo anteriores, para sumar solo la diferencia a los totales
+    instance._stats_previous = None
+    if instance._state.adding or (update_fields is not None and not {'price', 'time_minutes'} & set(update_fields)):
+        return
+
+    instance._stats_previous = Recipe.objects.filter(pk=instance.pk).values('price', 'time_minutes').first()
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_stats(sender, instance, created, **kwargs):
+    values = recipe_values(instance.price, instance.time_minutes)
+    if created:
+        update_stats(instance.user_id, {'recipe_count': 1, **values})
+    elif getattr(instance, '_stats_previous', None):
+        previous = recipe_values(instance._stats_previous['price'], instance._stats_previous['time_minutes'])
+        update_stats(instance.user_id, {counter: values[counter] - previous[counter] for counter in values})
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def update_attr_stats(sender, instance, created, **kwargs):
+    if created:
+        update_stats(instance.user_id, {MODEL_COUNTERS[sender]: 1})
+
+
+@receiver(pre_delete, sender=Recipe)
+def collect_deleted_recipe_stats(sender, instance, **kwargs):
+    # las filas M2M se borran en cascada sin señal m2m_changed
+    instance._stats_contribution = contribution(Recipe, [instance.pk])
+
+
+@receiver(post_delete, sender=Recipe)
+def update_deleted_recipe_stats(sender, instance, **kwargs):
+    update_stats(instance.user_id, negate(getattr(instance, '_stats_contribution', {})))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def collect_deleted_attr_stats(sender, instance, **kwargs):
+    relation = 'tags' if sender is Tag else 'ingredients'
+    _, field = relation_links(relation)
+    instance._stats_links = link_counts(relation, **{field: instance.pk})
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def update_deleted_attr_stats(sender, instance, **kwargs):
+    update_stats(instance.user_id, {MODEL_COUNTERS[sender]: -1})
+    update_link_stats('tags' if sender is Tag else 'ingredients', getattr(instance, '_stats_links', {}), -1)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def update_m2m_stats(sender, instance, action, reverse, pk_set, **kwargs):
+    # contar las filas agregadas despues de insertarlas y las quitadas antes de borrarlas
+    relation = 'tags' if sender is Recipe.tags.through else 'ingredients'
+    _, field = relation_links(relation)
+    filters = {field if reverse else 'recipe_id': instance.pk}
+    if pk_set is not None:
+        filters['recipe_id__in' if reverse else f'{field}__in'] = pk_set
+
+    attr = f'_stats_{relation}_links'
+    if action == 'post_add' and pk_set:
+        update_link_stats(relation, link_counts(relation, **filters))
+    elif action in ('pre_remove', 'pre_clear'):
+        setattr(instance, attr, link_counts(relation, **filters))
+    elif action in ('post_remove', 'post_clear'):
+        update_link_stats(relation, getattr(instance, attr, {}), -1)
@@ -0,0 +1,103 @@
+from decimal import Decimal
+
+from django.db.models import Count, F, Sum
+
+from core.models import Tag, Ingredient, Recipe, CatalogStats
+
+COUNTERS = (
+    'recipe_count', 'tag_count', 'ingredient_count', 'price_total', 'time_total', 'tag_links', 'ingredient_links',
+)
+# contador de objetos de cada modelo
+MODEL_COUNTERS = {Recipe: 'recipe_count', Tag: 'tag_count', Ingredient: 'ingredient_count'}
+# contador de filas de cada relacion M2M de Recipe
+LINK_COUNTERS = {'tags': 'tag_links', 'ingredients': 'ingredient_links'}
+
+
+def recipe_values(price, time_minutes):
+    # aporte de una receta a los totales de precio y tiempo
+    return {'price_total': Decimal(str(price or 0)), 'time_total': time_minutes or 0}
+
+
+def compute_stats(user_id):
+    # contadores calculados desde cero, para construir o verificar el registro
+    totals = Recipe.objects.filter(user_id=user_id).aggregate(
+        recipe_count=Count('id'), price_total=Sum('price'), time_total=Sum('time_minutes')
+    )
+    totals['tag_count'] = Tag.objects.filter(user_id=user_id).count()
+    totals['ingredient_count'] = Ingredient.objects.filter(user_id=user_id).count()
+    for relation, counter in LINK_COUNTERS.items():
+        totals[counter] = getattr(Recipe, relation).through.objects.filter(recipe__user_id=user_id).count()
+
+    return {counter: totals[counter] or 0 for counter in COUNTERS}
+
+
+def contribution(model, ids):
+    # aporte a los contadores de los objetos indicados (todos del mismo usuario)
+    if not ids:
+        return {}
+    if model is not Recipe:
+        return {MODEL_COUNTERS[model]: model.objects.filter(id__in=ids).count()}
+
+    totals = Recipe.objects.filter(id__in=ids).aggregate(
+        recipe_count=Count('id'), price_total=Sum('price'), time_total=Sum('time_minutes')
+    )
+    for relation, counter in LINK_COUNTERS.items():
+        totals[counter] = getattr(Recipe, relation).through.objects.filter(recipe_id__in=ids).count()
+
+    return {counter: value or 0 for counter, value in totals.items()}
+
+
+def difference(after, before):
+    return {counter: after.get(counter, 0) - before.get(counter, 0) for counter in set(after) | set(before)}
+
+
+def negate(values):
+    return {counter: -value for counter, value in values.items()}
+
+
+def link_counts(relation, **filters):
+    # filas de la relacion M2M agrupadas por dueño de la receta: {user_id: filas}
+    links = getattr(Recipe, relation).through.objects.filter(**filters)
+    return dict(links.values_list('recipe__user_id').annotate(total=Count('pk')).order_by())
+
+
+def update_stats(user_id, delta):
+    # sumar los cambios al registro del usuario; si aun no existe se calcula al leerlo
+    delta = {counter: value for counter, value in delta.items() if value}
+    if delta:
+        CatalogStats.objects.filter(user_id=user_id).update(
+            **{counter: F(counter) + value for counter, value in delta.items()}
+        )
+
+
+def update_link_stats(relation, counts, sign=1):
+    for user_id, total in counts.items():
+        update_stats(user_id, {LINK_COUNTERS[relation]: sign * total})
+
+
+def get_stats(user_id):
+    # registro de estadisticas del usuario, construido la primera vez que se lee
+    stats = CatalogStats.objects.filter(user_id=user_id).first()
+    if stats is None:
+        stats, _ = CatalogStats.objects.get_or_create(user_id=user_id, defaults=compute_stats(user_id))
+
+    return stats
+
+
+def verify_stats(user_id):
+    # contadores guardados que no coinciden con el calculo: {contador: (guardado, calculado)}
+    stored = CatalogStats.objects.filter(user_id=user_id).values(*COUNTERS).first()
+    if stored is None:
+        return {}
+
+    computed = compute_stats(user_id)
+    return {
+        counter: (stored[counter], computed[counter])
+        for counter in COUNTERS
+        if stored[counter] != computed[counter]
+    }
+
+
+def rebuild_stats(user_id):
+    # recalcular el registro desde cero
+    CatalogStats.objects.update_or_create(user_id=user_id, defaults=compute_stats(user_id))
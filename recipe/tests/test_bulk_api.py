@@ -0,0 +1,154 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Recipe, Tag, Ingredient
+from core.testing import QueryBudgetMixin
+
+TAGS_BULK_URL = reverse('recipe:tag-bulk-create')
+INGREDIENTS_BULK_URL = reverse('recipe:ingredient-bulk-create')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk-create')
+
+
+class BulkApiTests(QueryBudgetMixin, TestCase):
+    # probar endpoints de escritura en lote
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('test@mail.com', 'pass123')
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_tags(self):
+        # probar crear varios tags en un request
+        payload = [{'name': 'Vegan'}, {'name': 'Dessert'}]
+
+        res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['name'] for item in res.data], ['Vegan', 'Dessert'])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_create_tags_constant_queries(self):
+        # probar que los nombres del lote se revisan con un solo query
+        with CaptureQueriesContext(connection) as few:
+            self.client.post(TAGS_BULK_URL, [{'name': f'Tag {index}'} for index in range(2)], format='json')
+        with CaptureQueriesContext(connection) as many:
+            self.client.post(TAGS_BULK_URL, [{'name': f'Other {index}'} for index in range(50)], format='json')
+
+        self.assertEqual(len(many), len(few))
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 52)
+
+    def test_bulk_create_existing_names(self):
+        # probar que los nombres existentes o repetidos se reportan por item
+        Tag.objects.create(user=self.user, name='Vegan')
+        payload = [{'name': 'Dessert'}, {'name': 'VEGAN'}, {'name': 'dessert'}]
+
+        res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('name', res.data[1])
+        self.assertIn('name', res.data[2])
+        self.assertEqual(Tag.objects.count(), 1)
+
+    def test_bulk_create_reports_errors_per_item(self):
+        # probar que un item invalido no crea ningun objeto
+        payload = [{'name': 'Salt'}, {'name': ''}]
+
+        res = self.client.post(INGREDIENTS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('name', res.data[1])
+        self.assertFalse(Ingredient.objects.exists())
+
+    def test_bulk_create_requires_list(self):
+        # probar que el payload debe ser una lista
+        res = self.client.post(TAGS_BULK_URL, {'name': 'Vegan'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_recipes_with_relations(self):
+        # probar crear recetas con tags e ingredients en lote
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        payload = [
+            {'title': 'one', 'time_minutes': 5, 'price': '1.00', 'tags': [tag.id], 'ingredients': [ingredient.id]},
+            {'title': 'two', 'time_minutes': 10, 'price': '2.00', 'tags': [tag.id], 'ingredients': []},
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data[0]['tags'], [tag.id])
+        self.assertEqual(res.data[0]['ingredients'], [ingredient.id])
+        recipe = Recipe.objects.get(id=res.data[1]['id'])
+        self.assertEqual(recipe.user, self.user)
+        self.assertEqual(list(recipe.tags.all()), [tag])
+
+    def test_bulk_update_recipes(self):
+        # probar actualizar varias recetas y sus tags
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe1 = Recipe.objects.create(user=self.user, title='one', time_minutes=5, price=1.00)
+        recipe2 = Recipe.objects.create(user=self.user, title='two', time_minutes=5, price=1.00)
+        recipe2.tags.add(tag)
+        payload = [{'id': recipe1.id, 'title': 'new one', 'tags': [tag.id]}, {'id': recipe2.id, 'tags': []}]
+
+        res = self.client.patch(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe1.refresh_from_db()
+        self.assertEqual(recipe1.title, 'new one')
+        self.assertEqual(list(recipe1.tags.all()), [tag])
+        self.assertFalse(recipe2.tags.exists())
+
+    def test_bulk_update_other_user_not_found(self):
+        # probar que no se actualizan objetos de otro usuario
+        user2 = get_user_model().objects.create_user('other@mail.com', 'pass123')
+        tag = Tag.objects.create(user=user2, name='Vegan')
+
+        res = self.client.patch(TAGS_BULK_URL, [{'id': tag.id, 'name': 'Mine'}], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('id', res.data[0])
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Vegan')
+
+    def test_bulk_update_tag_names(self):
+        # probar renombrar tags en lote, con name_folded al dia y conflictos como 400
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        quick = Tag.objects.create(user=self.user, name='Quick')
+
+        res = self.client.patch(TAGS_BULK_URL, [{'id': vegan.id, 'name': 'Ñame'}], format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(Tag.objects.get(id=vegan.id).name_folded, 'ñame')
+
+        res = self.client.patch(TAGS_BULK_URL, [{'id': quick.id, 'name': 'ÑAME'}], format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        quick.refresh_from_db()
+        self.assertEqual(quick.name, 'Quick')
+
+    def test_bulk_delete_recipes(self):
+        # probar borrar varias recetas
+        recipe1 = Recipe.objects.create(user=self.user, title='one', time_minutes=5, price=1.00)
+        recipe2 = Recipe.objects.create(user=self.user, title='two', time_minutes=5, price=1.00)
+
+        res = self.client.delete(RECIPES_BULK_URL, [recipe1.id, recipe2.id], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_delete_missing_id(self):
+        # probar que un id inexistente no borra nada
+        recipe = Recipe.objects.create(user=self.user, title='one', time_minutes=5, price=1.00)
+
+        res = self.client.delete(RECIPES_BULK_URL, [recipe.id, 'x'], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertTrue(Recipe.objects.exists())
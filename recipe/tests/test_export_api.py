@@ -0,0 +1,71 @@
+import csv
+import io
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Recipe, Tag, Ingredient
+from core.testing import QueryBudgetMixin
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+class RecipeExportTests(QueryBudgetMixin, TestCase):
+    # probar exportacion de recetas en streaming
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('test@mail.com', 'pass123')
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        self.recipe = Recipe.objects.create(user=self.user, title='Soup', time_minutes=5, price=5.00)
+        self.recipe.tags.add(self.tag)
+        self.recipe.ingredients.add(self.ingredient)
+
+    def test_export_ndjson(self):
+        # probar exportar recetas como ndjson
+        other = get_user_model().objects.create_user('other@mail.com', 'pass123')
+        Recipe.objects.create(user=other, title='Other', time_minutes=5, price=5.00)
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0]), {
+            'id': self.recipe.id,
+            'title': 'Soup',
+            'ingredients': [{'id': self.ingredient.id, 'name': 'Salt'}],
+            'tags': [{'id': self.tag.id, 'name': 'Vegan'}],
+            'time_minutes': 5,
+            'price': '5.00',
+            'link': '',
+        })
+
+    def test_export_csv(self):
+        # probar exportar recetas como csv
+        res = self.client.get(EXPORT_URL, {'format': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        rows = list(csv.reader(io.StringIO(b''.join(res.streaming_content).decode())))
+        self.assertEqual(rows[0], ['id', 'title', 'time_minutes', 'price', 'link', 'tags', 'ingredients'])
+        self.assertEqual(rows[1], [str(self.recipe.id), 'Soup', '5', '5.00', '', 'Vegan', 'Salt'])
+
+    def test_export_queries_per_chunk(self):
+        # probar que las consultas crecen por lote y no por receta
+        Recipe.objects.bulk_create([
+            Recipe(user=self.user, title=f'recipe {i}', time_minutes=5, price=5.00) for i in range(20)
+        ])
+
+        res = self.client.get(EXPORT_URL)
+        with self.assertNumQueries(3):
+            lines = b''.join(res.streaming_content).splitlines()
+
+        self.assertEqual(len(lines), 21)
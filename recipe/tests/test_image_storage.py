@@ -0,0 +1,181 @@
+import io
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Recipe, ImageBlob
+from core.testing import QueryBudgetMixin
+from recipe.images import acquire_blob
+from PIL import Image
+
+
+def image_upload_url(recipe_id):
+    # url de retorno de imagen subida
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def sample_recipe(user, **params):
+    # crea y retorna una receta
+    defaults = {'title': 'sample recipe', 'time_minutes': 6, 'price': 5.00}
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+@override_settings(IMAGE_PROCESSING_ASYNC=False, RECIPE_IMAGE_CONTENT_ADDRESSED=True)
+class ContentAddressedImageTests(QueryBudgetMixin, TestCase):
+    # probar imagenes guardadas por contenido y compartidas entre recetas
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('test@mail.com', 'pass123')
+        self.client.force_authenticate(self.user)
+        self.recipe1 = sample_recipe(user=self.user)
+        self.recipe2 = sample_recipe(user=self.user)
+
+    def upload(self, recipe, color='red'):
+        # sube una imagen de un color a la receta
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new('RGB', (10, 10), color).save(ntf, format='JPEG')
+            ntf.seek(0)
+            with self.captureOnCommitCallbacks(execute=True):
+                res = self.client.post(image_upload_url(recipe.id), {'image': ntf}, format='multipart')
+        recipe.refresh_from_db()
+        return res
+
+    def delete(self, recipe):
+        # borra la receta ejecutando el borrado de archivos
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.delete()
+
+    def test_duplicate_uploads_share_blob(self):
+        # probar que la misma imagen se guarda una sola vez
+        self.upload(self.recipe1)
+        res = self.upload(self.recipe2)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.recipe1.image.name, self.recipe2.image.name)
+        self.assertEqual(self.recipe1.image_renditions, self.recipe2.image_renditions)
+        blob = ImageBlob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(blob.renditions, self.recipe1.image_renditions)
+
+        self.delete(self.recipe1)
+        self.assertTrue(default_storage.exists(blob.path))
+
+        self.delete(self.recipe2)
+        self.assertFalse(default_storage.exists(blob.path))
+        self.assertFalse(any(default_storage.exists(path) for path in blob.renditions.values()))
+        self.assertFalse(ImageBlob.objects.exists())
+
+    def test_replaced_image_garbage_collected(self):
+        # probar que la imagen reemplazada se borra si nadie la usa
+        self.upload(self.recipe1, color='red')
+        old = ImageBlob.objects.get()
+        self.upload(self.recipe1, color='blue')
+        self.addCleanup(self.delete, self.recipe1)
+
+        self.assertFalse(default_storage.exists(old.path))
+        self.assertFalse(ImageBlob.objects.filter(pk=old.pk).exists())
+        self.assertTrue(default_storage.exists(self.recipe1.image.name))
+
+    def test_reacquired_blob_keeps_files(self):
+        # probar que los archivos no se borran si la imagen se vuelve a subir
+        # antes de ejecutar el borrado de la ultima referencia
+        self.upload(self.recipe1)
+        blob = ImageBlob.objects.get()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.recipe1.delete()
+        self.upload(self.recipe2)
+        self.addCleanup(self.delete, self.recipe2)
+
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(self.recipe2.image.name, blob.path)
+        self.assertTrue(default_storage.exists(blob.path))
+        self.assertTrue(all(default_storage.exists(path) for path in self.recipe2.image_renditions.values()))
+        self.assertEqual(ImageBlob.objects.get().ref_count, 1)
+
+    def test_acquire_retries_deleted_blob(self):
+        # probar que si el blob se borra entre leerlo y sumarle la referencia
+        # se vuelve a crear
+        upload = SimpleUploadedFile('photo.jpg', b'data')
+        stale = ImageBlob.objects.create(digest='x' * 64, path='uploads/recipe/stale.jpg')
+        ImageBlob.objects.filter(pk=stale.pk).delete()
+        results = iter([(stale, False)])
+        get_or_create = ImageBlob.objects.get_or_create
+
+        with mock.patch.object(
+            ImageBlob.objects, 'get_or_create', side_effect=lambda **kwargs: next(results, None) or get_or_create(**kwargs),
+        ):
+            blob = acquire_blob(upload)
+        self.addCleanup(default_storage.delete, blob.path)
+
+        self.assertNotEqual(blob.pk, stale.pk)
+        self.assertEqual(ImageBlob.objects.get().ref_count, 1)
+        self.assertTrue(default_storage.exists(blob.path))
+
+    @override_settings(RECIPE_IMAGE_CONTENT_ADDRESSED=False)
+    def test_uuid_image_deleted_with_recipe(self):
+        # probar que se borra la imagen propia al borrar la receta
+        self.upload(self.recipe1)
+        name = self.recipe1.image.name
+
+        self.delete(self.recipe1)
+
+        self.assertFalse(default_storage.exists(name))
+
+    def test_gc_command_deletes_orphans(self):
+        # probar que el comando borra archivos sin referencias
+        orphan = default_storage.save('uploads/recipe/orphan.jpg', io.BytesIO(b'data'))
+        self.upload(self.recipe1)
+        self.addCleanup(self.delete, self.recipe1)
+        ImageBlob.objects.update(ref_count=0)
+
+        call_command('gc_recipe_images', grace_seconds=0, stdout=io.StringIO())
+
+        self.assertFalse(default_storage.exists(orphan))
+        self.assertTrue(default_storage.exists(self.recipe1.image.name))
+        self.assertEqual(ImageBlob.objects.get().ref_count, 1)
+
+    def test_gc_command_keeps_recent_files(self):
+        # probar que los archivos dentro del periodo de gracia no se borran
+        orphan = default_storage.save('uploads/recipe/orphan.jpg', io.BytesIO(b'data'))
+        self.addCleanup(default_storage.delete, orphan)
+
+        call_command('gc_recipe_images', grace_seconds=3600, stdout=io.StringIO())
+
+        self.assertTrue(default_storage.exists(orphan))
+
+    def test_gc_command_keeps_acquired_blobs(self):
+        # probar que un blob con referencias y sin receta guardada (subida en
+        # curso) conserva su fila, su cuenta y su archivo
+        upload = SimpleUploadedFile('photo.jpg', b'in flight')
+        blob = acquire_blob(upload)
+        self.addCleanup(default_storage.delete, blob.path)
+
+        call_command('gc_recipe_images', grace_seconds=0, stdout=io.StringIO())
+
+        self.assertEqual(ImageBlob.objects.get().ref_count, 1)
+        self.assertTrue(default_storage.exists(blob.path))
+
+    def test_gc_command_deletes_unreferenced_blobs(self):
+        # probar que un blob sin referencias ni recetas se borra con su archivo
+        upload = SimpleUploadedFile('photo.jpg', b'released')
+        blob = acquire_blob(upload)
+        self.addCleanup(default_storage.delete, blob.path)
+        ImageBlob.objects.update(ref_count=0)
+
+        call_command('gc_recipe_images', grace_seconds=0, stdout=io.StringIO())
+
+        self.assertFalse(ImageBlob.objects.exists())
+        self.assertFalse(default_storage.exists(blob.path))
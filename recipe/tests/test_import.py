@@ -0,0 +1,148 @@
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Recipe, Tag, Ingredient
+from core.testing import QueryBudgetMixin
+
+IMPORT_URL = reverse('recipe:recipe-import-recipes')
+
+
+def ndjson(*records):
+    # serializa registros como ndjson
+    return ''.join(json.dumps(record) + '\n' for record in records)
+
+
+class RecipeImportApiTests(QueryBudgetMixin, TestCase):
+    # probar importacion de recetas por el API
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('test@mail.com', 'pass123')
+        self.client.force_authenticate(self.user)
+
+    def test_import_ndjson_resolves_names(self):
+        # probar que se reusan tags existentes y se crean los que faltan
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        body = ndjson(
+            {'title': 'one', 'time_minutes': 5, 'price': '1.00', 'tags': ['Vegan', 'Quick'], 'ingredients': ['Salt']},
+            {'title': 'two', 'time_minutes': 5, 'price': '1.00', 'tags': [{'id': 99, 'name': 'Quick'}]},
+        )
+
+        res = self.client.generic('POST', IMPORT_URL, body, content_type='application/x-ndjson')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data, {'checkpoint': 2, 'created': 2})
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        recipe = Recipe.objects.get(title='one')
+        self.assertIn(tag, recipe.tags.all())
+        self.assertEqual(list(recipe.ingredients.values_list('name', flat=True)), ['Salt'])
+
+    def test_import_csv(self):
+        # probar importar recetas desde csv
+        body = 'title,time_minutes,price,link,tags,ingredients\nSoup,10,2.50,,Vegan;Quick,Salt\n'
+
+        res = self.client.generic('POST', IMPORT_URL, body, content_type='text/csv')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(recipe.tags.count(), 2)
+        self.assertEqual(Ingredient.objects.get(user=self.user).name, 'Salt')
+
+    def test_import_invalid_record_reports_checkpoint(self):
+        # probar que un registro invalido reporta el checkpoint de lo importado
+        body = ndjson(
+            {'title': 'one', 'time_minutes': 5, 'price': '1.00'},
+            {'title': 'two', 'time_minutes': 5, 'price': '1.00'},
+            {'title': 'bad'},
+        )
+
+        res = self.client.generic(
+            'POST', f'{IMPORT_URL}?batch_size=2', body, content_type='application/x-ndjson'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['record'], 3)
+        self.assertEqual(res.data['checkpoint'], 2)
+        self.assertEqual(Recipe.objects.count(), 2)
+
+    def test_import_invalid_record_writes_pending_batch(self):
+        # probar que con un lote mas grande que el registro invalido los
+        # registros validos anteriores se escriben y el checkpoint los cuenta
+        body = ndjson(
+            {'title': 'one', 'time_minutes': 5, 'price': '1.00'},
+            {'title': 'two', 'time_minutes': 5, 'price': '1.00'},
+            {'title': 'bad'},
+            {'title': 'four', 'time_minutes': 5, 'price': '1.00'},
+        )
+
+        res = self.client.generic('POST', IMPORT_URL, body, content_type='application/x-ndjson')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual((res.data['record'], res.data['checkpoint'], res.data['created']), (3, 2, 2))
+        self.assertEqual(sorted(Recipe.objects.values_list('title', flat=True)), ['one', 'two'])
+
+    def test_import_resume_from_checkpoint(self):
+        # probar retomar la importacion saltando registros ya importados
+        body = ndjson(
+            {'title': 'one', 'time_minutes': 5, 'price': '1.00'},
+            {'title': 'two', 'time_minutes': 5, 'price': '1.00'},
+        )
+
+        res = self.client.generic('POST', f'{IMPORT_URL}?skip=1', body, content_type='application/x-ndjson')
+
+        self.assertEqual(res.data, {'checkpoint': 2, 'created': 1})
+        self.assertEqual(list(Recipe.objects.values_list('title', flat=True)), ['two'])
+
+
+class ImportRecipesCommandTests(QueryBudgetMixin, TestCase):
+    # probar comando de importacion de recetas
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('test@mail.com', 'pass123')
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'recipes.ndjson')
+        self.checkpoint = os.path.join(self.dir.name, 'checkpoint')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_import_command_with_checkpoint(self):
+        # probar que el comando guarda y retoma desde el checkpoint
+        with open(self.path, 'w') as f:
+            f.write(ndjson(
+                {'title': 'one', 'time_minutes': 5, 'price': '1.00', 'tags': ['Vegan']},
+                {'title': 'bad'},
+            ))
+
+        with self.assertRaisesMessage(CommandError, '(checkpoint 1)'):
+            call_command(
+                'import_recipes', self.path, user=self.user.email,
+                checkpoint_file=self.checkpoint, stdout=io.StringIO(),
+            )
+        with open(self.checkpoint) as f:
+            self.assertEqual(f.read(), '1')
+
+        # corregir el registro invalido y retomar
+        with open(self.path, 'w') as f:
+            f.write(ndjson(
+                {'title': 'one', 'time_minutes': 5, 'price': '1.00', 'tags': ['Vegan']},
+                {'title': 'two', 'time_minutes': 5, 'price': '1.00', 'tags': ['Vegan']},
+            ))
+        call_command(
+            'import_recipes', self.path, user=self.user.email,
+            checkpoint_file=self.checkpoint, stdout=io.StringIO(),
+        )
+
+        self.assertEqual(sorted(Recipe.objects.values_list('title', flat=True)), ['one', 'two'])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
@@ -6,12 +6,13 @@ from rest_framework.test import APIClient
 from rest_framework import status
 
 from core.models import Ingredient
+from core.testing import QueryBudgetMixin
 from recipe.serializers import IngredientSerializer
 
 INGREDIENTS_URL = reverse('recipe:ingredient-list')
 
 
-class PublicIngredientsApiTests(TestCase):
+class PublicIngredientsApiTests(QueryBudgetMixin, TestCase):
     # probar API Ingredientes de acceso publicos
     
     def setUp(self):
@@ -23,7 +24,7 @@ class PublicIngredientsApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
-class PrivateIngredientsApiTests(TestCase):
+class PrivateIngredientsApiTests(QueryBudgetMixin, TestCase):
     # probar API privada de ingradientes
 
     def setUp(self):
@@ -63,6 +64,16 @@ class PrivateIngredientsApiTests(TestCase):
         exists = Ingredient.objects.filter(user=self.user, name=payload['name']).exists()
         self.assertTrue(exists)
 
+    def test_upsert_ingredients(self):
+        # probar crear y reutilizar ingredientes por nombre
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+
+        res = self.client.post(reverse('recipe:ingredient-upsert'), ['SALT', 'Pepper'], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        pepper = Ingredient.objects.get(user=self.user, name='Pepper')
+        self.assertEqual(res.data, [{'id': salt.id, 'name': 'Salt'}, {'id': pepper.id, 'name': 'Pepper'}])
+
     def test_create_ingredient_invalid(self):
         # prueba crear nuevo ingrediente invalido
         payload = {'name':''}
@@ -0,0 +1,70 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Recipe, Tag
+from core.testing import QueryBudgetMixin
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class CursorPaginationTests(QueryBudgetMixin, TestCase):
+    # probar paginacion por cursor de recetas y tags
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('test@mail.com', 'pass123')
+        self.client.force_authenticate(self.user)
+
+    def test_list_not_paginated_by_default(self):
+        # probar que sin parametros se retorna la lista completa
+        Recipe.objects.create(user=self.user, title='recipe', time_minutes=5, price=5.00)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(res.data, list)
+
+    def test_recipes_paginated_by_id_desc(self):
+        # probar recorrer todas las paginas de recetas con el cursor
+        recipes = [
+            Recipe.objects.create(user=self.user, title=f'recipe {i}', time_minutes=5, price=5.00)
+            for i in range(5)
+        ]
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [item['id'] for item in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids += [item['id'] for item in res.data['results']]
+
+        self.assertEqual(ids, sorted((recipe.id for recipe in recipes), reverse=True))
+
+    def test_tags_paginated_by_name_desc(self):
+        # probar paginar tags por nombre descendente
+        for name in ('Apple', 'Banana', 'Cherry'):
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+        names = [item['name'] for item in res.data['results']]
+        res = self.client.get(res.data['next'])
+        names += [item['name'] for item in res.data['results']]
+
+        self.assertEqual(names, ['Cherry', 'Banana', 'Apple'])
+        self.assertIsNone(res.data['next'])
+
+    def test_page_size_capped(self):
+        # probar que page_size no supera el maximo permitido
+        Recipe.objects.bulk_create([
+            Recipe(user=self.user, title=f'recipe {i}', time_minutes=5, price=5.00)
+            for i in range(510)
+        ])
+
+        res = self.client.get(RECIPES_URL, {'page_size': 1000})
+
+        self.assertEqual(len(res.data['results']), 500)
@@ -0,0 +1,181 @@
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Recipe, Tag, Ingredient
+from core.testing import QueryBudgetMixin
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+def detail_url(recipe_id):
+    # retorna receta detail url
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class RecipeQueryCountTests(QueryBudgetMixin, TestCase):
+    # probar que el numero de consultas no crece con el numero de recetas
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('test@mail.com', 'pass123')
+        self.client.force_authenticate(self.user)
+
+    def create_recipes(self, count):
+        # crea recetas con tags e ingredients asignados
+        tag, _ = Tag.objects.get_or_create(user=self.user, name='Vegan')
+        ingredient, _ = Ingredient.objects.get_or_create(user=self.user, name='Salt')
+        recipes = Recipe.objects.bulk_create([
+            Recipe(user=self.user, title=f'recipe {i}', time_minutes=5, price=5.00)
+            for i in range(count)
+        ])
+        for recipe in recipes:
+            recipe.tags.add(tag)
+            recipe.ingredients.add(ingredient)
+        return recipes
+
+    def test_list_recipes_constant_queries(self):
+        # probar que listar recetas usa un numero fijo de consultas
+        self.create_recipes(2)
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        # la version de las respuestas en cache cambia al confirmar la escritura
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_recipes(20)
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(len(res.data), 22)
+
+    def test_list_recipes_sparse_fields_single_query(self):
+        # probar que sin tags ni ingredients pedidos no se consultan las relaciones
+        self.create_recipes(5)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, {'fields': 'id,title'})
+        self.assertEqual(res.data[0].keys(), {'id', 'title'})
+
+        with self.assertNumQueries(2):
+            self.client.get(RECIPES_URL, {'fields': 'id,tags', 'expand': 'tags'})
+
+    def test_retrieve_recipe_detail_constant_queries(self):
+        # probar que el detalle de receta precarga tags e ingredients
+        recipe = self.create_recipes(1)[0]
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Dessert'))
+
+        with self.assertNumQueries(3):
+            res = self.client.get(detail_url(recipe.id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['tags']), 2)
+
+    def test_create_recipe_relations_constant_queries(self):
+        # probar que los ids de tags e ingredients se resuelven con un query por relacion
+        tags = Tag.objects.bulk_create([Tag(user=self.user, name=f'tag {i}') for i in range(40)])
+        ingredients = Ingredient.objects.bulk_create(
+            [Ingredient(user=self.user, name=f'ingredient {i}') for i in range(40)]
+        )
+
+        counts = []
+        for size in (1, 40):
+            payload = {
+                'title': f'recipe {size}', 'time_minutes': 5, 'price': '5.00',
+                'tags': [tag.id for tag in tags[:size]],
+                'ingredients': [ingredient.id for ingredient in ingredients[:size]],
+            }
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.post(RECIPES_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
+
+    def test_update_recipe_writes_only_changed_links(self):
+        # probar que el M2M sin cambios no se reescribe y el otro solo cambia la diferencia
+        tags = Tag.objects.bulk_create([Tag(user=self.user, name=f'tag {i}') for i in range(3)])
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        recipe = Recipe.objects.create(user=self.user, title='recipe', time_minutes=5, price=5.00)
+        recipe.tags.add(*tags[:2])
+        recipe.ingredients.add(ingredient)
+        payload = {'tags': [tags[1].id, tags[2].id], 'ingredients': [ingredient.id]}
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.patch(detail_url(recipe.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        writes = [
+            query['sql'].split()[0] + ' ' + table
+            for query in queries
+            for table in ('core_recipe_tags', 'core_recipe_ingredients')
+            if query['sql'].startswith(('INSERT', 'DELETE')) and f'"{table}"' in query['sql']
+        ]
+        self.assertEqual(writes, ['DELETE core_recipe_tags', 'INSERT core_recipe_tags'])
+
+    def test_benchmark_relations_command(self):
+        # probar que el comando reporta ambos caminos y no deja datos
+        out = io.StringIO()
+        call_command('benchmark_recipe_relations', counts='1,5', repeat=1, stdout=out)
+
+        self.assertIn('5 relations: create', out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_benchmark_attrs_command(self):
+        # probar que el comando reporta todas las estrategias y no deja datos
+        out = io.StringIO()
+        call_command('benchmark_recipe_attrs', tags=10, recipes=20, per_recipe=2, repeat=1, stdout=out)
+
+        for label in ('join + DISTINCT', 'EXISTS:', 'EXISTS + recipe_count', 'join + COUNT GROUP BY'):
+            self.assertIn(label, out.getvalue())
+        self.assertFalse(Tag.objects.exists())
+
+    def test_benchmark_filters_command(self):
+        # probar que el comando reporta ambos modos y no deja datos
+        out = io.StringIO()
+        call_command('benchmark_recipe_filters', tags=10, recipes=20, filter_ids='1,2', repeat=1, stdout=out)
+
+        for label in ('match=any, IN semi-join', 'match=all, IN semi-join + GROUP BY', 'join per tag'):
+            self.assertIn(label, out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_benchmark_search_command(self):
+        # probar que el comando reporta ambos backends y no deja datos
+        out = io.StringIO()
+        call_command('benchmark_recipe_search', recipes=20, queries=5, repeat=1, stdout=out)
+
+        for label in ('fts5: index', 'python: index'):
+            self.assertIn(label, out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_list_tags_single_query(self):
+        # probar que listar tags usa una consulta
+        Tag.objects.create(user=self.user, name='Vegan')
+        Tag.objects.create(user=self.user, name='Dessert')
+
+        with self.assertNumQueries(1):
+            self.client.get(TAGS_URL)
+        with self.assertNumQueries(1):
+            self.client.get(TAGS_URL, {'assigned_only': 1})
+        with self.assertNumQueries(1):
+            self.client.get(TAGS_URL, {'assigned_only': 1, 'recipe_count': 1})
+
+    def test_list_ingredients_single_query(self):
+        # probar que listar ingredientes usa una consulta
+        Ingredient.objects.create(user=self.user, name='Salt')
+        Ingredient.objects.create(user=self.user, name='Pepper')
+
+        with self.assertNumQueries(1):
+            self.client.get(INGREDIENTS_URL)
+        with self.assertNumQueries(1):
+            self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
+        with self.assertNumQueries(1):
+            self.client.get(INGREDIENTS_URL, {'ordering': '-recipe_count', 'page_size': 1})
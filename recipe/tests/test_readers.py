@@ -0,0 +1,132 @@
+from decimal import Decimal
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Recipe, Tag, Ingredient
+from core.testing import QueryBudgetMixin
+from recipe.caching import bump_version
+from recipe.readers import format_price, recipe_data, recipe_rows
+from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    # retorna receta detail url
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class FastReadersTests(QueryBudgetMixin, TestCase):
+    # probar que las lecturas rapidas son identicas a los serializadores de DRF
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('test@mail.com', 'pass123')
+        self.client.force_authenticate(self.user)
+
+        tags = [Tag.objects.create(user=self.user, name=name) for name in ('Vegan', 'Quick', 'Dessert')]
+        ingredients = [Ingredient.objects.create(user=self.user, name=name) for name in ('Salt', 'Ñame')]
+        for title, price, link, recipe_tags, recipe_ingredients in (
+            ('Soup', 0, '', tags[::-1], ingredients),
+            ('Cake', 12.5, 'https://example.com/cake', tags[2:], []),
+            ('Salad', Decimal('999.99'), '', [], ingredients[1:]),
+            ('Água "fresca"', 1, '', tags[:2], []),
+        ):
+            recipe = Recipe.objects.create(user=self.user, title=title, time_minutes=5, price=price, link=link)
+            recipe.tags.add(*recipe_tags)
+            recipe.ingredients.add(*recipe_ingredients)
+
+    def get_both(self, url, params=None):
+        # respuesta con los serializadores de DRF y con la lectura rapida
+        contents = []
+        for fast in (False, True):
+            bump_version(self.user.id)
+            with override_settings(RECIPE_FAST_SERIALIZERS=fast):
+                res = self.client.get(url, params)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            contents.append(res.content)
+        return contents
+
+    def test_list_parity(self):
+        # probar que la lista es identica byte a byte
+        serializer_content, fast_content = self.get_both(RECIPES_URL)
+
+        self.assertEqual(fast_content, serializer_content)
+
+    def test_filtered_paginated_list_parity(self):
+        # probar filtros, orden y paginacion con ambos caminos
+        params = {'ordering': '-price', 'page_size': 2, 'price_max': '500'}
+        serializer_content, fast_content = self.get_both(RECIPES_URL, params)
+
+        self.assertEqual(fast_content, serializer_content)
+
+    def test_detail_parity(self):
+        # probar que el detalle con tags e ingredients anidados es identico
+        for recipe in Recipe.objects.all():
+            serializer_content, fast_content = self.get_both(detail_url(recipe.id))
+            self.assertEqual(fast_content, serializer_content)
+
+    def test_fieldset_parity(self):
+        # probar ?fields= y ?expand= con ambos caminos
+        for params in (
+            {'fields': 'title,id'},
+            {'fields': 'id,price', 'ordering': 'price', 'page_size': 2},
+            {'fields': 'id,tags,ingredients', 'expand': 'tags'},
+            {'expand': 'tags,ingredients'},
+        ):
+            with self.subTest(params=params):
+                serializer_content, fast_content = self.get_both(RECIPES_URL, params)
+                self.assertEqual(fast_content, serializer_content)
+
+        recipe = Recipe.objects.get(title='Soup')
+        serializer_content, fast_content = self.get_both(detail_url(recipe.id), {'fields': 'id,tags'})
+        self.assertEqual(fast_content, serializer_content)
+
+    def test_fieldset_shape(self):
+        # probar los campos y el orden de la respuesta
+        res = self.client.get(RECIPES_URL, {'fields': 'tags,id', 'expand': 'tags'})
+
+        item = res.data[-1]
+        self.assertEqual(list(item), ['id', 'tags'])
+        self.assertEqual(item['tags'][0].keys(), {'id', 'name'})
+
+    def test_fieldset_invalid(self):
+        # probar que campos o expansiones desconocidos retornan 400
+        for params in ({'fields': 'id,secret'}, {'expand': 'title'}):
+            res = self.client.get(RECIPES_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_recipe_data_matches_serializers(self):
+        # probar la forma de los datos directamente contra los serializadores
+        recipes = Recipe.objects.order_by('id')
+
+        self.assertEqual(recipe_data(recipe_rows(recipes)), RecipeSerializer(recipes, many=True).data)
+        self.assertEqual(
+            recipe_data(recipe_rows(recipes), nested=True), RecipeDetailSerializer(recipes, many=True).data
+        )
+
+    def test_detail_not_found(self):
+        # probar que un id inexistente o invalido retorna 404
+        for pk in (0, 'abc'):
+            res = self.client.get(detail_url(pk))
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_format_price(self):
+        # probar el formato de precio igual a DecimalField de DRF
+        self.assertEqual(format_price(Decimal('5')), '5.00')
+        self.assertEqual(format_price(12.5), '12.50')
+
+    def test_benchmark_command(self):
+        # probar que el comando reporta ambos caminos
+        out = io.StringIO()
+        call_command('benchmark_recipe_serializers', user=self.user.email, repeat=1, stdout=out)
+
+        self.assertIn('list: serializer', out.getvalue())
+        self.assertIn('detail: serializer', out.getvalue())
@@ -1,11 +1,13 @@
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from rest_framework.test import APIClient
 from rest_framework import status
 
 from core.models import Recipe, Tag, Ingredient
+from core.testing import QueryBudgetMixin
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 import tempfile
@@ -42,7 +44,7 @@ def detail_url(recipe_id):
     return reverse('recipe:recipe-detail', args=[recipe_id])
 
 
-class PublicRecipeApiTests(TestCase):
+class PublicRecipeApiTests(QueryBudgetMixin, TestCase):
     # test de acceso publico
 
     def setUp(self):
@@ -54,7 +56,7 @@ class PublicRecipeApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
-class PrivateRecipeApiTests(TestCase):
+class PrivateRecipeApiTests(QueryBudgetMixin, TestCase):
     # test de acceso publico
 
     def setUp(self):
@@ -69,7 +71,7 @@ class PrivateRecipeApiTests(TestCase):
 
         res = self.client.get(RECIPES_URL)
 
-        recipes = Recipe.objects.all().order_by('id')
+        recipes = Recipe.objects.all().order_by('-id')
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
@@ -150,8 +152,181 @@ class PrivateRecipeApiTests(TestCase):
         self.assertIn(ingredient1, ingredients)
         self.assertIn(ingredient2, ingredients)
 
+    def test_create_recipe_with_other_users_tag(self):
+        # probar que no se puede asignar un Tag de otro usuario
+        other = get_user_model().objects.create_user('other@mail.com', 'pass123')
+        tag = sample_tag(user=other)
+        payload = {'title': 'test recipe', 'tags': [tag.id], 'time_minutes': 30, 'price': 20.00}
 
-class RecipeImageUploadTests(TestCase):
+        res = self.client.post(RECIPES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_create_recipe_missing_ids(self):
+        # probar que el error lista todos los ids inexistentes
+        ingredient = sample_ingredient(user=self.user)
+        payload = {
+            'title': 'test recipe',
+            'ingredients': [ingredient.id, 9998, 9999, 9999],
+            'time_minutes': 30,
+            'price': 20.00,
+        }
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            res.data['ingredients'], ['Invalid pks [9998, 9999] - objects do not exist.']
+        )
+
+    def test_create_recipe_invalid_id_type(self):
+        # probar que un id que no es numero retorna 400
+        payload = {'title': 'test recipe', 'tags': ['abc'], 'time_minutes': 30, 'price': 20.00}
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_partial_update_recipe_tags(self):
+        # probar que solo se agregan y quitan las filas de tags que cambian
+        recipe = sample_recipe(user=self.user)
+        tag1 = sample_tag(user=self.user, name='Vegan')
+        tag2 = sample_tag(user=self.user, name='Quick')
+        tag3 = sample_tag(user=self.user, name='Cheap')
+        recipe.tags.add(tag1, tag2)
+        kept = Recipe.tags.through.objects.get(recipe=recipe, tag=tag2).id
+
+        res = self.client.patch(detail_url(recipe.id), {'tags': [tag2.id, tag3.id]}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(res.data['tags']), [tag2.id, tag3.id])
+        self.assertEqual(set(recipe.tags.all()), {tag2, tag3})
+        self.assertEqual(Recipe.tags.through.objects.get(recipe=recipe, tag=tag2).id, kept)
+
+    def test_full_update_recipe(self):
+        # probar que PUT reemplaza tags e ingredients
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(sample_tag(user=self.user))
+        ingredient = sample_ingredient(user=self.user)
+        payload = {'title': 'new title', 'time_minutes': 25, 'price': 5.00, 'ingredients': [ingredient.id]}
+
+        res = self.client.put(detail_url(recipe.id), payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, payload['title'])
+        self.assertFalse(recipe.tags.exists())
+        self.assertEqual(list(recipe.ingredients.all()), [ingredient])
+
+    def test_order_recipes_by_price(self):
+        # probar ordenar recetas por precio con desempate por id
+        recipe1 = sample_recipe(user=self.user, price=10.00)
+        recipe2 = sample_recipe(user=self.user, price=2.00)
+        recipe3 = sample_recipe(user=self.user, price=10.00)
+
+        res = self.client.get(RECIPES_URL, {'ordering': '-price'})
+
+        self.assertEqual([item['id'] for item in res.data], [recipe3.id, recipe1.id, recipe2.id])
+
+    def test_filter_recipes_by_price_and_time_range(self):
+        # probar filtrar recetas por rango de precio y tiempo maximo
+        sample_recipe(user=self.user, price=1.00, time_minutes=5)
+        recipe = sample_recipe(user=self.user, price=5.00, time_minutes=10)
+        sample_recipe(user=self.user, price=5.00, time_minutes=60)
+        sample_recipe(user=self.user, price=50.00, time_minutes=10)
+
+        res = self.client.get(RECIPES_URL, {'price_min': '2', 'price_max': '10', 'time_max': 30})
+
+        self.assertEqual([item['id'] for item in res.data], [recipe.id])
+
+    def test_filter_recipes_invalid_range(self):
+        # probar que un rango invalido retorna 400
+        res = self.client.get(RECIPES_URL, {'price_min': 'cheap'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_recipes_match_any_and_all(self):
+        # probar match=any (por defecto) y match=all con varios tags
+        vegan = sample_tag(user=self.user, name='Vegan')
+        quick = sample_tag(user=self.user, name='Quick')
+        both = sample_recipe(user=self.user, title='both')
+        both.tags.add(vegan, quick)
+        only_vegan = sample_recipe(user=self.user, title='only vegan')
+        only_vegan.tags.add(vegan)
+        sample_recipe(user=self.user, title='none')
+        params = {'tags': f'{vegan.id},{quick.id}'}
+
+        res = self.client.get(RECIPES_URL, params)
+        self.assertEqual([item['id'] for item in res.data], [only_vegan.id, both.id])
+
+        res = self.client.get(RECIPES_URL, {**params, 'match': 'any'})
+        self.assertEqual([item['id'] for item in res.data], [only_vegan.id, both.id])
+
+        res = self.client.get(RECIPES_URL, {**params, 'match': 'all'})
+        self.assertEqual([item['id'] for item in res.data], [both.id])
+
+    def test_filter_recipes_match_all_tags_and_ingredients(self):
+        # probar match=all sobre tags e ingredients a la vez
+        vegan = sample_tag(user=self.user, name='Vegan')
+        salt = sample_ingredient(user=self.user, name='Salt')
+        pepper = sample_ingredient(user=self.user, name='Pepper')
+        recipe = sample_recipe(user=self.user, title='match')
+        recipe.tags.add(vegan)
+        recipe.ingredients.add(salt, pepper)
+        partial = sample_recipe(user=self.user, title='partial')
+        partial.tags.add(vegan)
+        partial.ingredients.add(salt)
+
+        res = self.client.get(
+            RECIPES_URL, {'tags': str(vegan.id), 'ingredients': f'{salt.id},{pepper.id}', 'match': 'all'}
+        )
+
+        self.assertEqual([item['id'] for item in res.data], [recipe.id])
+
+    def test_filter_recipes_not_duplicated(self):
+        # probar que una receta con varios de los ids buscados aparece una vez
+        vegan = sample_tag(user=self.user, name='Vegan')
+        quick = sample_tag(user=self.user, name='Quick')
+        salt = sample_ingredient(user=self.user, name='Salt')
+        pepper = sample_ingredient(user=self.user, name='Pepper')
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(vegan, quick)
+        recipe.ingredients.add(salt, pepper)
+
+        res = self.client.get(
+            RECIPES_URL, {'tags': f'{vegan.id},{quick.id}', 'ingredients': f'{salt.id},{pepper.id}'}
+        )
+
+        self.assertEqual([item['id'] for item in res.data], [recipe.id])
+
+    def test_filter_recipes_invalid_ids_and_match(self):
+        # probar que ids mal formados o un match desconocido retornan 400
+        for params, field in (
+            ({'tags': '1,x'}, 'tags'),
+            ({'ingredients': 'salt'}, 'ingredients'),
+            ({'tags': '1', 'match': 'foo'}, 'match'),
+        ):
+            res = self.client.get(RECIPES_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(field, res.data)
+
+    def test_order_recipes_paginated(self):
+        # probar paginar recetas ordenadas por tiempo
+        recipes = [sample_recipe(user=self.user, time_minutes=minutes) for minutes in (30, 10, 20, 10, 30)]
+        expected = [recipe.id for recipe in sorted(recipes, key=lambda recipe: (recipe.time_minutes, recipe.id))]
+
+        res = self.client.get(RECIPES_URL, {'ordering': 'time_minutes', 'page_size': 2})
+        ids = [item['id'] for item in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids += [item['id'] for item in res.data['results']]
+
+        self.assertEqual(ids, expected)
+
+
+class RecipeImageUploadTests(QueryBudgetMixin, TestCase):
 
     def setUp(self):
         self.client = APIClient()
@@ -176,6 +351,43 @@ class RecipeImageUploadTests(TestCase):
         self.assertIn('image', res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
+    @override_settings(IMAGE_PROCESSING_ASYNC=False)
+    def test_upload_image_generates_renditions(self):
+        # probar que se generan versiones redimensionadas sin metadatos
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            img = Image.new('RGB', (1000, 500))
+            exif = Image.Exif()
+            exif[0x010F] = 'camera'
+            img.save(ntf, format='JPEG', exif=exif)
+            ntf.seek(0)
+            res = self.client.post(url, {'image': ntf}, format='multipart')
+
+        self.recipe.refresh_from_db()
+        for path in self.recipe.image_renditions.values():
+            self.addCleanup(default_storage.delete, path)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+        self.assertEqual(
+            set(self.recipe.image_renditions),
+            {'thumbnail_webp', 'thumbnail_jpeg', 'medium_webp', 'medium_jpeg'},
+        )
+        with Image.open(default_storage.path(self.recipe.image_renditions['thumbnail_jpeg'])) as thumbnail:
+            self.assertEqual(thumbnail.size, (200, 100))
+            self.assertFalse(thumbnail.getexif())
+
+    def test_upload_image_returns_processing_status(self):
+        # probar que la subida responde sin esperar el procesamiento
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new('RGB', (10, 10)).save(ntf, format='JPEG')
+            ntf.seek(0)
+            res = self.client.post(url, {'image': ntf}, format='multipart')
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_PROCESSING)
+        self.assertEqual(res.data['image_renditions'], {})
+
     def test_upload_image_bad_request(self):
         # probar subir imagen error
         url = image_upload_url(self.recipe.id)
@@ -0,0 +1,117 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Recipe, Tag
+from core.testing import QueryBudgetMixin
+from recipe.caching import get_version
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    # retorna receta detail url
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+@override_settings(CACHE_SINGLE_PROCESS=True)
+class ResponseCacheTests(QueryBudgetMixin, TestCase):
+    # probar cache de respuestas con ETag por usuario
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('test@mail.com', 'pass123')
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(user=self.user, title='recipe', time_minutes=5, price=5.00)
+
+    def test_not_modified_without_queries(self):
+        # probar que If-None-Match retorna 304 sin consultar la base de datos
+        res = self.client.get(RECIPES_URL)
+        etag = res['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_cached_body_served_without_queries(self):
+        # probar que la respuesta completa se sirve desde el cache
+        first = self.client.get(detail_url(self.recipe.id))
+
+        with self.assertNumQueries(0):
+            second = self.client.get(detail_url(self.recipe.id))
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.content, first.content)
+
+    def test_write_changes_etag(self):
+        # probar que crear una receta invalida el ETag de la lista
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(RECIPES_URL, {'title': 'new', 'time_minutes': 10, 'price': 2.00})
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(len(res.data), 2)
+
+    def test_m2m_change_changes_etag(self):
+        # probar que asignar tags a una receta invalida el detalle
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(detail_url(self.recipe.id), {'tags': [tag.id]})
+        res = self.client.get(detail_url(self.recipe.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['name'], 'Vegan')
+
+    def test_etag_scoped_to_user(self):
+        # probar que el ETag de un usuario no sirve para otro
+        etag = self.client.get(TAGS_URL)['ETag']
+        user2 = get_user_model().objects.create_user('other@mail.com', 'pass123')
+        self.client.force_authenticate(user2)
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_version_bumped_on_commit(self):
+        # probar que la version cambia al confirmar la escritura y no antes
+        version = get_version(self.user.id)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            recipe = Recipe.objects.create(user=self.user, title='new', time_minutes=5, price=1.00)
+            recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+            self.assertEqual(get_version(self.user.id), version)
+        for callback in callbacks:
+            callback()
+
+        self.assertNotEqual(get_version(self.user.id), version)
+
+    def test_cache_key_includes_media_type(self):
+        # probar que una respuesta indentada no se sirve a un request sin indent
+        indented = self.client.get(RECIPES_URL, HTTP_ACCEPT='application/json; indent=4')
+        plain = self.client.get(RECIPES_URL, HTTP_ACCEPT='application/json')
+
+        self.assertNotEqual(indented['ETag'], plain['ETag'])
+        self.assertIn(b'\n    ', indented.content)
+        self.assertNotIn(b'\n', plain.content)
+
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT='application/json', HTTP_IF_NONE_MATCH=indented['ETag'])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(CACHE_SINGLE_PROCESS=False)
+    def test_local_memory_cache_disables_response_cache(self):
+        # probar que con un cache por proceso y varios workers no se cachea
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('ETag', res)
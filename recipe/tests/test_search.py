@@ -0,0 +1,150 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Recipe, Tag, Ingredient
+from core.testing import QueryBudgetMixin
+from recipe.search import python_backend, tokenize, typo_range, within_distance
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_BULK_URL = reverse('recipe:tag-bulk-create')
+INGREDIENTS_BULK_URL = reverse('recipe:ingredient-bulk-create')
+
+
+class SearchHelpersTests(QueryBudgetMixin, TestCase):
+    # probar funciones auxiliares de la busqueda
+
+    def test_tokenize_strips_accents(self):
+        # probar que se ignoran mayusculas y acentos
+        self.assertEqual(tokenize('Jalapeño Picante!'), ['jalapeno', 'picante'])
+
+    def test_within_distance(self):
+        # probar distancia de edicion con transposiciones
+        self.assertTrue(within_distance('tomato', 'tomatto', 1))
+        self.assertTrue(within_distance('tomato', 'tomaot', 1))
+        self.assertFalse(within_distance('tomato', 'potato', 1))
+
+    def test_typo_range(self):
+        # probar que los candidatos comparten las dos primeras letras y un largo cercano
+        self.assertEqual(typo_range('tomato'), ('to', 'tp', 5, 7))
+        self.assertEqual(typo_range('chocolate'), ('ch', 'ci', 7, 11))
+
+
+class SearchApiTestsMixin:
+    # pruebas de busqueda comunes a todos los backends
+
+    def setUp(self):
+        python_backend.reset()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('test@mail.com', 'pass123')
+        self.client.force_authenticate(self.user)
+
+    def create_recipe(self, user=None, tags=(), ingredients=(), **params):
+        # crea una receta indexada con sus tags e ingredients
+        user = user or self.user
+        defaults = {'title': 'sample recipe', 'time_minutes': 6, 'price': 5.00}
+        defaults.update(params)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(user=user, **defaults)
+            for name in tags:
+                recipe.tags.add(Tag.objects.create(user=user, name=name))
+            for name in ingredients:
+                recipe.ingredients.add(Ingredient.objects.create(user=user, name=name))
+        return recipe
+
+    def search(self, query):
+        res = self.client.get(RECIPES_URL, {'search': query})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [item['id'] for item in res.data]
+
+    def test_search_title_tags_and_ingredients(self):
+        # probar buscar por titulo, tag e ingrediente
+        soup = self.create_recipe(title='Tomato soup', tags=['Vegan'], ingredients=['Basil'])
+        curry = self.create_recipe(title='Chicken curry', ingredients=['Tomato'])
+        self.create_recipe(title='Chocolate cake')
+
+        self.assertEqual(set(self.search('tomato')), {soup.id, curry.id})
+        self.assertEqual(self.search('vegan basil'), [soup.id])
+
+    def test_search_ranks_title_matches_first(self):
+        # probar que coincidir en el titulo pesa mas que en ingredientes
+        curry = self.create_recipe(title='Chicken curry', ingredients=['Tomato'])
+        soup = self.create_recipe(title='Tomato soup')
+
+        self.assertEqual(self.search('tomato'), [soup.id, curry.id])
+
+    def test_search_prefix_and_typos(self):
+        # probar coincidencia por prefijo y con errores de tipeo
+        recipe = self.create_recipe(title='Jalapeño poppers')
+
+        self.assertEqual(self.search('jala'), [recipe.id])
+        self.assertEqual(self.search('poppres'), [recipe.id])
+
+    @override_settings(RECIPE_SEARCH_LIMIT=1)
+    def test_search_filters_before_limit(self):
+        # probar que los filtros se aplican antes de limitar el ranking
+        self.create_recipe(title='Tomato soup', price=5.00)
+        curry = self.create_recipe(title='Chicken curry', ingredients=['Tomato'], price=20.00)
+
+        res = self.client.get(RECIPES_URL, {'search': 'tomato', 'price_min': '10'})
+
+        self.assertEqual([item['id'] for item in res.data], [curry.id])
+
+    def test_search_ignores_owner_column(self):
+        # probar que la columna interna del usuario (u<id>) no coincide con la busqueda
+        self.create_recipe(title='Tomato soup')
+        burger = self.create_recipe(title='Umami burger')
+
+        self.assertEqual(self.search('u'), [burger.id])
+        self.assertEqual(self.search(f'u{self.user.id}'), [])
+
+    def test_search_updates_on_bulk_rename(self):
+        # probar que renombrar tags e ingredients en lote reindexa sus recetas
+        recipe = self.create_recipe(title='Soup', tags=['Vegan'], ingredients=['Basil'])
+        tag, ingredient = recipe.tags.get(), recipe.ingredients.get()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.patch(TAGS_BULK_URL, [{'id': tag.id, 'name': 'Spicy'}], format='json')
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            res = self.client.patch(INGREDIENTS_BULK_URL, [{'id': ingredient.id, 'name': 'Lentil'}], format='json')
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(self.search('spicy lentil'), [recipe.id])
+        self.assertEqual(self.search('vegan'), [])
+        self.assertEqual(self.search('basil'), [])
+
+    def test_search_limited_to_user(self):
+        # probar que solo se buscan recetas del usuario
+        user2 = get_user_model().objects.create_user('other@mail.com', 'pass123')
+        self.create_recipe(user=user2, title='Tomato soup')
+
+        self.assertEqual(self.search('tomato'), [])
+
+    def test_search_updates_on_changes(self):
+        # probar que el indice se actualiza al cambiar tags y titulos
+        recipe = self.create_recipe(title='Soup')
+        self.assertEqual(self.search('lentil'), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.tags.add(Tag.objects.create(user=self.user, name='Lentil'))
+        self.assertEqual(self.search('lentil'), [recipe.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.tags.get().delete()
+        self.assertEqual(self.search('lentil'), [])
+
+        recipe.delete()
+        self.assertEqual(self.search('soup'), [])
+
+
+@override_settings(RECIPE_SEARCH_BACKEND='fts5')
+class FTS5SearchApiTests(QueryBudgetMixin, SearchApiTestsMixin, TestCase):
+    pass
+
+
+@override_settings(RECIPE_SEARCH_BACKEND='python')
+class PythonSearchApiTests(QueryBudgetMixin, SearchApiTestsMixin, TestCase):
+    pass
@@ -0,0 +1,136 @@
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Recipe, Tag, Ingredient, CatalogStats
+from core.testing import QueryBudgetMixin
+from recipe.stats import get_stats, verify_stats
+
+STATS_URL = reverse('recipe:stats')
+
+
+def sample_recipe(user, **params):
+    # crea y retorna una receta
+    defaults = {'title': 'sample recipe', 'time_minutes': 10, 'price': 5.00}
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class CatalogStatsApiTests(QueryBudgetMixin, TestCase):
+    # probar estadisticas del catalogo
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('test@mail.com', 'pass123')
+        self.client.force_authenticate(self.user)
+
+    def test_stats_built_on_first_read(self):
+        # probar que el registro se calcula la primera vez que se pide
+        recipe = sample_recipe(self.user, price=4.00, time_minutes=20)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        sample_recipe(self.user, price=2.00, time_minutes=10)
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {
+            'recipe_count': 2, 'tag_count': 1, 'ingredient_count': 0, 'average_price': '3.00',
+            'average_time_minutes': 15.0, 'average_tags': 0.5, 'average_ingredients': 0,
+        })
+
+    def test_stats_empty_catalog(self):
+        # probar que sin recetas no hay promedios
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['recipe_count'], 0)
+        self.assertIsNone(res.data['average_price'])
+
+    def test_stats_single_query(self):
+        # probar que leer las estadisticas es una consulta
+        get_stats(self.user.id)
+
+        with self.assertNumQueries(1):
+            self.client.get(STATS_URL)
+
+    def test_stats_maintained_on_writes(self):
+        # probar que los contadores siguen a escrituras individuales, M2M y en lote
+        get_stats(self.user.id)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        recipe = sample_recipe(self.user)
+        other = sample_recipe(self.user, price=3.50)
+
+        recipe.tags.add(tag)
+        recipe.ingredients.add(salt)
+        salt.recipe_set.add(other)
+        recipe.price = 7.25
+        recipe.save()
+        recipe.ingredients.remove(salt)
+        other.ingredients.clear()
+        tag.delete()
+
+        self.client.post(reverse('recipe:recipe-bulk-create'), [
+            {'title': 'bulk', 'time_minutes': 5, 'price': '1.00', 'tags': [], 'ingredients': [salt.id]},
+        ], format='json')
+        self.client.patch(reverse('recipe:recipe-bulk-create'), [
+            {'id': other.id, 'time_minutes': 45, 'ingredients': [salt.id]},
+        ], format='json')
+        self.client.generic(
+            'POST', reverse('recipe:recipe-import-recipes'),
+            '{"title": "imported", "time_minutes": 5, "price": "1.00", "tags": ["Quick"]}\n',
+            content_type='application/x-ndjson',
+        )
+        recipe.delete()
+
+        self.assertEqual(verify_stats(self.user.id), {})
+        stats = CatalogStats.objects.get(user=self.user)
+        self.assertEqual((stats.recipe_count, stats.tag_count, stats.ingredient_count), (3, 1, 1))
+        self.assertEqual((stats.tag_links, stats.ingredient_links), (1, 2))
+
+    def test_stats_maintained_on_recipe_update(self):
+        # probar que actualizar tags e ingredients por diferencia mantiene los contadores
+        get_stats(self.user.id)
+        tags = [Tag.objects.create(user=self.user, name=name) for name in ('Vegan', 'Quick', 'Cheap')]
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(*tags[:2])
+        url = reverse('recipe:recipe-detail', args=[recipe.id])
+
+        self.client.patch(url, {'tags': [tags[1].id, tags[2].id]}, format='json')
+        self.client.put(url, {
+            'title': 'new', 'time_minutes': 5, 'price': '2.00', 'tags': [tags[2].id], 'ingredients': [salt.id],
+        }, format='json')
+
+        self.assertEqual(verify_stats(self.user.id), {})
+        stats = CatalogStats.objects.get(user=self.user)
+        self.assertEqual((stats.tag_links, stats.ingredient_links), (1, 1))
+
+
+class RebuildCatalogStatsCommandTests(QueryBudgetMixin, TestCase):
+    # probar comando de reconstruccion de estadisticas
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('test@mail.com', 'pass123')
+        get_stats(self.user.id)
+        sample_recipe(self.user)
+
+    def test_verify_and_rebuild_drifted_stats(self):
+        # probar que se detectan y corrigen contadores desfasados
+        CatalogStats.objects.filter(user=self.user).update(recipe_count=5)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_catalog_stats', verify=True, stdout=io.StringIO())
+
+        out = io.StringIO()
+        call_command('rebuild_catalog_stats', stdout=out)
+
+        self.assertIn('recipe_count is 5, expected 1', out.getvalue())
+        self.assertEqual(verify_stats(self.user.id), {})
+        self.assertEqual(CatalogStats.objects.get(user=self.user).recipe_count, 1)
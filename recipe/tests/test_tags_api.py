@@ -6,12 +6,14 @@ from rest_framework.test import APIClient
 from rest_framework import status
 
 from core.models import Tag, Recipe
+from core.testing import QueryBudgetMixin
 from recipe.serializers import TagSerializer
 
 TAGS_URL = reverse('recipe:tag-list')
+UPSERT_URL = reverse('recipe:tag-upsert')
 
 
-class PublicTagsApiTests(TestCase):
+class PublicTagsApiTests(QueryBudgetMixin, TestCase):
     # probar los API tags disponibles publicamente
 
     def setUp(self):
@@ -24,7 +26,7 @@ class PublicTagsApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
-class PrivateTagsApiTests(TestCase):
+class PrivateTagsApiTests(QueryBudgetMixin, TestCase):
     # probar los API tags privados
 
     def setUp(self):
@@ -70,6 +72,73 @@ class PrivateTagsApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_create_tag_duplicate_name(self):
+        # probar que un nombre repetido (sin distinguir mayusculas) retorna 400
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.post(TAGS_URL, {'name': 'vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Tag.objects.count(), 1)
+
+    def test_bulk_create_duplicate_names(self):
+        # probar que nombres repetidos dentro del lote retornan 400
+        res = self.client.post(
+            reverse('recipe:tag-bulk-create'), [{'name': 'Vegan'}, {'name': 'VEGAN'}], format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Tag.objects.exists())
+
+    def test_upsert_tags(self):
+        # probar que se crean los nombres nuevos y se reutilizan los existentes
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        other_user = get_user_model().objects.create_user('other@email.com', 'pass123')
+        Tag.objects.create(user=other_user, name='Quick')
+
+        res = self.client.post(UPSERT_URL, ['quick', 'vegan', 'Quick', ' Dessert '], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        quick = Tag.objects.get(user=self.user, name='quick')
+        dessert = Tag.objects.get(user=self.user, name='Dessert')
+        self.assertEqual(res.data, [
+            {'id': quick.id, 'name': 'quick'},
+            {'id': vegan.id, 'name': 'Vegan'},
+            {'id': quick.id, 'name': 'quick'},
+            {'id': dessert.id, 'name': 'Dessert'},
+        ])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 3)
+
+    def test_upsert_tags_idempotent(self):
+        # probar que repetir el request no crea objetos y se resuelve en pocas consultas
+        self.client.post(UPSERT_URL, ['Vegan', 'Quick'], format='json')
+
+        with self.assertNumQueries(1):
+            res = self.client.post(UPSERT_URL, ['Vegan', 'Quick'], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([tag['name'] for tag in res.data], ['Vegan', 'Quick'])
+        self.assertEqual(Tag.objects.count(), 2)
+
+    def test_upsert_tags_non_ascii_case(self):
+        # probar que nombres con acentos en otras mayusculas no se duplican
+        tag = Tag.objects.create(user=self.user, name='JALAPEÑO')
+
+        res = self.client.post(UPSERT_URL, ['jalapeño'], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [{'id': tag.id, 'name': 'JALAPEÑO'}])
+        self.assertEqual(Tag.objects.count(), 1)
+
+        res = self.client.post(TAGS_URL, {'name': 'Jalapeño'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_upsert_tags_invalid(self):
+        # probar que el payload debe ser una lista de nombres validos
+        for payload in ({'name': 'Vegan'}, ['ok', ''], ['x' * 256]):
+            res = self.client.post(UPSERT_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_retrieve_tags_assigned_to_recipe(self):
         # probar filtro de tags basados en recetas
         tag1 = Tag.objects.create(user=self.user, name='Meat')
@@ -94,3 +163,38 @@ class PrivateTagsApiTests(TestCase):
 
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
         self.assertEqual(len(res.data), 1)
+
+    def test_retrieve_tags_with_recipe_count(self):
+        # probar obtener tags con su cantidad de recetas, ordenados por popularidad
+        tag1 = Tag.objects.create(user=self.user, name='Meat')
+        tag2 = Tag.objects.create(user=self.user, name='Banana')
+        tag3 = Tag.objects.create(user=self.user, name='Vegan')
+        for title in ('one', 'two'):
+            recipe = Recipe.objects.create(title=title, time_minutes=5, price=1.00, user=self.user)
+            recipe.tags.add(tag2)
+        recipe.tags.add(tag1)
+
+        res = self.client.get(TAGS_URL, {'ordering': '-recipe_count'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(item['id'], item['recipe_count']) for item in res.data],
+            [(tag2.id, 2), (tag1.id, 1), (tag3.id, 0)],
+        )
+
+    def test_retrieve_tags_invalid_flags(self):
+        # probar que recipe_count y assigned_only invalidos responden 400
+        for params in ({'recipe_count': 'true'}, {'recipe_count': 2}, {'assigned_only': 'x'}):
+            res = self.client.get(TAGS_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(next(iter(params)), res.data)
+
+    def test_retrieve_tags_unknown_ordering_without_count(self):
+        # probar que un campo de orden que solo empieza con recipe_count no agrega el conteo
+        Tag.objects.create(user=self.user, name='Meat')
+
+        res = self.client.get(TAGS_URL, {'ordering': 'recipe_countx'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('recipe_count', res.data[0])
@@ -13,4 +13,5 @@ app_name = 'recipe'
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('stats/', views.CatalogStatsView.as_view(), name='stats'),
 ]
\ No newline at end of file
@@ -1,55 +1,122 @@
-from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from rest_framework import generics, viewsets, mixins, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 
 from core.models import Tag, Ingredient, Recipe
+from core.queryaudit import QueryAuditMixin
+from core.routers import ReplicaReadMixin
+from user.authentication import CachedTokenAuthentication
 from recipe import serializers
+from recipe.bulk import BulkModelMixin, upsert_names
+from recipe.caching import CachedResponseMixin, bump_version
+from recipe.export import NDJSONRenderer, CSVRenderer, iter_recipes, ndjson_stream, csv_stream
+from recipe.images import save_uploaded_image
+from recipe.importer import RecipeImporter, RecipeImportError, parse_records, FORMAT_CSV, FORMAT_NDJSON
+from recipe.filters import (
+    filter_recipes, assigned_to_recipe, ordering_terms, param_to_flag, recipe_count, relation_links,
+    StableOrderingFilter,
+)
+from recipe.readers import (
+    SERIALIZER_FIELDS, fast_serializers, fieldset_columns, parse_fieldset, recipe_data, recipe_rows,
+)
+from recipe.search import schedule_index, search_recipes
+from recipe.stats import get_stats
+from recipe.pagination import RecipeCursorPagination, RecipeAttrCursorPagination
 
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.CreateModelMixin):
-    authentication_classes = (TokenAuthentication, )
+class BaseRecipeAttrViewSet(QueryAuditMixin, ReplicaReadMixin, CachedResponseMixin, BulkModelMixin, viewsets.GenericViewSet, mixins.ListModelMixin, mixins.CreateModelMixin):
+    authentication_classes = (CachedTokenAuthentication, )
     permission_classes = (IsAuthenticated, )
+    pagination_class = RecipeAttrCursorPagination
+    filter_backends = (StableOrderingFilter, )
+    ordering_fields = ('name', 'recipe_count')
+    ordering = ('-name', 'id')
+    # relacion de Recipe hacia el modelo ('tags' o 'ingredients')
+    recipe_relation = None
+
+    def with_recipe_count(self):
+        # el conteo de recetas se calcula solo si se pide o se ordena por el
+        params = self.request.query_params
+        return param_to_flag(params, 'recipe_count') or 'recipe_count' in ordering_terms(params)
 
     def get_queryset(self):
         # retornar objetos para el usuario autenticado
-        assigned_only = bool(int(self.request.query_params.get('assigned_only', 0)))
-        queryset = self.queryset
+        assigned_only = param_to_flag(self.request.query_params, 'assigned_only')
+        queryset = self.queryset.filter(user=self.request.user)
 
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
-            return queryset.filter(user=self.request.user).order_by('-name').distinct()
+            queryset = queryset.filter(assigned_to_recipe(self.recipe_relation))
+        if self.action == 'list' and self.with_recipe_count():
+            queryset = queryset.annotate(recipe_count=recipe_count(self.recipe_relation))
+
+        return queryset.order_by('-name')
+
+    def get_serializer_class(self):
+        if self.action == 'list' and self.with_recipe_count():
+            return self.count_serializer_class
+
+        return self.serializer_class
 
-        return self.queryset.filter(user=self.request.user).order_by('-name')
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
 
     def perform_create(self, serializer):
         # crear nuevo objeto
         serializer.save(user=self.request.user)
 
+    def after_bulk_write(self, request, ids):
+        super().after_bulk_write(request, ids)
+        if self.action == 'bulk_update':
+            # bulk_update no envia post_save: los renombrados cambian el texto
+            # indexado de sus recetas
+            links, field = relation_links(self.recipe_relation)
+            schedule_index(links.filter(**{f'{field}__in': ids}).values_list('recipe_id', flat=True))
+
+    @action(methods=['POST'], detail=False, url_path='upsert')
+    def upsert(self, request):
+        # ids de una lista de nombres, creando los que no existen; repetir el
+        # request no crea duplicados (los nombres no distinguen mayusculas)
+        names = serializers.NameListField(max_length=self.bulk_max_items).run_validation(request.data)
+
+        objs, created = upsert_names(self.queryset.model, request.user, names, self.bulk_batch_size)
+        if created:
+            bump_version(request.user.id)
+
+        data = self.get_serializer([objs[name] for name in names], many=True).data
+        return Response(data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
 
 class TagViewSet(BaseRecipeAttrViewSet):
     # manejar Tags en base de datos
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    count_serializer_class = serializers.TagCountSerializer
+    recipe_relation = 'tags'
 
 
 class IngredientViewSet(BaseRecipeAttrViewSet):
     # manejar Ingredientes en base de datos
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    count_serializer_class = serializers.IngredientCountSerializer
+    recipe_relation = 'ingredients'
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(QueryAuditMixin, ReplicaReadMixin, CachedResponseMixin, BulkModelMixin, viewsets.ModelViewSet):
     # manejar recetas en DB
     serializer_class = serializers.RecipeSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication, )
+    authentication_classes = (CachedTokenAuthentication, )
     permission_classes = (IsAuthenticated, )
-
-    def get_queryset(self):
-        # retornar objetos para el usuario autenticado
-        return self.queryset.filter(user=self.request.user).order_by('-id')
+    pagination_class = RecipeCursorPagination
+    filter_backends = (StableOrderingFilter, )
+    ordering_fields = ('id', 'price', 'time_minutes')
+    ordering = ('-id', )
+    export_chunk_size = 1000
 
     def get_serializer_class(self):
         # retorno el serializador apropiado
@@ -61,6 +128,35 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         return self.serializer_class
 
+    def list(self, request, *args, **kwargs):
+        handler = self.fast_list if fast_serializers() else super().list
+        return self.cached_response(handler, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        handler = self.fast_retrieve if fast_serializers() else super().retrieve
+        return self.cached_response(handler, request, *args, **kwargs)
+
+    def fast_list(self, request, *args, **kwargs):
+        # misma respuesta que list, desde filas .values() sin instancias ni serializadores
+        fields, expand = self.get_fieldset()
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = recipe_rows(queryset, fields, self.get_ordering_fields(queryset))
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(recipe_data(page, fields=fields, expand=expand))
+
+        return Response(recipe_data(rows, fields=fields, expand=expand))
+
+    def fast_retrieve(self, request, *args, **kwargs):
+        # misma respuesta que retrieve con RecipeDetailSerializer
+        fields, _ = self.get_fieldset()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        rows = recipe_rows(self.filter_queryset(self.get_queryset()), fields)
+        row = get_object_or_404(rows, **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+
+        return Response(recipe_data([row], nested=True, fields=fields)[0])
+
     def perform_create(self, serializer):
         # crear nuevo objeto
         serializer.save(user=self.request.user)
@@ -68,31 +164,128 @@ class RecipeViewSet(viewsets.ModelViewSet):
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         # subir imagenes a recetas
+        # la imagen original se guarda en el request, las versiones redimensionadas
+        # se generan en segundo plano (image_status indica el progreso)
         recipe = self.get_object()
         serializer = self.get_serializer(recipe, data=request.data)
 
         if serializer.is_valid():
-            serializer.save()
+            save_uploaded_image(serializer)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    def _params_to_ints(self, qs):
-        # convertir lista str a int
-        return [int(str_id) for str_id in qs.split(',')]
+    @action(methods=['GET'], detail=False, url_path='export', renderer_classes=(NDJSONRenderer, CSVRenderer))
+    def export(self, request):
+        # exportar todas las recetas en streaming como ndjson o csv (?format=csv)
+        recipes = iter_recipes(self.filter_queryset(self.get_queryset()), chunk_size=self.export_chunk_size)
+
+        if request.accepted_renderer.format == 'csv':
+            response = StreamingHttpResponse(csv_stream(recipes), content_type='text/csv')
+            response['Content-Disposition'] = 'attachment; filename="recipes.csv"'
+            return response
 
+        return StreamingHttpResponse(ndjson_stream(recipes), content_type='application/x-ndjson')
+
+    @action(methods=['POST'], detail=False, url_path='import')
+    def import_recipes(self, request):
+        # importar recetas ndjson o csv leyendo el cuerpo del request por lineas
+        # ?skip=N retoma la importacion desde el checkpoint N
+        try:
+            skip = int(request.query_params.get('skip', 0))
+            batch_size = min(int(request.query_params.get('batch_size', 500)), 5000)
+        except ValueError:
+            msg = 'skip and batch_size must be integers.'
+            return Response({'detail': msg}, status=status.HTTP_400_BAD_REQUEST)
+
+        fmt = FORMAT_CSV if request.content_type.startswith('text/csv') else FORMAT_NDJSON
+        importer = RecipeImporter(request.user, batch_size=max(batch_size, 1))
+        try:
+            checkpoint = importer.run(parse_records(request.stream or [], fmt), skip=skip)
+        except RecipeImportError as exc:
+            return Response({
+                'record': exc.record,
+                'errors': exc.errors,
+                'checkpoint': exc.checkpoint,
+                'created': importer.created,
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'checkpoint': checkpoint, 'created': importer.created}, status=status.HTTP_201_CREATED)
 
     def get_queryset(self):
         # obtener recetas para el usuario autenticado
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
-        queryset = self.queryset
-
-        if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
-        if ingredients:
-            ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
-
-        return queryset.filter(user=self.request.user)
\ No newline at end of file
+        queryset = filter_recipes(self.queryset, self.request.query_params)
+        queryset = queryset.filter(user=self.request.user).order_by('-id')
+
+        search = self.request.query_params.get('search')
+        if search:
+            queryset = search_recipes(queryset, self.request.user, search)
+
+        if self.action in ('list', 'retrieve'):
+            # leer solo las columnas de los campos pedidos (y las del orden, para el cursor)
+            fields, _ = self.get_fieldset()
+            queryset = queryset.only(*fieldset_columns(fields, self.get_ordering_fields(queryset)))
+
+        return queryset.prefetch_related(*self.get_prefetch_lookups())
+
+    def get_fieldset(self):
+        # campos de ?fields= y relaciones anidadas de ?expand=, solo para list y retrieve
+        if self.action not in ('list', 'retrieve'):
+            return SERIALIZER_FIELDS, frozenset()
+        if not hasattr(self, '_fieldset'):
+            self._fieldset = parse_fieldset(self.request.query_params)
+
+        return self._fieldset
+
+    def get_ordering_fields(self, queryset):
+        return StableOrderingFilter().get_ordering(self.request, queryset, self)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ('list', 'retrieve'):
+            context['fields'], context['expand'] = self.get_fieldset()
+
+        return context
+
+    def paginate_queryset(self, queryset):
+        # la busqueda retorna los resultados mas relevantes ordenados por ranking
+        if self.request.query_params.get('search'):
+            return None
+
+        return super().paginate_queryset(queryset)
+
+    def after_bulk_write(self, request, ids):
+        super().after_bulk_write(request, ids)
+        schedule_index(ids)
+
+    def get_prefetch_lookups(self):
+        # precargar solo las relaciones que usa el serializador de la accion
+        if self.action in ('list', 'retrieve'):
+            # solo las relaciones pedidas; ids, o id y nombre si se anidan
+            fields, expand = self.get_fieldset()
+            return tuple(
+                Prefetch(relation, queryset=model.objects.only(
+                    *(('id', 'name') if self.action == 'retrieve' or relation in expand else ('id', ))
+                ))
+                for relation, model in (('tags', Tag), ('ingredients', Ingredient))
+                if relation in fields
+            )
+        elif self.action in ('bulk_create', 'bulk_update'):
+            # RecipeSerializer solo necesita los ids de tags e ingredients
+            return (
+                Prefetch('tags', queryset=Tag.objects.only('id')),
+                Prefetch('ingredients', queryset=Ingredient.objects.only('id')),
+            )
+
+        return ()
+
+
+class CatalogStatsView(QueryAuditMixin, generics.RetrieveAPIView):
+    # estadisticas del catalogo del usuario autenticado
+    serializer_class = serializers.CatalogStatsSerializer
+    authentication_classes = (CachedTokenAuthentication, )
+    permission_classes = (IsAuthenticated, )
+
+    def get_object(self):
+        # registro de contadores del usuario, O(1)
+        return get_stats(self.request.user.id)
@@ -0,0 +1,135 @@
+from collections import OrderedDict
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework import exceptions
+
+from core.caches import is_shared
+
+
+class TokenCache:
+    # cache LRU con TTL en proceso para tokens, respaldada por el cache de Django
+    # compartido entre procesos. Un token borrado en otro proceso sigue en el
+    # LRU local hasta ttl, por eso el ttl local es corto; un alias que no es
+    # compartido (LocMemCache con varios workers) no se usa como segundo nivel
+
+    def __init__(self, maxsize=10000, ttl=5, shared_ttl=300, cache_alias='default'):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.shared_ttl = shared_ttl
+        self.cache_alias = cache_alias
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @property
+    def shared(self):
+        # None si el cache del alias es propio de cada proceso
+        if not is_shared(self.cache_alias):
+            return None
+        return caches[self.cache_alias]
+
+    def _shared_key(self, key):
+        # no guardar la clave del token en claro en el backend compartido
+        return 'auth_token_user:' + hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key):
+        # obtener (user_id, created) desde el LRU local o el cache compartido
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.local_hits += 1
+                    return value
+                del self._entries[key]
+
+        shared = self.shared
+        value = None if shared is None else shared.get(self._shared_key(key))
+        if value is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        self._set_local(key, value, now)
+        with self._lock:
+            self.shared_hits += 1
+        return value
+
+    def set(self, key, value):
+        # guardar (user_id, created) en ambos niveles
+        shared = self.shared
+        if shared is not None:
+            shared.set(self._shared_key(key), value, self.shared_ttl)
+        self._set_local(key, value, time.monotonic())
+
+    def _set_local(self, key, value, now):
+        with self._lock:
+            self._entries[key] = (now + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        # invalidar un token en ambos niveles
+        with self._lock:
+            self._entries.pop(key, None)
+        shared = self.shared
+        if shared is not None:
+            shared.delete(self._shared_key(key))
+
+    def clear(self):
+        # vaciar el LRU local y reiniciar los contadores
+        with self._lock:
+            self._entries.clear()
+            self.local_hits = self.shared_hits = self.misses = 0
+
+    def stats(self):
+        # contadores de aciertos y fallos del cache
+        with self._lock:
+            return {
+                'local_hits': self.local_hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+            }
+
+
+token_cache = TokenCache(
+    maxsize=getattr(settings, 'TOKEN_AUTH_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'TOKEN_AUTH_LOCAL_TTL', 5),
+    shared_ttl=getattr(settings, 'TOKEN_AUTH_SHARED_TTL', 300),
+    cache_alias=getattr(settings, 'TOKEN_AUTH_CACHE_ALIAS', 'default'),
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    # TokenAuthentication que evita la consulta del token en cada request. El
+    # cache guarda solo el id del usuario y la fecha del token; el usuario se
+    # lee por pk en cada request, asi is_active o un cambio con update() no
+    # quedan viejos y el hash del password no pasa por el cache
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, (user.pk, token.created))
+            return (user, token)
+
+        user_id, created = cached
+        user = get_user_model().objects.filter(pk=user_id).first()
+        if user is None or not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        token = self.get_model()(key=key, user=user, created=created)
+        return (user, token)
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from user.authentication import token_cache
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    # invalidar el cache al borrar un token (tambien con QuerySet.delete() y en
+    # cascada al borrar el usuario)
+    token_cache.delete(instance.key)
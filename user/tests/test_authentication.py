@@ -0,0 +1,138 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from user.authentication import token_cache
+
+ME_URL = reverse('user:me')
+
+
+@override_settings(CACHE_SINGLE_PROCESS=True)
+class CachedTokenAuthenticationTests(TestCase):
+    # probar autenticacion por token con cache
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user('test@email.com', 'pass123', name='name')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_lookup_cached(self):
+        # probar que el segundo request solo lee el usuario por pk
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('authtoken_token', queries[0]['sql'])
+        self.assertEqual(res.data['email'], self.user.email)
+        stats = token_cache.stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['local_hits'], 1)
+
+    def test_shared_cache_used_when_local_expired(self):
+        # probar que se usa el cache compartido si el LRU local no tiene el token
+        self.client.get(ME_URL)
+        token_cache._entries.clear()
+
+        with self.assertNumQueries(1):
+            self.client.get(ME_URL)
+
+        self.assertEqual(token_cache.stats()['shared_hits'], 1)
+
+    def test_cache_stores_user_id_only(self):
+        # probar que el cache no guarda el usuario (ni el hash del password)
+        self.client.get(ME_URL)
+
+        self.assertEqual(token_cache.get(self.token.key), (self.user.id, self.token.created))
+        self.assertEqual(
+            token_cache.shared.get(token_cache._shared_key(self.token.key)), (self.user.id, self.token.created),
+        )
+
+    @override_settings(CACHE_SINGLE_PROCESS=False)
+    def test_local_memory_cache_not_shared(self):
+        # probar que un cache por proceso no se usa como segundo nivel
+        self.client.get(ME_URL)
+        token_cache._entries.clear()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(ME_URL)
+
+        self.assertIn('authtoken_token', queries[0]['sql'])
+        self.assertIsNone(cache.get(token_cache._shared_key(self.token.key)))
+        self.assertEqual(token_cache.stats()['misses'], 2)
+
+    def test_deleted_token_invalidated(self):
+        # probar que un token borrado deja de autenticar
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_tokens_queryset_invalidated(self):
+        # probar que borrar los tokens con QuerySet.delete() tambien invalida el cache
+        self.client.get(ME_URL)
+        Token.objects.filter(user=self.user).delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_inactive_user_invalidated(self):
+        # probar que un usuario desactivado deja de autenticar
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_inactive_user_update_invalidated(self):
+        # probar que desactivar con QuerySet.update() (sin señales) tambien aplica
+        self.client.get(ME_URL)
+        get_user_model().objects.filter(pk=self.user.pk).update(is_active=False)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_keeps_token(self):
+        # probar que cambiar el password por la API no rompe el token en cache
+        self.client.get(ME_URL)
+
+        res = self.client.patch(ME_URL, {'password': 'newpass123'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('newpass123'))
+
+    def test_lru_bounded(self):
+        # probar que el LRU local no supera el tamaño maximo
+        maxsize = token_cache.maxsize
+        token_cache.maxsize = 1
+        try:
+            other = get_user_model().objects.create_user('other@email.com', 'pass123')
+            other_token = Token.objects.create(user=other)
+            self.client.get(ME_URL)
+            self.client.credentials(HTTP_AUTHORIZATION=f'Token {other_token.key}')
+            self.client.get(ME_URL)
+        finally:
+            token_cache.maxsize = maxsize
+
+        self.assertEqual(token_cache.stats()['size'], 1)
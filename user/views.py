@@ -1,23 +1,25 @@
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 
+from core.queryaudit import QueryAuditMixin
+from user.authentication import CachedTokenAuthentication
 from user.serializers import UserSerializer, AuthTokenSerializer
 
 
-class CreateUserView(generics.CreateAPIView):
+class CreateUserView(QueryAuditMixin, generics.CreateAPIView):
     # crear nuevo usuario en el sistema
     serializer_class = UserSerializer
 
-class CreateTokenView(ObtainAuthToken):
+class CreateTokenView(QueryAuditMixin, ObtainAuthToken):
     # crear nuevo auth token para usuario
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(QueryAuditMixin, generics.RetrieveUpdateAPIView):
     # manejar el usuario autenticado
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):